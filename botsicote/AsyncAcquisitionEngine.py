@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from FetchScheduler import FetchScheduler
+from TimeFrameManager import ACQUISITION_RETRY_DELAY
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class AsyncAcquisitionEngine(object):
+    """
+    Asyncio based data acquisition engine.
+    A single event loop owns the acquisition of every registered time frame manager: a central fetch scheduler tells
+    when each acquisition is due and the blocking kraken api calls are run in a small thread pool executor, so the
+    number of threads doesn't grow with the number of tracked pairs and time frames
+    """
+
+    def __init__(self, call_rate_manager, server_clock, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Async acquisition engine constructor
+
+        :param call_rate_manager: The kraken api call rate manager
+        :type call_rate_manager: KrakenAPICallRateManager
+        :param server_clock: The kraken server clock
+        :type server_clock: ServerClock
+        :param max_workers: Max number of threads used to perform the kraken api calls
+        :type max_workers: int
+        """
+        self._call_rate_manager = call_rate_manager
+        self._server_clock = server_clock
+        self._max_workers = max_workers
+        self._scheduler = FetchScheduler(call_rate_manager)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._loop = asyncio.new_event_loop()
+        self._wake_up_event = asyncio.Event()
+        self._t = threading.Thread(target=self._worker)
+        self._running_acquisitions = set()
+        self._load_lock = threading.Lock()
+        self._load_fits = True  # Whether the api calls needed by the registered time frame managers fit the limit
+        logging.info("AsyncAcquisitionEngine initialized with %d api call workers" % self._max_workers)
+
+    def start(self):
+        """Starts the event loop (worker)"""
+        self._t.start()
+
+    def stop(self):
+        """Stops the event loop (worker) and all the acquisitions"""
+        if self._t.is_alive():
+            # Queued even if the event loop isn't running yet, it's then run as soon as the loop starts
+            self._loop.call_soon_threadsafe(lambda: self._loop.create_task(self._shutdown()))
+            self._t.join()
+        self._executor.shutdown(wait=False)
+
+    def register(self, time_frame_manager):
+        """
+        Starts the data acquisition of a time frame manager
+
+        :param time_frame_manager: The time frame manager to acquire data for
+        :type time_frame_manager: TimeFrameManager
+        """
+        self._scheduler.register(time_frame_manager, self._server_clock.server_now())
+        self._loop.call_soon_threadsafe(self._wake_up_event.set)
+        self._check_load()
+
+    def unregister(self, time_frame_manager):
+        """
+        Stops the data acquisition of a time frame manager
+
+        :param time_frame_manager: The time frame manager to stop the acquisition for
+        :type time_frame_manager: TimeFrameManager
+        """
+        self._scheduler.unregister(time_frame_manager)
+        self._check_load()
+
+    def get_scheduler(self):
+        """
+        Get the fetch scheduler (to inspect the planned acquisitions for instance)
+
+        :return: The fetch scheduler
+        :rtype: FetchScheduler
+        """
+        return self._scheduler
+
+    def _check_load(self):
+        """
+        Compare the api calls needed by the registered time frame managers with the api call rate limit, a warning is
+        logged when they stop fitting the limit (and an info when they fit it again)
+        """
+        with self._load_lock:
+            load_report = self._scheduler.get_load_report()
+            logging.debug("Data acquisition needs %.2f api calls per minute, api call rate limit is %.2f calls per "
+                          "minute" % (load_report["needed_calls_per_minute"], load_report["max_calls_per_minute"]))
+
+            if self._load_fits and not load_report["fits"]:
+                logging.warning("The tracked pairs and time frames need %.2f api calls per minute, more than the api "
+                                "call rate limit of %.2f calls per minute allows, the data acquisition will lag behind"
+                                % (load_report["needed_calls_per_minute"], load_report["max_calls_per_minute"]))
+            elif not self._load_fits and load_report["fits"]:
+                logging.info("The tracked pairs and time frames need %.2f api calls per minute, the api call rate "
+                             "limit of %.2f calls per minute is met again"
+                             % (load_report["needed_calls_per_minute"], load_report["max_calls_per_minute"]))
+
+            self._load_fits = load_report["fits"]
+
+    async def _dispatch(self):
+        """Dispatcher coroutine: starts the due acquisitions, never more than the api call budget allows"""
+        while True:
+            # Acquisitions already started but maybe still waiting for the api call budget are deducted
+            dispatchable_count = min(self._max_workers, self._call_rate_manager.get_available_budget()) - \
+                len(self._running_acquisitions)
+
+            for time_frame_manager in self._scheduler.pop_due(self._server_clock.server_now(), dispatchable_count):
+                task = self._loop.create_task(self._acquire(time_frame_manager))
+                self._running_acquisitions.add(task)
+                task.add_done_callback(self._running_acquisitions.discard)
+
+            next_due_time = self._scheduler.get_next_due_time()
+            if next_due_time is None:
+                timeout = None
+            elif next_due_time <= self._server_clock.server_now():
+                # Due acquisitions are waiting for the api call budget to grow
+                timeout = self._call_rate_manager.get_decrease_period()
+            else:
+                timeout = next_due_time - self._server_clock.server_now()
+
+            self._wake_up_event.clear()
+            try:
+                await asyncio.wait_for(self._wake_up_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _acquire(self, time_frame_manager):
+        """
+        Acquisition coroutine of a time frame manager: retrieve its data then schedule its next acquisition
+
+        :param time_frame_manager: The time frame manager to acquire data for
+        :type time_frame_manager: TimeFrameManager
+        """
+        try:
+            await self._loop.run_in_executor(self._executor, time_frame_manager.feed)
+            next_acquisition_time = time_frame_manager.get_next_acquisition_time()
+        except Exception as e:
+            logging.warning("Data acquisition of %s failed, trying again in %d sec... Details: %s"
+                            % (str(time_frame_manager), ACQUISITION_RETRY_DELAY, str(e)))
+            next_acquisition_time = self._server_clock.server_now() + ACQUISITION_RETRY_DELAY
+
+        self._scheduler.reschedule(time_frame_manager, next_acquisition_time)
+        self._wake_up_event.set()
+
+    async def _shutdown(self):
+        """Cancel the dispatcher and all the running acquisitions then stop the event loop"""
+        tasks = [task for task in asyncio.all_tasks(self._loop) if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop.stop()
+
+    def _worker(self):
+        """Threaded function that runs the event loop"""
+        asyncio.set_event_loop(self._loop)
+        self._loop.create_task(self._dispatch())
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+        logging.info("Ending async acquisition engine thread")
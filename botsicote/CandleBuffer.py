@@ -0,0 +1,215 @@
+import numpy as np
+
+from Utils import to_data_list
+
+"""Columns of the candle buffer and their type"""
+COLUMNS = [
+    ("id", np.int64),
+    ("time", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64),
+    ("vwap", np.float64),
+    ("volume", np.float64),
+    ("count", np.int64)
+]
+
+
+class CandleBuffer(object):
+    """
+    Columnar candle buffer keyed by candle identifier.
+    The candles are kept sorted by identifier in contiguous arrays (one per column) of twice the buffer size: a new
+    candle is appended, an already known one (the in progress candle returned again by kraken) is replaced in place
+    and the oldest candles are dropped by moving the start of the window. The window is copied back to the beginning
+    of the arrays when their end is reached, which only happens once every size appends.
+    The columns published to the readers are shared copy-on-write: they are views of the arrays, which are reallocated
+    before a row visible in a published view is modified
+    """
+
+    def __init__(self, size):
+        """
+        Candle buffer constructor
+
+        :param size: Max number of candles kept in the buffer
+        :type size: int
+        """
+        self._size = size
+        self._columns = {name: np.zeros(2 * size, dtype=dtype) for name, dtype in COLUMNS}
+        self._start = 0  # Index of the first candle of the window
+        self._end = 0  # Index following the last candle of the window
+        self._shared_end = 0  # Index following the last row visible in the published columns
+
+    def __len__(self):
+        return self._end - self._start
+
+    def upsert(self, data_list):
+        """
+        Insert new candles and replace the known ones
+
+        :param data_list: The candles (formatted raw data list)
+        :type data_list: list
+        :return: Index in the window of the first inserted or replaced candle (the window length if nothing changed)
+        :rtype: int
+        """
+        first_changed_identifier = None
+
+        for data in sorted(data_list, key=lambda k: k["id"]):
+            if self._end > self._start and data["id"] <= self._columns["id"][self._end - 1]:
+                # Known or late candle: its position is looked for by dichotomy
+                index = self._start + int(np.searchsorted(self._columns["id"][self._start:self._end], data["id"]))
+                if index < self._shared_end:
+                    index = self._compact(index)  # The row is visible in published columns: copied before the write
+                if self._columns["id"][index] != data["id"]:
+                    if index == self._start and len(self) >= self._size:
+                        continue  # Older than the whole full window
+                    index = self._insert_row(index)
+            else:
+                if self._end == len(self._columns["id"]):
+                    self._compact()
+                index = self._end
+                self._end += 1
+
+            for name, _ in COLUMNS:
+                self._columns[name][index] = data[name]
+
+            if len(self) > self._size:
+                self._start += 1
+
+            if first_changed_identifier is None:
+                first_changed_identifier = data["id"]
+
+        if first_changed_identifier is None:
+            return len(self)
+
+        return int(np.searchsorted(self._columns["id"][self._start:self._end], first_changed_identifier))
+
+    def upsert_columns(self, columns):
+        """
+        Insert new candles and replace the known ones, given as columns. The rows are copied by slices: it's the bulk
+        path of the OHLC api responses, their candles are new ones following the known ones or the last known ones
+
+        :param columns: The values of each column by column name, sorted by candle identifier asc
+        :type columns: dict[str, numpy.ndarray]
+        :return: Index in the window of the first inserted or replaced candle (the window length if nothing changed)
+        :rtype: int
+        """
+        identifiers = columns["id"]
+
+        if len(identifiers) == 0:
+            return len(self)
+
+        window_identifiers = self._columns["id"][self._start:self._end]
+        known_count = int(np.searchsorted(identifiers, window_identifiers[-1], side="right")) \
+            if self._end > self._start else 0
+        indexes = self._start + np.searchsorted(window_identifiers, identifiers[:known_count])
+
+        if np.any(identifiers[1:] <= identifiers[:-1]) or np.any(indexes >= self._end) \
+                or np.any(self._columns["id"][np.minimum(indexes, self._end - 1)] != identifiers[:known_count]):
+            # Unsorted or late candles (rare): inserted one by one
+            return self.upsert(to_data_list(columns))
+
+        if known_count > 0:
+            if indexes[0] < self._shared_end:
+                # Rows visible in published columns: copied before the write
+                indexes = indexes + (self._compact(int(indexes[0])) - indexes[0])
+            for name, _ in COLUMNS:
+                self._columns[name][indexes] = columns[name][:known_count]
+
+        # Only the last size new candles can be kept in the window
+        first_new_row = max(known_count, len(identifiers) - self._size)
+        new_count = len(identifiers) - first_new_row
+
+        if self._end + new_count > len(self._columns["id"]):
+            self._compact()
+
+        for name, _ in COLUMNS:
+            self._columns[name][self._end:self._end + new_count] = columns[name][first_new_row:]
+        self._end += new_count
+        self._start = max(self._start, self._end - self._size)
+
+        return int(np.searchsorted(self._columns["id"][self._start:self._end], identifiers[0]))
+
+    def get_column(self, name, count=None):
+        """
+        Get the values of a column, sorted by candle identifier asc
+
+        :param name: Name of the column (id, time, open, high, low, close, vwap, volume, count)
+        :type name: str
+        :param count: Number of last candles to get (all if None)
+        :type count: int
+        :return: A read only view of the column values
+        :rtype: numpy.ndarray
+        """
+        start = self._start if count is None else max(self._start, self._end - count)
+        view = self._columns[name][start:self._end]
+        view.flags.writeable = False
+        return view
+
+    def get_columns(self):
+        """
+        Publish the columns of the window: they won't be modified, the rows are copied before being changed
+
+        :return: A read only view of the values of each column by column name
+        :rtype: dict[str, numpy.ndarray]
+        """
+        self._shared_end = self._end
+        return {name: self.get_column(name) for name, _ in COLUMNS}
+
+    def get_row(self, index):
+        """
+        Get a candle of the window
+
+        :param index: Index of the candle in the window (negative values count from the end)
+        :type index: int
+        :return: The candle (formatted raw data)
+        :rtype: dict
+        """
+        position = (self._end if index < 0 else self._start) + index
+        return {name: self._columns[name][position].item() for name, _ in COLUMNS}
+
+    def _insert_row(self, index):
+        """
+        Make room for a late candle before the candle at index (rare, kraken returns the candles in order)
+
+        :param index: Array index of the new candle
+        :type index: int
+        :return: Array index of the new candle (the arrays may have been compacted)
+        :rtype: int
+        """
+        if self._end == len(self._columns["id"]):
+            index = self._compact(index)
+
+        for name, _ in COLUMNS:
+            self._columns[name][index + 1:self._end + 1] = self._columns[name][index:self._end].copy()
+        self._end += 1
+
+        return index
+
+    def _compact(self, index=None):
+        """
+        Copy the window back to the beginning of the arrays. New arrays are allocated if rows of the current ones are
+        visible in published columns
+
+        :param index: An array index of the window
+        :type index: int
+        :return: The array index after the copy (None if no index was given)
+        :rtype: int
+        """
+        length = len(self)
+
+        if self._shared_end > 0:
+            columns = {name: np.zeros(2 * self._size, dtype=dtype) for name, dtype in COLUMNS}
+        else:
+            columns = self._columns
+
+        for name, _ in COLUMNS:
+            columns[name][:length] = self._columns[name][self._start:self._end].copy()
+
+        self._columns = columns
+        self._shared_end = 0
+        index = None if index is None else index - self._start
+        self._start = 0
+        self._end = length
+
+        return index
@@ -0,0 +1,78 @@
+class CandleResampler(object):
+    """Build the candles of a time frame from the candles of a finer time frame"""
+
+    def __init__(self, source_time_frame_length, time_frame_length):
+        """
+        Candle resampler constructor
+
+        :param source_time_frame_length: The length of the source time frame in minute
+        :type source_time_frame_length: int
+        :param time_frame_length: The length of the time frame to build in minute (multiple of the source one)
+        :type time_frame_length: int
+        """
+        self._source_time_step = source_time_frame_length * 60
+        self._time_step = time_frame_length * 60
+        self._first_bucket_time = None  # Time of the first candle for which all the source candles are known
+        self._pending = {}  # Source candles of the candle that can still be updated, by time
+
+    def resample(self, data_list):
+        """
+        Build the candles impacted by new source candles.
+        The last built candle is the in progress one, it will be built again with the next source candles
+
+        :param data_list: New source candles (formatted raw data list)
+        :type data_list: list
+        :return: The built candles (formatted raw data list)
+        :rtype: list
+        """
+        for data in data_list:
+            self._pending[data["time"]] = data
+
+        if len(self._pending) == 0:
+            return []
+
+        if self._first_bucket_time is None:
+            first_time = min(self._pending.keys())
+            # The first candle is dropped if the source data doesn't start at its beginning
+            self._first_bucket_time = -(-first_time // self._time_step) * self._time_step
+
+        buckets = {}
+        for data_time in sorted(self._pending.keys()):
+            if data_time >= self._first_bucket_time:
+                buckets.setdefault(data_time // self._time_step * self._time_step, []).append(self._pending[data_time])
+
+        if len(buckets) == 0:
+            return []
+
+        # Only the source candles of the last (in progress) candle are still needed
+        last_bucket_time = max(buckets.keys())
+        self._pending = {data_time: data for data_time, data in self._pending.items() if data_time >= last_bucket_time}
+
+        return [self._build_candle(bucket_time, buckets[bucket_time]) for bucket_time in sorted(buckets.keys())]
+
+    def _build_candle(self, bucket_time, source_data_list):
+        """
+        Build a candle from its source candles
+
+        :param bucket_time: Time of the candle to build
+        :type bucket_time: int
+        :param source_data_list: Source candles sorted by time asc
+        :type source_data_list: list
+        :return: The built candle (formatted raw data)
+        :rtype: dict
+        """
+        volume = sum([data["volume"] for data in source_data_list])
+        close_price = source_data_list[-1]["close"]
+
+        return {
+            "id": int(bucket_time / self._time_step),
+            "time": bucket_time,
+            "open": source_data_list[0]["open"],
+            "high": max([data["high"] for data in source_data_list]),
+            "low": min([data["low"] for data in source_data_list]),
+            "close": close_price,
+            "vwap": sum([data["vwap"] * data["volume"] for data in source_data_list]) / volume if volume > 0
+            else close_price,
+            "volume": volume,
+            "count": sum([data["count"] for data in source_data_list])
+        }
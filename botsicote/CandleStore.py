@@ -0,0 +1,181 @@
+import logging
+import os
+import shutil
+import struct
+import threading
+
+from exceptions.BotsicoteException import BotsicoteException
+
+"""Record of a candle: time, open, high, low, close, vwap, volume and count"""
+RECORD_STRUCT = struct.Struct("<q6dq")
+
+
+class CandleStore(object):
+    """
+    Persistent candle store of a pair and time frame.
+    Candles are stored as fixed size binary records in an append only file sorted by time. The last candle (the in
+    progress one) is overwritten in place when it's updated
+    """
+
+    def __init__(self, path, time_frame_length):
+        """
+        Candle store constructor
+
+        :param path: Path of the store file (created if it doesn't exist)
+        :type path: str
+        :param time_frame_length: The length of the time frame of the candles in minute
+        :type time_frame_length: int
+        """
+        self._path = path
+        self._time_step = time_frame_length * 60
+        self._lock = threading.Lock()
+        self._first_time = None
+        self._last_time = None
+
+        if not os.path.isfile(self._path):
+            open(self._path, "wb").close()
+
+        with open(self._path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size % RECORD_STRUCT.size != 0:
+                # An interrupted write left a partial record
+                logging.warning("Dropping a partial record at the end of the candle store %s" % self._path)
+                size -= size % RECORD_STRUCT.size
+                f.truncate(size)
+            if size > 0:
+                self._first_time = RECORD_STRUCT.unpack(f.read(RECORD_STRUCT.size))[0]
+                f.seek(size - RECORD_STRUCT.size)
+                self._last_time = RECORD_STRUCT.unpack(f.read(RECORD_STRUCT.size))[0]
+
+    @staticmethod
+    def get_path(directory, pair, time_frame_length):
+        """
+        Return the path of the store file of a pair and time frame
+
+        :param directory: Directory of the store files
+        :type directory: str
+        :param pair: The pair
+        :type pair: str
+        :param time_frame_length: The length of the time frame in minute
+        :type time_frame_length: int
+        :return: The path of the store file
+        :rtype: str
+        """
+        return os.path.join(directory, "%s_%d.ohlc" % (pair, time_frame_length))
+
+    def get_file_path(self):
+        """
+        Return the path of the store file
+
+        :return: The path of the store file
+        :rtype: str
+        """
+        return self._path
+
+    def get_first_time(self):
+        """
+        Return the time of the first stored candle
+
+        :return: The time of the first stored candle, None if the store is empty
+        :rtype: int
+        """
+        return self._first_time
+
+    def get_last_time(self):
+        """
+        Return the time of the last stored candle
+
+        :return: The time of the last stored candle, None if the store is empty
+        :rtype: int
+        """
+        return self._last_time
+
+    def load(self, max_count=None, since=None):
+        """
+        Load the last stored candles
+
+        :param max_count: Max number of candles to load (all if None)
+        :type max_count: int
+        :param since: Only load the candles whose time is greater than or equal to since (all if None)
+        :type since: int
+        :return: The candles (formatted raw data list) sorted by time asc
+        :rtype: list
+        """
+        with self._lock, open(self._path, "rb") as f:
+            record_count = os.fstat(f.fileno()).st_size // RECORD_STRUCT.size
+            first_record = record_count - max_count if max_count is not None and record_count > max_count else 0
+            f.seek(first_record * RECORD_STRUCT.size)
+            content = f.read((record_count - first_record) * RECORD_STRUCT.size)
+
+        return [self._to_data(record) for record in RECORD_STRUCT.iter_unpack(content)
+                if since is None or record[0] >= since]
+
+    def append(self, data_list):
+        """
+        Store new candles. Candles older than the last stored one are ignored, the last stored one is overwritten if
+        an updated version of it is given
+
+        :param data_list: The candles (formatted raw data list)
+        :type data_list: list
+        """
+        with self._lock, open(self._path, "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            for data in sorted(data_list, key=lambda k: k["time"]):
+                if self._last_time is not None and data["time"] < self._last_time:
+                    continue
+                if data["time"] == self._last_time:
+                    f.seek(-RECORD_STRUCT.size, os.SEEK_END)
+                f.write(RECORD_STRUCT.pack(data["time"], data["open"], data["high"], data["low"], data["close"],
+                                           data["vwap"], data["volume"], data["count"]))
+                self._last_time = data["time"]
+                if self._first_time is None:
+                    self._first_time = data["time"]
+
+    def prepend(self, older_candle_store):
+        """
+        Store the candles of an other store before the stored ones: a new file made of the other store candles
+        followed by the stored ones replaces the store file. The other store is left unchanged
+
+        :param older_candle_store: Store whose candles are all older than the first stored one
+        :type older_candle_store: CandleStore
+        """
+        if older_candle_store.get_last_time() is None:
+            return
+
+        if self._first_time is not None and older_candle_store.get_last_time() >= self._first_time:
+            raise BotsicoteException("The candles of %s aren't all older than the first candle of %s"
+                                     % (older_candle_store.get_file_path(), self._path))
+
+        merged_path = "%s.merged" % self._path
+        with self._lock:
+            with open(merged_path, "wb") as merged, older_candle_store._lock, \
+                    open(older_candle_store.get_file_path(), "rb") as older, open(self._path, "rb") as f:
+                shutil.copyfileobj(older, merged)
+                shutil.copyfileobj(f, merged)
+            # The store file is only replaced once the merged file is complete
+            os.replace(merged_path, self._path)
+
+            if self._last_time is None:
+                self._last_time = older_candle_store.get_last_time()
+            self._first_time = older_candle_store.get_first_time()
+
+    def _to_data(self, record):
+        """
+        Convert a stored record to a candle
+
+        :param record: The unpacked record
+        :type record: tuple
+        :return: The candle (formatted raw data)
+        :rtype: dict
+        """
+        return {
+            "id": int(record[0] / self._time_step),
+            "time": record[0],
+            "open": record[1],
+            "high": record[2],
+            "low": record[3],
+            "close": record[4],
+            "vwap": record[5],
+            "volume": record[6],
+            "count": record[7]
+        }
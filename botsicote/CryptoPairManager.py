@@ -1,4 +1,5 @@
 import logging
+from CandleStore import CandleStore
 from exceptions.BotsicoteException import BotsicoteException
 from TimeFrameManager import TimeFrameManager
 
@@ -9,7 +10,8 @@ SUPPORTED_TIME_FRAME_LENGTH = [1, 5, 15, 30, 60, 240, 1440, 10080, 21600]
 class CryptoPairManager(object):
     """Crypto pair manager"""
 
-    def __init__(self, crypto, currency, krakenex_instance, call_rate_manager, lock, pair2=None):
+    def __init__(self, crypto, currency, kraken_api_client, server_clock, pair2=None,
+                 acquisition_engine=None, derive_time_frames=False, candle_store_directory=None):
         """
         Crypto pair manager constructor
 
@@ -17,20 +19,28 @@ class CryptoPairManager(object):
         :type crypto: str
         :param currency: Name of the currency to trade with
         :type currency: str
-        :param krakenex_instance: Instance of krakenex
-        :type krakenex_instance: Krakenex
-        :param call_rate_manager: The kraken api call rate manager
-        :param lock: The threading lock
-        :type lock: threading.Lock
+        :param kraken_api_client: The kraken api client
+        :type kraken_api_client: KrakenAPIClient
+        :param server_clock: The kraken server clock
+        :type server_clock: ServerClock
         :param pair2: Name of the key to retrieve data after an OHLC api call (default Xcrypto followed by Zcurrency)
         :type pair2: str
+        :param acquisition_engine: Engine running the data acquisition (each time frame uses its own thread if None)
+        :type acquisition_engine: AsyncAcquisitionEngine
+        :param derive_time_frames: Build the time frames data from the finest managed time frame instead of retrieving
+                                   each of them from the kraken api
+        :type derive_time_frames: bool
+        :param candle_store_directory: Directory where the candles are persisted (not persisted if None)
+        :type candle_store_directory: str
         """
         self.pair = "%s%s" % (crypto, currency)
         self.pair2 = "X%sZ%s" % (crypto, currency) if pair2 is None else pair2
         self._time_frames = {}
-        self._k = krakenex_instance
-        self._call_rate_manager = call_rate_manager
-        self._lock = lock
+        self._kraken_api_client = kraken_api_client
+        self._server_clock = server_clock
+        self._acquisition_engine = acquisition_engine
+        self._derive_time_frames = derive_time_frames
+        self._candle_store_directory = candle_store_directory
         logging.info("New crypto pair manager created! Pair: %s" % self.pair)
 
     def add_time_frame(self, time_frame_length):
@@ -48,8 +58,14 @@ class CryptoPairManager(object):
             logging.warning("Time frame length (%d) is already managed for pair %s" % (time_frame_length, self.pair))
             return
 
-        self._time_frames[time_frame_length] = TimeFrameManager(time_frame_length, self.pair, self.pair2, self._k,
-                                                                self._call_rate_manager, self._lock)
+        candle_store = None
+        if self._candle_store_directory is not None:
+            candle_store = CandleStore(CandleStore.get_path(self._candle_store_directory, self.pair, time_frame_length),
+                                       time_frame_length)
+
+        self._time_frames[time_frame_length] = TimeFrameManager(time_frame_length, self.pair, self.pair2,
+                                                                self._kraken_api_client, self._server_clock,
+                                                                self._acquisition_engine, candle_store)
 
     def start_time_frame_acq(self, time_frame_length):
         """
@@ -62,6 +78,11 @@ class CryptoPairManager(object):
             raise BotsicoteException("Trying to start a non existing time frame %d for pair %s"
                                      % (time_frame_length, self.pair))
 
+        if self._derive_time_frames:
+            source_time_frame_length = self._get_source_time_frame_length(time_frame_length)
+            if source_time_frame_length is not None:
+                self._time_frames[time_frame_length].derive_from(self._time_frames[source_time_frame_length])
+
         self._time_frames[time_frame_length].start()
 
     def start_all_time_frame_acq(self):
@@ -100,3 +121,17 @@ class CryptoPairManager(object):
                                      % (time_frame_length, self.pair))
 
         return self._time_frames[time_frame_length]
+
+    def _get_source_time_frame_length(self, time_frame_length):
+        """
+        Return the finest managed time frame from which the given time frame can be derived
+
+        :param time_frame_length: The given time frame
+        :type time_frame_length: int
+        :return: The source time frame length, None if the given time frame can't be derived
+        :rtype: int
+        """
+        source_time_frame_lengths = [length for length in self._time_frames.keys()
+                                     if length < time_frame_length and time_frame_length % length == 0]
+
+        return min(source_time_frame_lengths) if len(source_time_frame_lengths) > 0 else None
@@ -0,0 +1,166 @@
+import heapq
+import itertools
+import threading
+
+
+class FetchScheduler(object):
+    """
+    Central fetch scheduler.
+    It knows the next acquisition time of every registered time frame manager and hands out the due ones, the most
+    time sensitive first (earliest due time then shortest time frame), never more than the api call budget allows
+    """
+
+    def __init__(self, call_rate_manager):
+        """
+        Fetch scheduler constructor
+
+        :param call_rate_manager: The kraken api call rate manager
+        :type call_rate_manager: KrakenAPICallRateManager
+        """
+        self._call_rate_manager = call_rate_manager
+        self._heap = []  # Tuples of due time, time frame length, sequence number and time frame manager
+        self._due_times = {}  # Last scheduled due time of each registered time frame manager
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def register(self, time_frame_manager, due_time):
+        """
+        Register a time frame manager
+
+        :param time_frame_manager: The time frame manager to schedule
+        :type time_frame_manager: TimeFrameManager
+        :param due_time: Server time of its first acquisition
+        :type due_time: float
+        """
+        with self._lock:
+            if time_frame_manager not in self._due_times:
+                self._push(time_frame_manager, due_time)
+
+    def unregister(self, time_frame_manager):
+        """
+        Unregister a time frame manager (its heap entries are dropped when they reach the top of the heap)
+
+        :param time_frame_manager: The time frame manager to unschedule
+        :type time_frame_manager: TimeFrameManager
+        """
+        with self._lock:
+            self._due_times.pop(time_frame_manager, None)
+
+    def reschedule(self, time_frame_manager, due_time):
+        """
+        Schedule the next acquisition of a registered time frame manager handed out by pop_due
+
+        :param time_frame_manager: The time frame manager to schedule
+        :type time_frame_manager: TimeFrameManager
+        :param due_time: Server time of its next acquisition (the time frame manager is unregistered if None)
+        :type due_time: float
+        """
+        with self._lock:
+            if time_frame_manager not in self._due_times:
+                return
+            if due_time is None:
+                del self._due_times[time_frame_manager]
+            else:
+                self._push(time_frame_manager, due_time)
+
+    def pop_due(self, now, max_count):
+        """
+        Hand out the time frame managers whose acquisition is due
+
+        :param now: Current server time
+        :type now: float
+        :param max_count: Max number of time frame managers to hand out
+        :type max_count: int
+        :return: The due time frame managers, most time sensitive first
+        :rtype: list[TimeFrameManager]
+        """
+        due_time_frame_managers = []
+
+        with self._lock:
+            while len(due_time_frame_managers) < max_count and self._drop_stale_entries() \
+                    and self._heap[0][0] <= now:
+                due_time_frame_managers.append(heapq.heappop(self._heap)[3])
+
+        return due_time_frame_managers
+
+    def get_next_due_time(self):
+        """
+        Return the server time of the next scheduled acquisition
+
+        :return: The next due time, None if nothing is scheduled
+        :rtype: float
+        """
+        with self._lock:
+            return self._heap[0][0] if self._drop_stale_entries() else None
+
+    def get_schedule(self, now, horizon_sec):
+        """
+        Return the planned acquisitions of the next seconds, assuming every acquisition gets its new candle
+
+        :param now: Current server time
+        :type now: float
+        :param horizon_sec: Number of seconds to plan
+        :type horizon_sec: int
+        :return: Tuples of due time, pair and time frame length sorted by due time
+        :rtype: list[tuple]
+        """
+        schedule = []
+
+        with self._lock:
+            due_times = dict(self._due_times)
+
+        for time_frame_manager, due_time in due_times.items():
+            period = time_frame_manager.get_time_frame_length() * 60
+            while due_time <= now + horizon_sec:
+                schedule.append((due_time, time_frame_manager.get_pair(), time_frame_manager.get_time_frame_length()))
+                if time_frame_manager.is_derived():
+                    break
+                due_time += period
+
+        return sorted(schedule)
+
+    def get_load_report(self):
+        """
+        Compare the api calls needed by the registered time frame managers with the api call rate limit
+
+        :return: Dict containing the needed api calls per minute, the max sustainable api calls per minute and
+                 whether the needed calls fit the limit
+        :rtype: dict
+        """
+        with self._lock:
+            time_frame_managers = list(self._due_times.keys())
+
+        needed_calls_per_minute = sum([1.0 / time_frame_manager.get_time_frame_length()
+                                       for time_frame_manager in time_frame_managers
+                                       if not time_frame_manager.is_derived()])
+        max_calls_per_minute = 60.0 / self._call_rate_manager.get_decrease_period()
+
+        return {
+            "needed_calls_per_minute": needed_calls_per_minute,
+            "max_calls_per_minute": max_calls_per_minute,
+            "fits": needed_calls_per_minute <= max_calls_per_minute
+        }
+
+    def _push(self, time_frame_manager, due_time):
+        """
+        Push a time frame manager in the heap (the lock must be held)
+
+        :param time_frame_manager: The time frame manager to schedule
+        :type time_frame_manager: TimeFrameManager
+        :param due_time: Server time of its next acquisition
+        :type due_time: float
+        """
+        self._due_times[time_frame_manager] = due_time
+        heapq.heappush(self._heap, (due_time, time_frame_manager.get_time_frame_length(), next(self._sequence),
+                                    time_frame_manager))
+
+    def _drop_stale_entries(self):
+        """
+        Drop the heap top entries of unregistered or rescheduled time frame managers (the lock must be held)
+
+        :return: True if the heap still contains entries, False otherwise
+        :rtype: bool
+        """
+        while len(self._heap) > 0 and self._due_times.get(self._heap[0][3]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return len(self._heap) > 0
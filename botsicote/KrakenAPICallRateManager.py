@@ -1,11 +1,18 @@
+import heapq
+import itertools
 import threading
 import time
 import logging
+from entities.ApiCallPriority import ApiCallPriorityEnum
 from exceptions.KrakenAPICallRateException import KrakenAPICallRateException
 
 
 class KrakenAPICallRateManager(object):
-    """Kraken api call rate manager"""
+    """
+    Kraken api call rate manager.
+    The api call counter is a token bucket: it is increased by the cost of each call and decreased by 1 every
+    decrease period. Its current value is computed from the time elapsed since its last change
+    """
 
     def __init__(self, tier_level):
         """
@@ -25,39 +32,124 @@ class KrakenAPICallRateManager(object):
                                              "api" % self._tier_level)
 
         self._api_call_counter = 0
-        self._t = threading.Thread(target=self._worker)
-        self._t_run = True
-        self._lock = threading.RLock()
+        self._api_call_counter_time = time.monotonic()  # Time of the last api call counter change
+        self._condition = threading.Condition()
+        self._waiting_calls = []  # Heap of (priority, sequence number) of the calls waiting for the api call counter
+        self._sequence = itertools.count()
 
         logging.info("KrakenAPICallRateManager initialized for tier level %s." % self._tier_level)
         logging.info("Api call rate counter is initialized at 0. Max api call counter is %d."
                      % self._max_api_call_counter)
         logging.info("Api call counter is decreased by 1 every %s sec" % self._decrease_counter_after_sec)
 
+    def acquire(self, cost=1, priority=ApiCallPriorityEnum.MARKET_DATA, timeout=None):
+        """
+        Wait until the api call counter can be increased by the cost of a call then increase it.
+        Waiting calls are served by priority then by arrival order
+
+        :param cost: Cost of the api call
+        :type cost: int
+        :param priority: Priority of the api call
+        :type priority: ApiCallPriorityEnum
+        :param timeout: Max number of seconds to wait (wait forever if None)
+        :type timeout: float
+        """
+        if cost > self._max_api_call_counter:
+            raise KrakenAPICallRateException("Api call cost (%d) is greater than the max api call counter (%d)"
+                                             % (cost, self._max_api_call_counter))
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._condition:
+            waiting_call = (priority.value, next(self._sequence))
+            heapq.heappush(self._waiting_calls, waiting_call)
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    api_call_counter = self._get_api_call_counter(now)
+                    wait_time = None  # Wait for the calls before this one
+
+                    if self._waiting_calls[0] == waiting_call:
+                        if api_call_counter + cost <= self._max_api_call_counter:
+                            self._api_call_counter = api_call_counter + cost
+                            self._api_call_counter_time = now
+                            return
+                        # Wait until the api call counter is decreased enough
+                        wait_time = (api_call_counter + cost - self._max_api_call_counter) * \
+                            self._decrease_counter_after_sec
+
+                    if deadline is not None:
+                        if now >= deadline:
+                            raise KrakenAPICallRateException("Max api call counter reached, timeout expired!")
+                        wait_time = deadline - now if wait_time is None else min(wait_time, deadline - now)
+
+                    self._condition.wait(wait_time)
+            finally:
+                self._waiting_calls.remove(waiting_call)
+                heapq.heapify(self._waiting_calls)
+                self._condition.notify_all()
+
     def increase_api_call_rate(self, number_to_add):
         """
-        Increase the api call counter by a number
+        Increase the api call counter by a number without waiting
         :param number_to_add: Number to add to the the api call counter
         :type number_to_add: int
         """
-        with self._lock:
-            if self._api_call_counter + number_to_add > self._max_api_call_counter:
+        with self._condition:
+            now = time.monotonic()
+            api_call_counter = self._get_api_call_counter(now)
+            if len(self._waiting_calls) > 0 or api_call_counter + number_to_add > self._max_api_call_counter:
                 raise KrakenAPICallRateException("Max api call counter reached!")
             else:
-                self._api_call_counter += number_to_add
-
-    def start(self):
-        """Starts the api call counter computer (worker)"""
-        self._t.start()
-
-    def stop(self):
-        """Stops the api call counter computer (worker)"""
-        self._t_run = False
-
-    def _worker(self):
-        """Threaded function that decrease the api call counter after an amount of time"""
-        while self._t_run:
-            time.sleep(self._decrease_counter_after_sec)
-            with self._lock:
-                if self._api_call_counter > 0:
-                    self._api_call_counter -= 1
+                self._api_call_counter = api_call_counter + number_to_add
+                self._api_call_counter_time = now
+
+    def report_rate_limit_exceeded(self):
+        """Set the api call counter to its max value when kraken tells the api call rate limit is exceeded"""
+        with self._condition:
+            self._api_call_counter = self._max_api_call_counter
+            self._api_call_counter_time = time.monotonic()
+            self._condition.notify_all()
+
+    def get_available_budget(self):
+        """
+        Return the number of api calls (of cost 1) that can be made right now without waiting
+
+        :return: The available api call budget
+        :rtype: int
+        """
+        with self._condition:
+            if len(self._waiting_calls) > 0:
+                return 0
+            return int(self._max_api_call_counter - self._get_api_call_counter(time.monotonic()))
+
+    def get_max_api_call_counter(self):
+        """
+        Return the max api call counter
+
+        :return: The max api call counter
+        :rtype: int
+        """
+        return self._max_api_call_counter
+
+    def get_decrease_period(self):
+        """
+        Return the number of seconds after which the api call counter is decreased by 1
+
+        :return: The decrease period of the api call counter
+        :rtype: int
+        """
+        return self._decrease_counter_after_sec
+
+    def _get_api_call_counter(self, now):
+        """
+        Compute the api call counter value at a given time
+
+        :param now: The given time (monotonic clock)
+        :type now: float
+        :return: The api call counter value
+        :rtype: float
+        """
+        elapsed_time = now - self._api_call_counter_time
+        return max(0.0, self._api_call_counter - elapsed_time / self._decrease_counter_after_sec)
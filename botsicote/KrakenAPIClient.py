@@ -0,0 +1,217 @@
+import logging
+import random
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, RequestException
+from urllib3.exceptions import NewConnectionError
+
+from entities.ApiCallPriority import ApiCallPriorityEnum
+from exceptions.KrakenAPIException import KrakenAPIException
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_POOL_SIZE = 10
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_MAX_SEC = 30
+
+"""Kraken errors worth trying again: the service or the rate limit will be available again later"""
+RETRYABLE_ERRORS = [
+    "EAPI:Rate limit exceeded",
+    "EOrder:Rate limit exceeded",
+    "EGeneral:Temporary lockout",
+    "EService:Unavailable",
+    "EService:Busy",
+    "EService:Market in cancel_only mode",
+    "EService:Market in post_only mode",
+    "EService:Deadline elapsed",
+    "EGeneral:Internal error"
+]
+
+"""Kraken errors of the calls rejected before being processed: they are the only ones a private call is retried on"""
+RATE_LIMIT_ERRORS = ["EAPI:Rate limit exceeded", "EOrder:Rate limit exceeded", "EGeneral:Temporary lockout"]
+
+"""Private kraken api methods without side effect, retried on every transient failure like the public ones"""
+READ_ONLY_PRIVATE_METHODS = [
+    "Balance",
+    "BalanceEx",
+    "TradeBalance",
+    "OpenOrders",
+    "ClosedOrders",
+    "QueryOrders",
+    "TradesHistory",
+    "QueryTrades",
+    "OpenPositions",
+    "Ledgers",
+    "QueryLedgers",
+    "TradeVolume"
+]
+
+
+class KrakenAPIClient(object):
+    """
+    Kraken api client.
+    Every kraken api call goes through it: it waits for the api call rate budget, uses a pooled keep-alive http
+    session with a timeout and retries the transient failures with an exponential backoff with jitter.
+    The private calls with side effects (orders...) are only retried when they surely didn't reach kraken (connection
+    failures) or were rejected by its rate limit: a timed out or failed order may have been placed anyway
+    """
+
+    def __init__(self, krakenex_instance, call_rate_manager, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 pool_size=DEFAULT_POOL_SIZE):
+        """
+        Kraken api client constructor
+
+        :param krakenex_instance: Instance of krakenex
+        :type krakenex_instance: Krakenex
+        :param call_rate_manager: The kraken api call rate manager
+        :type call_rate_manager: KrakenAPICallRateManager
+        :param timeout: Number of seconds to wait for a kraken api response
+        :type timeout: float
+        :param max_retries: Max number of times a failed call is made again
+        :type max_retries: int
+        :param pool_size: Max number of kept alive connections to the kraken api
+        :type pool_size: int
+        """
+        self._k = krakenex_instance
+        self._call_rate_manager = call_rate_manager
+        self._timeout = timeout
+        self._max_retries = max_retries
+
+        if getattr(self._k, "session", None) is not None:
+            # The krakenex session is shared by every thread, its connection pool is sized accordingly
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            self._k.session.mount("https://", adapter)
+            self._k.session.mount("http://", adapter)
+
+    def query_public(self, method, data=None, priority=ApiCallPriorityEnum.MARKET_DATA, cost=1):
+        """
+        Perform a public kraken api call
+
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param priority: Priority of the api call
+        :type priority: ApiCallPriorityEnum
+        :param cost: Cost of the api call
+        :type cost: int
+        :return: The kraken api response
+        :rtype: dict
+        """
+        return self._query(self._k.query_public, method, data, priority, cost, True)
+
+    def query_private(self, method, data=None, priority=ApiCallPriorityEnum.ORDER, cost=1):
+        """
+        Perform a private kraken api call. The READ_ONLY_PRIVATE_METHODS are retried on every transient failure, the
+        other methods only on connection failures and rate limit errors
+
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param priority: Priority of the api call
+        :type priority: ApiCallPriorityEnum
+        :param cost: Cost of the api call
+        :type cost: int
+        :return: The kraken api response
+        :rtype: dict
+        """
+        return self._query(self._k.query_private, method, data, priority, cost,
+                           method in READ_ONLY_PRIVATE_METHODS)
+
+    def _query(self, query_function, method, data, priority, cost, idempotent):
+        """
+        Perform a kraken api call, retrying the transient failures
+
+        :param query_function: Krakenex query function
+        :type query_function: function
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param priority: Priority of the api call
+        :type priority: ApiCallPriorityEnum
+        :param cost: Cost of the api call
+        :type cost: int
+        :param idempotent: True if making the call again is harmless, otherwise it's only retried if it surely wasn't
+                           processed by kraken
+        :type idempotent: bool
+        :return: The kraken api response
+        :rtype: dict
+        """
+        attempt = 0
+
+        while True:
+            self._call_rate_manager.acquire(cost, priority)
+
+            try:
+                return self._check_response(method, query_function(method, data=data, timeout=self._timeout))
+            except RequestException as request_err:
+                api_err = KrakenAPIException("Http request %s failed. Details: %s" % (method, str(request_err)),
+                                             retryable=idempotent or not KrakenAPIClient._may_be_sent(request_err))
+            except KrakenAPIException as kraken_api_err:
+                api_err = kraken_api_err
+                if not idempotent:
+                    api_err.retryable = len(api_err.errors) > 0 and all(
+                        [any([error.startswith(rate_limit_error) for rate_limit_error in RATE_LIMIT_ERRORS])
+                         for error in api_err.errors])
+
+            if not api_err.retryable or attempt >= self._max_retries:
+                raise api_err
+
+            # Full jitter: wait a random time between 0 and the exponential backoff
+            attempt += 1
+            backoff = random.uniform(0, min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2 ** attempt))
+            logging.warning("%s Trying again in %.2f sec (attempt %d/%d)"
+                            % (api_err.message, backoff, attempt, self._max_retries))
+            time.sleep(backoff)
+
+    @staticmethod
+    def _may_be_sent(request_err):
+        """
+        Tell whether a failed http request may have reached kraken
+
+        :param request_err: The http request exception
+        :type request_err: RequestException
+        :return: False if the connection to kraken couldn't be made, True otherwise
+        :rtype: bool
+        """
+        if isinstance(request_err, ConnectTimeout):
+            return False
+
+        if isinstance(request_err, ConnectionError) and len(request_err.args) > 0:
+            # The urllib3 error (max retry error) tells why the connection failed
+            return not isinstance(getattr(request_err.args[0], "reason", None), NewConnectionError)
+
+        return True
+
+    def _check_response(self, method, response):
+        """
+        Check the errors of a kraken api response
+
+        :param method: Kraken api method name
+        :type method: str
+        :param response: The kraken api response
+        :type response: dict
+        :return: The kraken api response if it has no error, raise an exception otherwise
+        :rtype: dict
+        """
+        if not isinstance(response, dict):
+            raise KrakenAPIException("Kraken api %s returned an invalid response: %s" % (method, str(response)),
+                                     retryable=True)
+
+        errors = [error for error in response.get("error", []) if error.startswith("E")]
+
+        if len(errors) > 0:
+            if any([error.startswith(rate_limit_error) for error in errors for rate_limit_error in RATE_LIMIT_ERRORS]):
+                self._call_rate_manager.report_rate_limit_exceeded()
+            retryable = all([any([error.startswith(retryable_error) for retryable_error in RETRYABLE_ERRORS])
+                             for error in errors])
+            raise KrakenAPIException("Kraken api %s returned errors: %s" % (method, ", ".join(errors)), errors,
+                                     retryable)
+
+        if "result" not in response:
+            raise KrakenAPIException("Kraken api %s returned no result" % method, retryable=True)
+
+        return response
@@ -0,0 +1,242 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+from TimeFrameManager import ACQUISITION_RETRY_DELAY
+from Utils import format_stream_ohlc
+from exceptions.BotsicoteException import BotsicoteException
+
+STREAM_URL = "wss://ws.kraken.com"
+RECV_TIMEOUT = 1  # Number of seconds to wait for a message before checking the candle closes
+HEARTBEAT_TIMEOUT = 10  # Number of seconds without any message (kraken sends heartbeats) before reconnecting
+RECONNECT_DELAY = 5
+
+
+class OHLCStream(object):
+    """
+    Streamed data acquisition.
+    The time frame managers registered to it are fed by the kraken OHLC stream: the in progress candle is updated at
+    each trade and a closed event is published at the end of each candle, without using the api call budget. The OHLC
+    api is only called to retrieve the history and to repair the gaps left by a disconnection
+    """
+
+    def __init__(self, server_clock, stream_pairs, url=STREAM_URL, connection_factory=None):
+        """
+        OHLC stream constructor
+
+        :param server_clock: The kraken server clock
+        :type server_clock: ServerClock
+        :param stream_pairs: Name of the pair in the stream by pair name (XBTEUR: XBT/EUR for instance)
+        :type stream_pairs: dict[str, str]
+        :param url: Url of the kraken stream
+        :type url: str
+        :param connection_factory: Function returning a connection to an url (send, recv, settimeout and close
+                                   methods), a websocket-client connection is used if None
+        :type connection_factory: function
+        """
+        self._server_clock = server_clock
+        self._stream_pairs = stream_pairs
+        self._url = url
+        self._connection_factory = connection_factory
+        self._connection = None
+        self._timeout_exceptions = (TimeoutError,)
+        self._time_frame_managers = {}  # Time frame managers by stream pair and time frame length
+        self._pending_updates = {}  # Streamed candles by time, kept by time frame manager until its gap is repaired
+        self._lock = threading.Lock()  # Guards the registered time frame managers, the connection and the updates
+        self._repair_queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._t = threading.Thread(target=self._worker)
+        self._repair_t = threading.Thread(target=self._repair_worker)
+        logging.info("OHLCStream initialized on %s" % self._url)
+
+    def start(self):
+        """Starts the stream (workers)"""
+        self._t.start()
+        self._repair_t.start()
+
+    def stop(self):
+        """Stops the stream (workers)"""
+        self._stop_event.set()
+        self._repair_queue.put(None)
+
+    def register(self, time_frame_manager):
+        """
+        Starts the data acquisition of a time frame manager
+
+        :param time_frame_manager: The time frame manager to acquire data for
+        :type time_frame_manager: TimeFrameManager
+        """
+        key = (self._stream_pairs[time_frame_manager.get_pair()], time_frame_manager.get_time_frame_length())
+
+        with self._lock:
+            self._time_frame_managers[key] = time_frame_manager
+            connected = self._connection is not None
+
+        if connected:
+            self._subscribe([key])
+            self._request_repair(time_frame_manager)
+
+    def unregister(self, time_frame_manager):
+        """
+        Stops the data acquisition of a time frame manager
+
+        :param time_frame_manager: The time frame manager to stop the acquisition for
+        :type time_frame_manager: TimeFrameManager
+        """
+        with self._lock:
+            self._time_frame_managers = {key: registered for key, registered in self._time_frame_managers.items()
+                                         if registered is not time_frame_manager}
+            self._pending_updates.pop(time_frame_manager, None)
+
+    def _connect(self):
+        """
+        Open a connection to the stream
+
+        :return: The connection
+        :rtype: object
+        """
+        if self._connection_factory is not None:
+            return self._connection_factory(self._url)
+
+        try:
+            import websocket
+        except ImportError:
+            raise BotsicoteException("The websocket-client package is required to use the OHLC stream")
+
+        self._timeout_exceptions = (TimeoutError, websocket.WebSocketTimeoutException)
+        return websocket.create_connection(self._url)
+
+    def _subscribe(self, keys):
+        """
+        Subscribe to the OHLC updates of pairs and time frames
+
+        :param keys: Tuples of stream pair and time frame length
+        :type keys: list[tuple]
+        """
+        pairs_by_time_frame_length = {}
+        for stream_pair, time_frame_length in keys:
+            pairs_by_time_frame_length.setdefault(time_frame_length, []).append(stream_pair)
+
+        with self._lock:
+            for time_frame_length, stream_pairs in pairs_by_time_frame_length.items():
+                self._connection.send(json.dumps({"event": "subscribe", "pair": stream_pairs,
+                                                  "subscription": {"name": "ohlc", "interval": time_frame_length}}))
+
+    def _request_repair(self, time_frame_manager):
+        """
+        Retrieve the candles missed by a time frame manager from the OHLC api, its streamed candles are kept aside
+        meanwhile
+
+        :param time_frame_manager: The time frame manager to repair
+        :type time_frame_manager: TimeFrameManager
+        """
+        with self._lock:
+            self._pending_updates.setdefault(time_frame_manager, {})
+        self._repair_queue.put(time_frame_manager)
+
+    def _handle_message(self, message):
+        """
+        Handle a stream message
+
+        :param message: The message
+        :type message: str
+        """
+        message = json.loads(message)
+
+        if isinstance(message, dict):
+            if message.get("event") == "subscriptionStatus" and message.get("status") == "error":
+                logging.error("OHLC stream subscription failed: %s" % message.get("errorMessage"))
+            return
+
+        # Updates are lists: channel id, candle, channel name (ohlc-<time frame length>) and stream pair
+        if len(message) != 4 or not str(message[2]).startswith("ohlc-"):
+            return
+
+        key = (message[3], int(message[2][len("ohlc-"):]))
+
+        with self._lock:
+            time_frame_manager = self._time_frame_managers.get(key)
+            if time_frame_manager is None:
+                return
+
+            data = format_stream_ohlc(message[1], key[1] * 60)
+
+            if time_frame_manager in self._pending_updates:
+                self._pending_updates[time_frame_manager][data["time"]] = data
+            else:
+                time_frame_manager.update_candle(data)
+
+    def _close_ended_candles(self):
+        """Publish the closed event of the ended candles"""
+        server_time = self._server_clock.server_now()
+
+        with self._lock:
+            for time_frame_manager in self._time_frame_managers.values():
+                if time_frame_manager not in self._pending_updates:
+                    time_frame_manager.close_ended_candle(server_time)
+
+    def _worker(self):
+        """Threaded function that reads the stream"""
+        while not self._stop_event.is_set():
+            try:
+                connection = self._connect()
+                connection.settimeout(RECV_TIMEOUT)
+
+                with self._lock:
+                    self._connection = connection
+                    keys = list(self._time_frame_managers.keys())
+                    time_frame_managers = list(self._time_frame_managers.values())
+
+                logging.info("Connected to the OHLC stream, subscribing to %d pair time frames" % len(keys))
+                self._subscribe(keys)
+                # The history or the candles missed while disconnected are retrieved from the OHLC api
+                for time_frame_manager in time_frame_managers:
+                    self._request_repair(time_frame_manager)
+
+                last_message_time = time.monotonic()
+
+                while not self._stop_event.is_set():
+                    try:
+                        self._handle_message(connection.recv())
+                        last_message_time = time.monotonic()
+                    except self._timeout_exceptions:
+                        if time.monotonic() - last_message_time > HEARTBEAT_TIMEOUT:
+                            raise BotsicoteException("No message received for %d sec" % HEARTBEAT_TIMEOUT)
+                    self._close_ended_candles()
+            except Exception as e:
+                logging.warning("OHLC stream disconnected, reconnecting in %d sec... Details: %s"
+                                % (RECONNECT_DELAY, str(e)))
+                self._stop_event.wait(RECONNECT_DELAY)
+            finally:
+                with self._lock:
+                    if self._connection is not None:
+                        self._connection.close()
+                    self._connection = None
+
+        logging.info("Ending OHLC stream thread")
+
+    def _repair_worker(self):
+        """Threaded function that repairs the gaps of the time frame managers with the OHLC api"""
+        while not self._stop_event.is_set():
+            time_frame_manager = self._repair_queue.get()
+            if time_frame_manager is None:
+                break
+
+            try:
+                time_frame_manager.feed()
+            except Exception as e:
+                logging.warning("Gap repair of %s failed, trying again in %d sec... Details: %s"
+                                % (str(time_frame_manager), ACQUISITION_RETRY_DELAY, str(e)))
+                self._stop_event.wait(ACQUISITION_RETRY_DELAY)
+                self._repair_queue.put(time_frame_manager)
+                continue
+
+            # The candles streamed during the repair are applied after the retrieved ones
+            with self._lock:
+                pending_updates = self._pending_updates.pop(time_frame_manager, {})
+                for data_time in sorted(pending_updates.keys()):
+                    time_frame_manager.update_candle(pending_updates[data_time])
+
+        logging.info("Ending OHLC stream gap repair thread")
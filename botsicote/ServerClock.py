@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from entities.ApiCallPriority import ApiCallPriorityEnum
+from exceptions.BotsicoteException import BotsicoteException
+
+CHECK_SERVER_TIME_EVERY_SEC = 60
+RETRY_SERVER_TIME_CHECK_AFTER_SEC = 5
+MAX_SAMPLES = 10  # Number of server time samples used to estimate the clock
+MIN_DRIFT_SPAN_SEC = 600  # Min time covered by the samples before estimating the drift
+MAX_DRIFT = 0.001  # Max drift (in second per second) between the local and the server clock
+MAX_SAMPLE_DURATION_SEC = 2  # Samples taking longer (waiting for the api call budget for instance) are too imprecise
+
+
+class ServerClock(object):
+    """
+    Server clock shared by every scheduler and fetcher.
+    The kraken server time is sampled regularly and its offset and drift against the local monotonic clock are
+    estimated, so the server time can be read at any time without api call and without being impacted by local wall
+    clock jumps
+    """
+
+    def __init__(self, kraken_api_client, check_every_sec=CHECK_SERVER_TIME_EVERY_SEC):
+        """
+        Server clock constructor
+
+        :param kraken_api_client: The kraken api client (the local clock is used as server clock if None)
+        :type kraken_api_client: KrakenAPIClient
+        :param check_every_sec: Number of seconds between two server time checks
+        :type check_every_sec: int
+        """
+        self._kraken_api_client = kraken_api_client
+        self._check_every_sec = check_every_sec
+        self._samples = deque(maxlen=MAX_SAMPLES)  # Tuples of monotonic time and server time
+        # Tuple of reference monotonic time, offset and drift. It's replaced at once so it can be read without lock
+        self._estimation = (time.monotonic(), time.time() - time.monotonic(), 0.0)
+        self._t = threading.Thread(target=self._worker)
+        self._stop_event = threading.Event()
+
+    def server_now(self):
+        """
+        Return the current server time
+
+        :return: The current server time (in timestamp)
+        :rtype: float
+        """
+        reference_time, offset, drift = self._estimation
+        now = time.monotonic()
+        return now + offset + drift * (now - reference_time)
+
+    def sync(self):
+        """Sample the server time and update the server clock estimation"""
+        if self._kraken_api_client is None:
+            self._add_sample(time.monotonic(), time.time())
+            return
+
+        before = time.monotonic()
+        response = self._kraken_api_client.query_public("Time", priority=ApiCallPriorityEnum.SERVER_TIME)
+        after = time.monotonic()
+
+        if after - before > MAX_SAMPLE_DURATION_SEC:
+            logging.debug("Server time sample took %f sec, it's dropped" % (after - before))
+            return
+
+        # The server time is truncated to the second, its middle is the best guess
+        self._add_sample((before + after) / 2, response["result"]["unixtime"] + 0.5)
+
+    def start(self):
+        """Sample the server time a first time and starts the server clock (worker)"""
+        self._try_sync()
+        self._t.start()
+
+    def stop(self):
+        """Stops the server clock (worker)"""
+        self._stop_event.set()
+
+    def _add_sample(self, monotonic_time, server_time):
+        """
+        Add a server time sample and update the server clock estimation
+
+        :param monotonic_time: Local monotonic time of the sample
+        :type monotonic_time: float
+        :param server_time: Server time of the sample (in timestamp)
+        :type server_time: float
+        """
+        self._samples.append((monotonic_time, server_time))
+
+        sample_count = len(self._samples)
+        reference_time = sum([sample[0] for sample in self._samples]) / sample_count
+        offset = sum([sample[1] - sample[0] for sample in self._samples]) / sample_count
+        drift = 0.0
+
+        if sample_count > 2 and self._samples[-1][0] - self._samples[0][0] >= MIN_DRIFT_SPAN_SEC:
+            # Least squares fit of the offset against the monotonic time
+            covariance = sum([(sample[0] - reference_time) * (sample[1] - sample[0] - offset)
+                              for sample in self._samples])
+            variance = sum([(sample[0] - reference_time) ** 2 for sample in self._samples])
+            drift = max(-MAX_DRIFT, min(MAX_DRIFT, covariance / variance))
+
+        self._estimation = (reference_time, offset, drift)
+        logging.debug("Server clock updated. Offset: %f sec, drift: %f sec/sec" % (offset, drift))
+
+    def _try_sync(self):
+        """
+        Sample the server time, errors are logged
+
+        :return: True if the server time has been sampled, False otherwise
+        :rtype: bool
+        """
+        try:
+            self.sync()
+            return True
+        except BotsicoteException as e:
+            logging.warning("Server time check failed. Details: %s" % str(e))
+        except KeyError as key_err:
+            logging.warning("Data format error while checking server time. Details: %s" % str(key_err))
+        return False
+
+    def _worker(self):
+        """Threaded function that samples the server time"""
+        wait_time = self._check_every_sec if len(self._samples) > 0 else RETRY_SERVER_TIME_CHECK_AFTER_SEC
+        while not self._stop_event.wait(wait_time):
+            wait_time = self._check_every_sec if self._try_sync() else RETRY_SERVER_TIME_CHECK_AFTER_SEC
+        logging.info("Ending server clock thread")
@@ -1,99 +1,178 @@
-import pandas as pd
-import stockstats
+import bisect
 
-from IndicatorComputer import IndicatorComputer
-from entities.StockDataPoint import StockDataPoint
+from CandleBuffer import CandleBuffer
+from indicators.IchimokuCalculator import IchimokuCalculator
+from indicators.IndicatorEngine import IndicatorEngine
+from indicators.IndicatorRegistry import IndicatorRegistry
+from StockDataSnapshot import StockDataSnapshot
+from Utils import to_data_list
+from entities.StockDataPointList import StockDataPointList
 
 MAX_ITEM_IN_IND_LIST = 200
 MAX_ITEM_IN_DATA_LINE_SET = 300
+MAX_TRACKED_CHANGES = 16  # Number of data line changes given to the snapshots for the indicators to catch up
 
 
 class StockDataManager(object):
-    """Stock data manager"""
+    """
+    Stock data manager.
+    It's updated by a single writer at a time (the time frame lock) and publishes an immutable snapshot of the data line
+    after each update: the readers get it with get_snapshot and never block nor get blocked by the writer
+    """
 
-    def __init__(self, data_list=None):
+    def __init__(self, data_list=None, candle_store=None):
         """
         Stock data manager constructor
 
         :param data_list: Data point list
         :type data_list: list
+        :param candle_store: Persistent store the data are loaded from at startup and saved to at each update
+        :type candle_store: CandleStore
         """
-        self._data_line = set()
-        self._data_line_cursor = -1  # Last data identifier performed
-        self.stock_data_list = []  # Last raw stock values
+        self._candle_buffer = CandleBuffer(MAX_ITEM_IN_DATA_LINE_SET)  # Data line
+        self._indicator_engine = IndicatorEngine(MAX_ITEM_IN_DATA_LINE_SET)  # Streamed indicators of the data line
+        self._ichimoku_calculator = IchimokuCalculator(9, 26, 52)
+        self._data_version = 0  # Incremented each time the data line changes
+        self._changes = ()  # Last data line versions and identifier of the first data they changed
+        self.stock_data_list = StockDataPointList(self._candle_buffer.get_columns())  # Last raw stock values
         self.ichimoku_point_list = []  # Ichimoku cloud indicators
-        self.stock_indicators = None
+        self._snapshot = StockDataSnapshot(0, self._candle_buffer.get_columns(), self._changes, self.stock_data_list,
+                                           self.ichimoku_point_list, self._indicator_engine)
+        self.stock_indicators = self._snapshot.stock_indicators  # Lazy indicators of the last snapshot
+        self._candle_store = None
+
+        if candle_store is not None:
+            stored_data_list = candle_store.load(MAX_ITEM_IN_DATA_LINE_SET)
+            if len(stored_data_list) > 0:
+                self.update_data(stored_data_list)
+            self._candle_store = candle_store
 
         if data_list is not None:
             self.update_data(data_list)
 
-    def update_data(self, data_list):
+    def get_data_version(self):
         """
-        Update the data line and compute indicators
+        Return the version of the data line, incremented each time it changes
 
-        :param data_list: The raw data list
-        :type data_list: list
+        :return: The data line version
+        :rtype: int
         """
-        self._update_data_line(data_list)
-        self.stock_data_list = self._get_data_line()
-
-        if len(self.stock_data_list) > 0:
-            if self._data_line_cursor == -1:
-                # Put the cursor at the position just before the first data point
-                self._data_line_cursor = self.stock_data_list[0].identifier - 1
-
-            self._compute_indicators()
+        return self._data_version
 
-        if len(self.stock_data_list) > MAX_ITEM_IN_IND_LIST:
-            self.stock_data_list = self.stock_data_list[-MAX_ITEM_IN_IND_LIST:]
+    def require_indicators(self, indicator_names):
+        """
+        Declare the indicators that will be read from the snapshots, they are computed together sharing their
+        intermediate indicators. The other indicators are still computed when requested
 
-        if len(self.ichimoku_point_list) > MAX_ITEM_IN_IND_LIST:
-            self.ichimoku_point_list = self.ichimoku_point_list[-MAX_ITEM_IN_IND_LIST:]
+        :param indicator_names: Names of the indicators (stockstats names)
+        :type indicator_names: list[str]
+        """
+        self._indicator_engine.require([indicator_name for indicator_name in indicator_names
+                                        if IndicatorRegistry.is_supported(indicator_name)])
 
-        if len(self._data_line) > MAX_ITEM_IN_DATA_LINE_SET:
-            self._data_line = set(self._get_data_line()[-MAX_ITEM_IN_DATA_LINE_SET:])
+    def get_snapshot(self):
+        """
+        Return the last published snapshot of the data line. It's never modified so it can be read without lock
 
-        self._data_line_cursor = self.stock_data_list[-1].identifier  # Update the cursor position
+        :return: The data line snapshot
+        :rtype: StockDataSnapshot
+        """
+        return self._snapshot
 
-    def _update_data_line(self, data_list):
+    def update_data(self, data_list):
         """
-        Update the data line
+        Update the data line, compute the ichimoku cloud and publish a new snapshot. The other indicators are computed
+        when requested
 
         :param data_list: The raw data list
         :type data_list: list
         """
-        if data_list is not None:
-            for data in data_list:
-                self._data_line.add(
-                    StockDataPoint(data["id"], data["time"], data["open"], data["high"], data["low"], data["close"],
-                                   data["vwap"], data["volume"], data["count"])
-                )
+        if data_list is None or len(data_list) == 0:
+            return
 
-    def _compute_indicators(self):
+        self._update_data_line(self._candle_buffer.upsert(data_list))
+
+        if self._candle_store is not None:
+            self._candle_store.append(data_list)
+
+        self._publish_snapshot()
+
+    def update_columns(self, columns):
         """
-        Compute indicators
+        Update the data line with candles given as columns (parsed OHLC api response), like update_data
+
+        :param columns: The values of each candle column by column name, sorted by candle identifier asc
+        :type columns: dict[str, numpy.ndarray]
         """
-        self.ichimoku_point_list.extend(
-            IndicatorComputer.compute_ichimoku(self.stock_data_list, self._data_line_cursor, 9, 26, 52)
-        )
+        if len(columns["id"]) == 0:
+            return
+
+        self._update_data_line(self._candle_buffer.upsert_columns(columns))
+
+        if self._candle_store is not None:
+            self._candle_store.append(to_data_list(columns))
 
-        data_line_dict_list = [{
-            "date": data_item.time,
-            "amount": data_item.count,
-            "close": data_item.close_price,
-            "high": data_item.high_price,
-            "low": data_item.low_price,
-            "open": data_item.open_price,
-            "volume": data_item.volume
-        } for data_item in self.stock_data_list]
+        self._publish_snapshot()
+
+    def _publish_snapshot(self):
+        """Publish a snapshot of the data line if it changed since the last one"""
+        if self._data_version != self._snapshot.get_data_version():
+            columns = self._candle_buffer.get_columns()
+            # The data points are built from the published columns when they are read
+            self.stock_data_list = StockDataPointList({name: column[-MAX_ITEM_IN_IND_LIST:]
+                                                       for name, column in columns.items()})
+            self._snapshot = StockDataSnapshot(self._data_version, columns, self._changes, self.stock_data_list,
+                                               self.ichimoku_point_list, self._indicator_engine)
+            self.stock_indicators = self._snapshot.stock_indicators
+
+    def _update_data_line(self, first_changed_index):
+        """
+        Update the data line version and the ichimoku cloud after the candle buffer update: only the ichimoku points
+        of the inserted or replaced data are built
+
+        :param first_changed_index: Index in the data line of the first inserted or replaced data
+        :type first_changed_index: int
+        """
+        if first_changed_index < len(self._candle_buffer):
+            # The indicators will catch up with the changed data when they are requested
+            self._data_version += 1
+            self._changes = self._changes[-(MAX_TRACKED_CHANGES - 1):] + (
+                (self._data_version, int(self._candle_buffer.get_column("id")[first_changed_index])),
+            )
 
-        self.stock_indicators = stockstats.StockDataFrame.retype(pd.DataFrame(data_line_dict_list))
+        self._update_ichimoku(first_changed_index)
 
-    def _get_data_line(self):
+    def _update_ichimoku(self, first_changed_index):
         """
-        Return the data line sorted by identifier asc
+        Advance the ichimoku cloud with the inserted or replaced data
 
-        :return: The data line sorted by identifier asc
-        :rtype: list
+        :param first_changed_index: Index in the data line of the first inserted or replaced data
+        :type first_changed_index: int
         """
-        return sorted(self._data_line, key=lambda k: k.identifier)
+        if first_changed_index == len(self._candle_buffer):
+            return
+
+        identifiers = self._candle_buffer.get_column("id")
+        # The list is replaced and not modified as it can be read from a snapshot at the same time
+        ichimoku_point_list = list(self.ichimoku_point_list)
+
+        last_identifier = self._ichimoku_calculator.get_last_identifier()
+        if last_identifier is not None and identifiers[first_changed_index] < last_identifier:
+            # An old data point changed (rare): the ichimoku cloud is computed again over the whole data line
+            self._ichimoku_calculator.reset()
+            first_changed_index = 0
+            ichimoku_point_list = []
+
+        columns = [self._candle_buffer.get_column(name)[first_changed_index:].tolist()
+                   for name in ["id", "high", "low", "close"]]
+
+        for values in zip(*columns):
+            for point in self._ichimoku_calculator.step(*values):
+                if len(ichimoku_point_list) > 0 and point.identifier <= ichimoku_point_list[-1].identifier:
+                    index = bisect.bisect_left(ichimoku_point_list, point.identifier, key=lambda k: k.identifier)
+                    if index < len(ichimoku_point_list) and ichimoku_point_list[index].identifier == point.identifier:
+                        ichimoku_point_list[index] = point
+                else:
+                    ichimoku_point_list.append(point)
+
+        self.ichimoku_point_list = ichimoku_point_list[-MAX_ITEM_IN_IND_LIST:]
@@ -0,0 +1,84 @@
+from indicators.CandlestickPatternScanner import CandlestickPatternScanner
+from indicators.IndicatorView import IndicatorView
+
+
+class StockDataSnapshot(object):
+    """
+    Immutable snapshot of a data line published by the stock data manager at each update.
+    The candle columns are shared copy-on-write with the candle buffer and the data point lists are never modified once
+    published, so a reader can use a snapshot without any lock while the data line is updated. The indicators are
+    computed when requested and memoized with the snapshot
+    """
+
+    def __init__(self, data_version, columns, changes, stock_data_list, ichimoku_point_list, indicator_engine):
+        """
+        Stock data snapshot constructor
+
+        :param data_version: Version of the data line
+        :type data_version: int
+        :param columns: Read only values of each candle column by column name, sorted by candle identifier asc
+        :type columns: dict[str, numpy.ndarray]
+        :param changes: Tuples of data line version and identifier of the first candle changed by this version, for
+                        the last versions
+        :type changes: tuple
+        :param stock_data_list: Last raw stock values
+        :type stock_data_list: StockDataPointList
+        :param ichimoku_point_list: Ichimoku cloud indicators
+        :type ichimoku_point_list: list[IchimokuPoint]
+        :param indicator_engine: The indicator engine of the data line
+        :type indicator_engine: IndicatorEngine
+        """
+        self._data_version = data_version
+        self._columns = columns
+        self._changes = changes
+        self.stock_data_list = stock_data_list
+        self.ichimoku_point_list = ichimoku_point_list
+        self.stock_indicators = IndicatorView(indicator_engine, self)
+        self._candlestick_masks = None
+
+    def __len__(self):
+        return len(self._columns["id"])
+
+    def get_data_version(self):
+        """
+        Return the version of the data line
+
+        :return: The data line version
+        :rtype: int
+        """
+        return self._data_version
+
+    def get_changes(self):
+        """
+        Return the last changes of the data line
+
+        :return: Tuples of data line version and identifier of the first candle changed by this version
+        :rtype: tuple
+        """
+        return self._changes
+
+    def get_candlestick_masks(self):
+        """
+        Return the candlestick patterns of the candles, scanned when first requested
+
+        :return: A bitmask per candle, bit shape.value is set if the candle ends the pattern (CandlestickShapeEnum)
+        :rtype: numpy.ndarray
+        """
+        if self._candlestick_masks is None:
+            self._candlestick_masks = CandlestickPatternScanner.get_masks(
+                self.get_column("open"), self.get_column("high"), self.get_column("low"), self.get_column("close"))
+
+        return self._candlestick_masks
+
+    def get_column(self, name, count=None):
+        """
+        Get the values of a column, sorted by candle identifier asc
+
+        :param name: Name of the column (id, time, open, high, low, close, vwap, volume, count)
+        :type name: str
+        :param count: Number of last candles to get (all if None)
+        :type count: int
+        :return: A read only view of the column values
+        :rtype: numpy.ndarray
+        """
+        return self._columns[name] if count is None else self._columns[name][-count:]
@@ -10,6 +10,7 @@ class Strategy(object):
         self._lock = None
         self._k = None
         self._call_rate_manager = None
+        self._kraken_api_client = None
 
     def run(self):
         """Run the strategy"""
@@ -56,7 +57,7 @@ class Strategy(object):
         """
         Set the lock
 
-        :param lock: Lock used for data update
+        :param lock: Lock shared by the strategy (the data update uses the time frame managers own locks)
         :type lock: threading.Lock
         """
         self._lock = lock
@@ -65,7 +66,7 @@ class Strategy(object):
         """
         Get the lock
 
-        :return: The lock used for data update
+        :return: The lock shared by the strategy
         :rtype: threading.Lock
         """
         return self._lock
@@ -105,3 +106,21 @@ class Strategy(object):
         :rtype: KrakenAPICallRateManager
         """
         return self._call_rate_manager
+
+    def set_kraken_api_client(self, kraken_api_client):
+        """
+        Set the kraken api client
+
+        :param kraken_api_client: The kraken api client
+        :type kraken_api_client: KrakenAPIClient
+        """
+        self._kraken_api_client = kraken_api_client
+
+    def get_kraken_api_client(self):
+        """
+        Get the kraken api client (rate limited and retrying api calls)
+
+        :return: The kraken api client
+        :rtype: KrakenAPIClient
+        """
+        return self._kraken_api_client
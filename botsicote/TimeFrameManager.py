@@ -1,26 +1,23 @@
 import logging
 import threading
-import time
 from datetime import datetime
 
-from requests.exceptions import HTTPError
-
+from CandleResampler import CandleResampler
 from StockDataManager import StockDataManager
-from Utils import format_raw_data
-from exceptions.KrakenAPICallRateException import KrakenAPICallRateException
+from Utils import parse_ohlc_columns, to_data_list
+from entities.ApiCallPriority import ApiCallPriorityEnum
+from entities.CandleEvent import CandleEvent
+from exceptions.BotsicoteException import BotsicoteException
 
 API_DELAY = 5
-CHECK_SERVER_TIME_EVERY_SEC = 60
+ACQUISITION_RETRY_DELAY = 10  # Number of seconds to wait before retrying a failed acquisition
 
 
 class TimeFrameManager(object):
     """Time frame manager"""
 
-    _LAST_SERVER_TIME_CHECK = datetime(2017, 12, 25, 0, 0, 0)
-    _LAST_API_SERVER_TIME = 0
-    _SERVER_TIME = 0
-
-    def __init__(self, time_frame_length, pair, pair2, krakenex_instance, call_rate_manager, lock):
+    def __init__(self, time_frame_length, pair, pair2, kraken_api_client, server_clock, acquisition_engine=None,
+                 candle_store=None):
         """
         Time frame manager constructor
 
@@ -30,32 +27,160 @@ class TimeFrameManager(object):
         :type pair: str
         :param pair2: Name of the key to retrieve data after an OHLC api call (default Xcrypto followed by Zcurrency)
         :type pair2: str
-        :param krakenex_instance: Instance of krakenex
-        :type krakenex_instance: Krakenex
-        :param call_rate_manager: The kraken api call rate manager
-        :type call_rate_manager: KrakenAPICallRateManager
-        :param lock: The threading lock
-        :type lock: threading.Lock
+        :param kraken_api_client: The kraken api client
+        :type kraken_api_client: KrakenAPIClient
+        :param server_clock: The kraken server clock
+        :type server_clock: ServerClock
+        :param acquisition_engine: Engine running the data acquisition (a dedicated thread is used if None)
+        :type acquisition_engine: AsyncAcquisitionEngine or OHLCStream
+        :param candle_store: Persistent store of the candles, the acquisition resumes after the last stored candle
+        :type candle_store: CandleStore
         """
         self._time_frame_length = time_frame_length
         self._pair = pair
         self._pair2 = pair2
-        self.stock_data_manager = StockDataManager()
-        self._since_cursor = 0
-        self._k = krakenex_instance
-        self._call_rate_manager = call_rate_manager
-        self._t_run = True
-        self._t = threading.Thread(target=self._worker)
-        self._lock = lock
+        self.stock_data_manager = StockDataManager(candle_store=candle_store)
+        # Only the candles following the last stored one are retrieved (the last one may have been in progress)
+        self._since_cursor = 0 if candle_store is None or candle_store.get_last_time() is None \
+            else candle_store.get_last_time()
+        self._history_retrieved = False  # Whether an acquisition succeeded since the startup
+        self._kraken_api_client = kraken_api_client
+        self._server_clock = server_clock
+        self._acquisition_engine = acquisition_engine
+        self._stop_event = threading.Event()
+        self._t = threading.Thread(target=self._worker) if acquisition_engine is None else None
+        self.lock = threading.Lock()  # Serializes the stock_data_manager updates (its readers use snapshots)
         self.last_update_datetime = None
+        self._source_time_frame = None  # Time frame manager from which the data of this time frame are derived
+        self._derived_time_frames = []  # Tuples of resampler and time frame manager derived from this time frame
+        self._subscribers = []  # Callbacks called with a candle event after each data update
+        self._open_candle_time = None  # Time of the in progress streamed candle
+        self._closed_candle_time = None  # Time of the last streamed candle whose closed event was published
         logging.info("New time frame manager created! Pair: %s, time frame: %d min"
                      % (self._pair, self._time_frame_length))
 
     def feed(self):
-        """Feed the stock data managers with new values"""
-        response, self._since_cursor = self._feed(self._since_cursor, self._time_frame_length)
-        self.stock_data_manager.update_data(format_raw_data(response, self._time_frame_length * 60, self._pair2))
-        self.last_update_datetime = datetime.now()
+        """
+        Feed the stock data managers with new values.
+        The api call and the parsing are done without holding any lock, only the publication of the new data into the
+        stock data manager is done while holding the time frame lock
+        """
+        response, since_cursor = self._feed(self._since_cursor, self._time_frame_length)
+        # The candles older than the cursor are already known and final, they are skipped
+        columns = parse_ohlc_columns(response, self._time_frame_length * 60, self._pair2, self._since_cursor)
+        self._publish(columns=columns)
+        self._since_cursor = since_cursor
+        self._history_retrieved = True
+
+        if len(self._derived_time_frames) > 0:
+            data_list = to_data_list(columns)
+            for resampler, time_frame_manager in self._derived_time_frames:
+                time_frame_manager._publish(resampler.resample(data_list))
+
+    def derive_from(self, source_time_frame_manager):
+        """
+        Build the data of this time frame from the data of a finer time frame of the same pair instead of retrieving
+        them from the kraken api. Only one OHLC api call is made at startup to get the history of this time frame
+
+        :param source_time_frame_manager: Time frame manager of the finer time frame (its length must divide this one)
+        :type source_time_frame_manager: TimeFrameManager
+        """
+        if self._source_time_frame is not None:
+            return
+
+        self._source_time_frame = source_time_frame_manager
+        # The list is replaced and not modified as it can be iterated by the source thread at the same time
+        source_time_frame_manager._derived_time_frames = source_time_frame_manager._derived_time_frames + [
+            (CandleResampler(source_time_frame_manager._time_frame_length, self._time_frame_length), self)
+        ]
+        logging.info("Data of %s for %d min interval are derived from %d min interval"
+                     % (self._pair, self._time_frame_length, source_time_frame_manager._time_frame_length))
+
+    def _publish(self, data_list=None, columns=None):
+        """
+        Publish new data into the stock data manager
+
+        :param data_list: The formatted data list
+        :type data_list: list
+        :param columns: The values of each candle column by column name (parsed OHLC data), used instead of data_list
+        :type columns: dict[str, numpy.ndarray]
+        """
+        if (len(data_list) if columns is None else len(columns["id"])) == 0:
+            return
+
+        with self.lock:
+            if columns is None:
+                self.stock_data_manager.update_data(data_list)
+            else:
+                self.stock_data_manager.update_columns(columns)
+            self.last_update_datetime = datetime.now()
+            candle_event = CandleEvent(self._pair, self._time_frame_length,
+                                       self.stock_data_manager.stock_data_list[-1].identifier)
+
+        self._notify(candle_event)
+
+    def _notify(self, candle_event):
+        """
+        Call the subscribers with a candle event
+
+        :param candle_event: The candle event
+        :type candle_event: CandleEvent
+        """
+        for callback in self._subscribers:
+            callback(candle_event)
+
+    def update_candle(self, data):
+        """
+        Update the in progress candle with a streamed candle. The closed event of the previous candle is published
+        first if it wasn't already
+
+        :param data: The streamed candle (formatted data)
+        :type data: dict
+        """
+        if self._open_candle_time is not None and data["time"] < self._open_candle_time:
+            return
+
+        if self._open_candle_time is not None and data["time"] > self._open_candle_time:
+            self.close_ended_candle(data["time"])
+
+        self._publish([data])
+        self._open_candle_time = data["time"]
+        self._since_cursor = max(self._since_cursor, data["time"])  # A gap repair restarts from this candle
+
+    def close_ended_candle(self, server_time):
+        """
+        Publish the closed event of the in progress streamed candle if it's ended
+
+        :param server_time: Current server time
+        :type server_time: float
+        """
+        if self._open_candle_time is None or self._closed_candle_time == self._open_candle_time \
+                or server_time < self._open_candle_time + self._time_frame_length * 60:
+            return
+
+        self._closed_candle_time = self._open_candle_time
+        self._notify(CandleEvent(self._pair, self._time_frame_length,
+                                 int(self._open_candle_time / (self._time_frame_length * 60)), True))
+
+    def subscribe(self, callback):
+        """
+        Subscribe to the data updates of this time frame.
+        The callback is called from the acquisition thread, it should only hand the event over (to a queue for instance)
+
+        :param callback: Function called with a CandleEvent after each data update
+        :type callback: function
+        """
+        # The list is replaced and not modified as it can be iterated by the acquisition thread at the same time
+        self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback):
+        """
+        Unsubscribe from the data updates of this time frame
+
+        :param callback: Function given at subscription
+        :type callback: function
+        """
+        self._subscribers = [subscriber for subscriber in self._subscribers if subscriber != callback]
 
     def _feed(self, cursor, interval):
         """
@@ -68,70 +193,115 @@ class TimeFrameManager(object):
         :return: A tuple containing the http request response and the new cursor value
         :rtype: tuple
         """
-        while True:
+        logging.info("Retrieving %s OHLC data for %d min interval" % (self._pair, interval))
+        data = {"pair": self._pair, "since": cursor, "interval": interval}
+        response = self._kraken_api_client.query_public("OHLC", data=data, priority=ApiCallPriorityEnum.MARKET_DATA)
+
+        if self._pair2 not in response["result"]:
+            raise BotsicoteException("%s field required but not found in OHLC result: %s"
+                                     % (self._pair2, ", ".join(response["result"].keys())))
+
+        return response, max([item[0] for item in response["result"][self._pair2]] + [cursor])
+
+    def acquire(self):
+        """
+        Perform one data acquisition step: retrieve the OHLC data if a new candle is available
+
+        :return: Number of seconds to wait before the next acquisition step, None if no more step is needed
+        :rtype: float
+        """
+        next_acquisition_time = self.get_next_acquisition_time()
+
+        if next_acquisition_time is not None \
+                and next_acquisition_time < self._server_clock.server_now() + API_DELAY:
             try:
-                logging.info("Retrieving %s OHLC data for %d min interval" % (self._pair, interval))
-                self._call_rate_manager.increase_api_call_rate(1)
-                response = self._k.query_public("OHLC",
-                                                data={"pair": self._pair, "since": cursor, "interval": interval})
-                return response, max([item[0] for item in response["result"][self._pair2]])
-            except HTTPError as http_err:
-                logging.warning("Http request failed, trying again... Details: %s" % str(http_err))
-            except KrakenAPICallRateException as api_call_rate_err:
-                logging.warning("API call rate error, trying again... Details: %s" % str(api_call_rate_err))
-                time.sleep(1)
-            except KeyError as key_err:
-                logging.warning("Data format error, trying again... Details: %s" % str(key_err))
+                self.feed()
+                next_acquisition_time = self.get_next_acquisition_time()
+            except BotsicoteException as e:
+                logging.warning("Data acquisition of %s for %d min interval failed, trying again in %d sec... "
+                                "Details: %s" % (self._pair, self._time_frame_length, ACQUISITION_RETRY_DELAY, str(e)))
+                return ACQUISITION_RETRY_DELAY
+
+        if next_acquisition_time is None:
+            return None
+
+        time_to_sleep = next_acquisition_time - self._server_clock.server_now()
+        logging.info("Next data acquisition of %s for %d min interval in %.1f sec"
+                     % (self._pair, self._time_frame_length, time_to_sleep))
+        return time_to_sleep
+
+    def get_next_acquisition_time(self):
+        """
+        Return the server time at which the OHLC data have to be retrieved
+
+        :return: The next acquisition server time, None if no more acquisition is needed
+        :rtype: float
+        """
+        server_time = self._server_clock.server_now()
+
+        if self._source_time_frame is not None:
+            # Derived time frame: only the history is retrieved, the next data come from the source time frame
+            return server_time if not self._history_retrieved else None
+
+        next_acquisition_time = self._since_cursor + self._time_frame_length * 60
+
+        if next_acquisition_time - server_time < 1:
+            next_acquisition_time = server_time + 2
+            if self._history_retrieved:
+                logging.debug("The server is late on the data for %s with %d min interval, retry quickly"
+                              % (self._pair, self._time_frame_length))
+
+        return next_acquisition_time
+
+    def get_pair(self):
+        """
+        Return the pair of the time frame
+
+        :return: The pair of the time frame
+        :rtype: str
+        """
+        return self._pair
+
+    def get_time_frame_length(self):
+        """
+        Return the length of the time frame
+
+        :return: The length of the time frame in minute
+        :rtype: int
+        """
+        return self._time_frame_length
+
+    def is_derived(self):
+        """
+        Tells if the data of the time frame are derived from a finer time frame
+
+        :return: True if the data are derived from a finer time frame, False otherwise
+        :rtype: bool
+        """
+        return self._source_time_frame is not None
 
     def start(self):
-        """Starts the time frame manager (worker)"""
-        self._t.start()
+        """Starts the time frame manager (worker or acquisition engine task)"""
+        if self._acquisition_engine is not None:
+            self._acquisition_engine.register(self)
+        else:
+            self._t.start()
 
     def stop(self):
-        """Stops the time frame manager (worker)"""
-        self._t_run = False
+        """Stops the time frame manager (worker or acquisition engine task)"""
+        self._stop_event.set()
+        if self._acquisition_engine is not None:
+            self._acquisition_engine.unregister(self)
 
     def _worker(self):
         """Threaded function that retrieve the OHLC data"""
-        while self._t_run:
-            with self._lock:
-                while self._t_run:
-                    try:
-                        td = datetime.now() - TimeFrameManager._LAST_SERVER_TIME_CHECK
-                        if td.total_seconds() > CHECK_SERVER_TIME_EVERY_SEC:
-                            self._call_rate_manager.increase_api_call_rate(1)
-                            response = self._k.query_public("Time")
-                            TimeFrameManager._SERVER_TIME = response["result"]["unixtime"]
-                            TimeFrameManager._LAST_API_SERVER_TIME = response["result"]["unixtime"]
-                            TimeFrameManager._LAST_SERVER_TIME_CHECK = datetime.now()
-                        else:
-                            TimeFrameManager._SERVER_TIME = TimeFrameManager._LAST_API_SERVER_TIME + \
-                                                            int(td.total_seconds())
-                        break
-                    except HTTPError as http_err:
-                        logging.warning("Http request failed, trying again... Details: %s" % str(http_err))
-                    except KrakenAPICallRateException as api_call_rate_err:
-                        logging.warning("API call rate error, trying again... Details: %s" % str(api_call_rate_err))
-                        time.sleep(1)
-                    except KeyError as key_err:
-                        logging.warning("Data format error, trying again... Details: %s" % str(key_err))
-
-                if self._since_cursor + self._time_frame_length * 60 < TimeFrameManager._SERVER_TIME + API_DELAY:
-                    self.feed()
-
-                time_to_sleep = self._since_cursor + self._time_frame_length * 60 - TimeFrameManager._SERVER_TIME
-
-                if time_to_sleep < 1:
-                    time_to_sleep = 2
-                    logging.debug("The server is late on the data for %s with %d min interval, sleep a little to retry "
-                                  "quickly" % (self._pair, self._time_frame_length))
-
-            logging.info("Next data acquisition of %s for %d min interval in %d sec"
-                         % (self._pair, self._time_frame_length, time_to_sleep))
-            for i in range(time_to_sleep):
-                if self._t_run:
-                    time.sleep(1)
-                else:
-                    break
+        while not self._stop_event.is_set():
+            time_to_sleep = self.acquire()
+            if time_to_sleep is None:
+                break
+            self._stop_event.wait(time_to_sleep)
         logging.info("Ending time frame manager thread for data acquisition. Pair: %s, time frame: %d min"
                      % (self._pair, self._time_frame_length))
+
+    def __str__(self):
+        return "{pair: %s, time_frame_length: %d}" % (self._pair, self._time_frame_length)
@@ -0,0 +1,73 @@
+class TradeAggregator(object):
+    """
+    Build the candles of a time frame from a stream of trades.
+    Only the trades of the in progress candle are summarized in memory, whatever the length of the stream
+    """
+
+    def __init__(self, time_frame_length):
+        """
+        Trade aggregator constructor
+
+        :param time_frame_length: The length of the time frame of the candles to build in minute
+        :type time_frame_length: int
+        """
+        self._time_step = time_frame_length * 60
+        self._candle = None  # In progress candle
+        self._price_volume = 0.0  # Sum of price * volume of the trades of the in progress candle
+
+    def add_trades(self, trades):
+        """
+        Aggregate new trades
+
+        :param trades: Kraken trades sorted by time asc (<price>, <volume>, <time>, ...)
+        :type trades: list
+        :return: The candles completed by these trades (formatted raw data list)
+        :rtype: list
+        """
+        completed_candles = []
+
+        for trade in trades:
+            price = float(trade[0])
+            volume = float(trade[1])
+            bucket_time = int(float(trade[2])) // self._time_step * self._time_step
+
+            if self._candle is not None and bucket_time != self._candle["time"]:
+                completed_candles.append(self.get_in_progress_candle())
+                self._candle = None
+
+            if self._candle is None:
+                self._candle = {
+                    "id": int(bucket_time / self._time_step),
+                    "time": bucket_time,
+                    "open": price,
+                    "high": price,
+                    "low": price,
+                    "close": price,
+                    "vwap": None,  # Computed when the candle is handed out
+                    "volume": 0.0,
+                    "count": 0
+                }
+                self._price_volume = 0.0
+
+            self._candle["high"] = max(self._candle["high"], price)
+            self._candle["low"] = min(self._candle["low"], price)
+            self._candle["close"] = price
+            self._candle["volume"] += volume
+            self._candle["count"] += 1
+            self._price_volume += price * volume
+
+        return completed_candles
+
+    def get_in_progress_candle(self):
+        """
+        Return the candle of the last aggregated trades, it may still be updated by the next trades
+
+        :return: The in progress candle (formatted raw data), None if no trade was aggregated
+        :rtype: dict
+        """
+        if self._candle is None:
+            return None
+
+        candle = dict(self._candle)
+        candle["vwap"] = self._price_volume / candle["volume"] if candle["volume"] > 0 else candle["close"]
+        return candle
@@ -0,0 +1,163 @@
+import logging
+import os
+from datetime import datetime
+
+from CandleStore import CandleStore
+from TradeAggregator import TradeAggregator
+from entities.ApiCallPriority import ApiCallPriorityEnum
+from exceptions.BotsicoteException import BotsicoteException
+
+TRADES_PAGE_SIZE = 1000  # Max number of trades returned by a Trades api call
+
+
+class TradesBackfiller(object):
+    """
+    Trades backfiller.
+    Build the candle history of a pair beyond the 720 candles returned by the OHLC api: the trades are paged through
+    with the Trades api and aggregated into candles page after page, each completed candle is written into the candle
+    stores so an interrupted backfill is resumed where it stopped
+    """
+
+    def __init__(self, kraken_api_client, pair, pair2, candle_stores):
+        """
+        Trades backfiller constructor
+
+        :param kraken_api_client: The kraken api client
+        :type kraken_api_client: KrakenAPIClient
+        :param pair: Name of the pair used in the Trades api call
+        :type pair: str
+        :param pair2: Name of the key to retrieve data after a Trades api call
+        :type pair2: str
+        :param candle_stores: Candle stores to fill by time frame length
+        :type candle_stores: dict[int, CandleStore]
+        """
+        self._kraken_api_client = kraken_api_client
+        self._pair = pair
+        self._pair2 = pair2
+        self._candle_stores = candle_stores
+
+    def get_resume_time(self):
+        """
+        Return the time from which the trades have to be retrieved to complete the candle stores: the time of the
+        oldest last stored candle, which may have been stored before all of its trades were known
+
+        :return: The resume time, None if the candle stores are empty
+        :rtype: int
+        """
+        last_times = [candle_store.get_last_time() for candle_store in self._candle_stores.values()
+                      if candle_store.get_last_time() is not None]
+        return min(last_times) if len(last_times) > 0 else None
+
+    def run(self, since=None, until=None):
+        """
+        Retrieve the trades and fill the candle stores. If since is earlier than the first candle of a store, the
+        history missing before it is backfilled first
+
+        :param since: Time from which the trades are retrieved if the candle stores are empty or start later
+        :type since: int
+        :param until: Time after which the backfill stops (up to the last trade if None)
+        :type until: int
+        """
+        if since is not None:
+            self._prepend_history(since)
+
+        start_time = self.get_resume_time()
+
+        if start_time is None:
+            if since is None:
+                raise BotsicoteException("A start time is required to backfill the empty candle stores of %s"
+                                         % self._pair)
+            start_time = since
+        else:
+            logging.info("Resuming %s backfill from %s" % (self._pair, datetime.fromtimestamp(start_time)))
+
+        aggregators = {time_frame_length: TradeAggregator(time_frame_length)
+                       for time_frame_length in self._candle_stores.keys()}
+
+        for trades in self._get_trade_pages(start_time, until):
+            for time_frame_length, aggregator in aggregators.items():
+                self._candle_stores[time_frame_length].append(aggregator.add_trades(trades))
+
+        # The in progress candles are stored too, the live acquisition will update them
+        for time_frame_length, aggregator in aggregators.items():
+            if aggregator.get_in_progress_candle() is not None:
+                self._candle_stores[time_frame_length].append([aggregator.get_in_progress_candle()])
+
+        logging.info("%s backfill done" % self._pair)
+
+    def _prepend_history(self, since):
+        """
+        Backfill the history missing before the first candle of the candle stores starting after since. The older
+        candles are written in a temporary store per time frame, merged into the candle store once complete (an
+        interrupted backfill of the older history starts over at next run)
+
+        :param since: Time from which the trades are retrieved
+        :type since: int
+        """
+        first_times = {time_frame_length: candle_store.get_first_time()
+                       for time_frame_length, candle_store in self._candle_stores.items()
+                       if candle_store.get_first_time() is not None and candle_store.get_first_time() > since}
+        if len(first_times) == 0:
+            return
+
+        logging.info("Backfilling %s history from %s to %s" % (self._pair, datetime.fromtimestamp(since),
+                                                                datetime.fromtimestamp(max(first_times.values()))))
+
+        older_candle_stores = {}
+        for time_frame_length in first_times.keys():
+            path = "%s.older" % self._candle_stores[time_frame_length].get_file_path()
+            if os.path.isfile(path):
+                os.remove(path)
+            older_candle_stores[time_frame_length] = CandleStore(path, time_frame_length)
+
+        aggregators = {time_frame_length: TradeAggregator(time_frame_length) for time_frame_length in first_times}
+
+        # The trades are retrieved up to the latest first candle so that there is no gap before any of them
+        for trades in self._get_trade_pages(since, max(first_times.values())):
+            for time_frame_length, aggregator in aggregators.items():
+                older_candle_stores[time_frame_length].append([candle for candle in aggregator.add_trades(trades)
+                                                               if candle["time"] < first_times[time_frame_length]])
+
+        for time_frame_length, aggregator in aggregators.items():
+            # Once the trades reach the first candle, the in progress candle before it is complete
+            candle = aggregator.get_in_progress_candle()
+            if candle is not None and candle["time"] < first_times[time_frame_length]:
+                older_candle_stores[time_frame_length].append([candle])
+
+            self._candle_stores[time_frame_length].prepend(older_candle_stores[time_frame_length])
+            os.remove(older_candle_stores[time_frame_length].get_file_path())
+
+    def _get_trade_pages(self, start_time, until=None):
+        """
+        Page through the trades with the Trades api
+
+        :param start_time: Time from which the trades are retrieved
+        :type start_time: int
+        :param until: Time after which the trades stop being retrieved (up to the last trade if None)
+        :type until: int
+        :return: Generator of the pages of trades (raw Trades api data), sorted by time asc
+        :rtype: generator
+        """
+        cursor = str(int(start_time) * 1000000000)  # Trades api cursors are nanosecond timestamps
+
+        while True:
+            data = {"pair": self._pair, "since": cursor}
+            response = self._kraken_api_client.query_public("Trades", data=data,
+                                                            priority=ApiCallPriorityEnum.BACKFILL)
+
+            if self._pair2 not in response["result"]:
+                raise BotsicoteException("%s field required but not found in Trades result: %s"
+                                         % (self._pair2, ", ".join(response["result"].keys())))
+
+            trades = response["result"][self._pair2]
+            yield trades
+
+            cursor = response["result"]["last"]
+
+            if len(trades) > 0:
+                logging.info("%s trades retrieved up to %s"
+                             % (self._pair, datetime.fromtimestamp(float(trades[-1][2]))))
+
+            if len(trades) < TRADES_PAGE_SIZE or (until is not None and len(trades) > 0
+                                                  and float(trades[-1][2]) >= until):
+                break
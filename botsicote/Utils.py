@@ -1,6 +1,8 @@
 import logging
 import os
 
+import numpy as np
+
 from exceptions.BotsicoteException import BotsicoteException
 
 
@@ -61,3 +63,92 @@ def format_raw_data(raw_data, time_step, result_key):
                             "<volume>, <count>")
 
     return formatted_data
+
+
+def parse_ohlc_columns(raw_data, time_step, result_key, since=None):
+    """
+    Parse raw OHLC data straight into typed columns, without building a dict per candle. The rows are checked at once
+
+    :param raw_data: The raw data
+    :type raw_data: dict
+    :param time_step: The time between each record
+    :type time_step: int
+    :param result_key: Key to access data in raw_data dict
+    :type result_key: str
+    :param since: The rows whose time is lower than since are skipped without being converted (none if None)
+    :type since: int
+    :return: The values of each candle column by column name (id, time, open, high, low, close, vwap, volume, count)
+    :rtype: dict[str, numpy.ndarray]
+    """
+    check_fields_in_dict(raw_data, ["result"], "Raw data")
+    check_fields_in_dict(raw_data["result"], [result_key], "Raw data")
+
+    rows = raw_data["result"][result_key]
+    table = np.array(rows, dtype=object) if len(rows) > 0 else np.empty((0, 8), dtype=object)
+
+    if table.ndim != 2 or table.shape[1] != 8:
+        raise BotsicoteException("Data should be composed of 8 fields: <time>, <open>, <high>, <low>, <close>, <vwap>, "
+                                 "<volume>, <count>")
+
+    times = table[:, 0].astype(np.int64)
+    if since is not None:
+        table = table[times >= since]
+        times = times[times >= since]
+
+    prices = table[:, 1:7].astype(np.float64)
+
+    return {
+        "id": times // time_step,
+        "time": times,
+        "open": prices[:, 0],
+        "high": prices[:, 1],
+        "low": prices[:, 2],
+        "close": prices[:, 3],
+        "vwap": prices[:, 4],
+        "volume": prices[:, 5],
+        "count": table[:, 7].astype(np.int64)
+    }
+
+
+def to_data_list(columns):
+    """
+    Convert candle columns to a formatted data list
+
+    :param columns: The values of each candle column by column name
+    :type columns: dict[str, numpy.ndarray]
+    :return: The formatted data list
+    :rtype: list
+    """
+    names = list(columns.keys())
+    return [dict(zip(names, values)) for values in zip(*[columns[name].tolist() for name in names])]
+
+
+def format_stream_ohlc(stream_data, time_step):
+    """
+    Format the candle of a kraken stream OHLC update
+
+    :param stream_data: The candle of the update (<time>, <end time>, <open>, <high>, <low>, <close>, <vwap>, <volume>,
+                        <count>)
+    :type stream_data: list
+    :param time_step: The time between each record
+    :type time_step: int
+    :return: The formatted data
+    :rtype: dict
+    """
+    if len(stream_data) != 9:
+        raise BotsicoteException("Stream OHLC data should be composed of 9 fields: <time>, <end time>, <open>, "
+                                 "<high>, <low>, <close>, <vwap>, <volume>, <count>")
+
+    candle_time = int(round(float(stream_data[1]))) - time_step  # Candles are identified by their start time
+
+    return {
+        "id": int(candle_time / time_step),
+        "time": candle_time,
+        "open": float(stream_data[2]),
+        "high": float(stream_data[3]),
+        "low": float(stream_data[4]),
+        "close": float(stream_data[5]),
+        "vwap": float(stream_data[6]),
+        "volume": float(stream_data[7]),
+        "count": int(stream_data[8])
+    }
@@ -0,0 +1,72 @@
+import argparse
+import logging
+import os
+from datetime import datetime
+
+import krakenex
+from config.BotsicoteConfig import BotsicoteConfig
+from tools.LoggingConfig import init_logger
+from CandleStore import CandleStore
+from CryptoPairManager import SUPPORTED_TIME_FRAME_LENGTH
+from KrakenAPICallRateManager import KrakenAPICallRateManager
+from KrakenAPIClient import KrakenAPIClient
+from TradesBackfiller import TradesBackfiller
+from Utils import expand_var_and_user
+from exceptions.BotsicoteException import BotsicoteException
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fill the candle stores with the history built from the kraken "
+                                                 "trades. Interrupted backfills are resumed. Don't run it while the "
+                                                 "bot is running.")
+    parser.add_argument("crypto", nargs="*", help="Names of the managed cryptos to backfill (all if not given)")
+    parser.add_argument("--since", help="Date (YYYY-MM-DD) from which the candle stores are backfilled, the history "
+                                          "missing before the first candle of non empty stores is backfilled too")
+    parser.add_argument("--until", help="Date (YYYY-MM-DD) at which the backfill stops (now if not given)")
+    parser.add_argument("--time-frames", nargs="+", type=int, default=[1], choices=SUPPORTED_TIME_FRAME_LENGTH,
+                        help="Lengths in minute of the time frames to build (default 1)")
+    args = parser.parse_args()
+
+    # ------------ #
+    # LOGGER SETUP
+    # ------------ #
+    conf = BotsicoteConfig()
+    log_location = os.path.join(conf.get("BOTSICOTE.PATH"), conf.get("BOTSICOTE.LOG_DIRECTORY"))
+    app_name = conf.get("BOTSICOTE.APP_NAME")
+
+    init_logger(conf.get("LOG_LEVEL"), log_location, "%sBackfill" % app_name)
+
+    if conf.get("BOTSICOTE.CACHE_DIRECTORY") is None:
+        raise BotsicoteException("BOTSICOTE.CACHE_DIRECTORY must be set to backfill the candle stores")
+
+    candle_store_directory = expand_var_and_user(os.path.join(conf.get("BOTSICOTE.PATH"),
+                                                              conf.get("BOTSICOTE.CACHE_DIRECTORY")))
+    os.makedirs(candle_store_directory, exist_ok=True)
+    since = None if args.since is None else int(datetime.strptime(args.since, "%Y-%m-%d").timestamp())
+    until = None if args.until is None else int(datetime.strptime(args.until, "%Y-%m-%d").timestamp())
+
+    # ------------ #
+    # API SETUP
+    # ------------ #
+    call_rate_manager = KrakenAPICallRateManager(conf.get("KRAKEN.TIER_LEVEL"))
+    kraken_api_client = KrakenAPIClient(krakenex.API(), call_rate_manager, conf.get("KRAKEN.TIMEOUT"),
+                                        conf.get("KRAKEN.MAX_RETRIES"), conf.get("KRAKEN.POOL_SIZE"))
+
+    # ----------- #
+    # BACKFILLING
+    # ----------- #
+    try:
+        for crypto in conf.get("MANAGED_CRYPTO"):
+            if len(args.crypto) > 0 and crypto["NAME"] not in args.crypto:
+                continue
+
+            pair = "%s%s" % (crypto["NAME"], crypto["CURRENCY"])
+            pair2 = "X%sZ%s" % (crypto["NAME"], crypto["CURRENCY"]) if crypto["PAIR_NAME"] is None \
+                else crypto["PAIR_NAME"]
+            candle_stores = {time_frame_length: CandleStore(CandleStore.get_path(candle_store_directory, pair,
+                                                                                 time_frame_length), time_frame_length)
+                             for time_frame_length in args.time_frames}
+
+            TradesBackfiller(kraken_api_client, pair, pair2, candle_stores).run(since, until)
+    except KeyboardInterrupt:
+        logging.info("/!\\ Keyboard interruption: Stopping the backfill, it will be resumed at next run")
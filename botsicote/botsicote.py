@@ -4,8 +4,18 @@ import threading
 import krakenex
 from config.BotsicoteConfig import BotsicoteConfig
 from tools.LoggingConfig import init_logger
+from AsyncAcquisitionEngine import AsyncAcquisitionEngine
 from CryptoPairManager import CryptoPairManager
 from KrakenAPICallRateManager import KrakenAPICallRateManager
+from KrakenAPIClient import KrakenAPIClient
+from OHLCStream import OHLCStream
+from ServerClock import ServerClock
+from Utils import expand_var_and_user
+from simulation.KrakenStandInServer import KrakenStandInServer
+from simulation.MarketSimulator import MarketSimulator
+from simulation.RecordingTransport import RecordingTransport
+from simulation.ReplayTransport import ReplayTransport
+from simulation.StandInStreamConnection import StandInStreamConnection
 
 
 if __name__ == '__main__':
@@ -31,16 +41,74 @@ if __name__ == '__main__':
     k = krakenex.API()
     k.load_key("kraken.key")
     call_rate_manager = KrakenAPICallRateManager(conf.get("KRAKEN.TIER_LEVEL"))
+    transport = conf.get("KRAKEN.TRANSPORT")
+    recording_file = conf.get("KRAKEN.RECORDING_FILE")
+    recording_file = expand_var_and_user(recording_file) if recording_file is not None else None
+    stand_in_server = None
+    market_simulator = None
+
+    if transport == "stand_in":
+        market_simulator = MarketSimulator({
+            "%s%s" % (crypto["NAME"], crypto["CURRENCY"]):
+                "X%sZ%s" % (crypto["NAME"], crypto["CURRENCY"]) if crypto["PAIR_NAME"] is None
+                else crypto["PAIR_NAME"]
+            for crypto in conf.get("MANAGED_CRYPTO")
+        }, conf.get("KRAKEN.STAND_IN.SEED"))
+        stand_in_server = KrakenStandInServer(
+            market_simulator if recording_file is None else ReplayTransport(recording_file),
+            port=conf.get("KRAKEN.STAND_IN.PORT"), latency=conf.get("KRAKEN.STAND_IN.LATENCY"),
+            error_rate=conf.get("KRAKEN.STAND_IN.ERROR_RATE"),
+            http_error_rate=conf.get("KRAKEN.STAND_IN.HTTP_ERROR_RATE"),
+            max_api_call_counter=call_rate_manager.get_max_api_call_counter()
+            if conf.get("KRAKEN.STAND_IN.RATE_LIMIT") else None,
+            decrease_period=call_rate_manager.get_decrease_period(), seed=conf.get("KRAKEN.STAND_IN.SEED"))
+        stand_in_server.start()
+        k.uri = stand_in_server.get_uri()
+    elif transport == "replay":
+        k = ReplayTransport(recording_file)
+    elif recording_file is not None:
+        k = RecordingTransport(k, recording_file)
+
+    kraken_api_client = KrakenAPIClient(k, call_rate_manager, conf.get("KRAKEN.TIMEOUT"),
+                                        conf.get("KRAKEN.MAX_RETRIES"), conf.get("KRAKEN.POOL_SIZE"))
+    server_clock = ServerClock(kraken_api_client)
 
     lock = threading.Lock()
 
+    # ------------------ #
+    # ACQUISITION SETUP
+    # ------------------ #
+    acquisition_engine = None
+
+    if conf.get("ACQUISITION.MODE") == "asyncio":
+        acquisition_engine = AsyncAcquisitionEngine(call_rate_manager, server_clock,
+                                                    conf.get("ACQUISITION.MAX_WORKERS"))
+    elif conf.get("ACQUISITION.MODE") == "stream":
+        acquisition_engine = OHLCStream(
+            server_clock,
+            {"%s%s" % (crypto["NAME"], crypto["CURRENCY"]): "%s/%s" % (crypto["NAME"], crypto["CURRENCY"])
+             for crypto in conf.get("MANAGED_CRYPTO")},
+            conf.get("ACQUISITION.STREAM_URL"),
+            (lambda url: StandInStreamConnection(market_simulator)) if market_simulator is not None else None)
+
+    candle_store_directory = None
+
+    if conf.get("BOTSICOTE.CACHE_DIRECTORY") is not None:
+        candle_store_directory = expand_var_and_user(os.path.join(conf.get("BOTSICOTE.PATH"),
+                                                                  conf.get("BOTSICOTE.CACHE_DIRECTORY")))
+        os.makedirs(candle_store_directory, exist_ok=True)
+
     # ---------------------------- #
     # CREATING CRYPTO PAIR MANAGER
     # ---------------------------- #
     crypto_pair_manager_list = []
 
     for crypto in conf.get("MANAGED_CRYPTO"):
-        cpm = CryptoPairManager(crypto["NAME"], crypto["CURRENCY"], k, call_rate_manager, lock, crypto["PAIR_NAME"])
+        cpm = CryptoPairManager(crypto["NAME"], crypto["CURRENCY"], kraken_api_client, server_clock,
+                                crypto["PAIR_NAME"], acquisition_engine,
+                                # Every streamed time frame is pushed, none of them needs to be derived
+                                conf.get("ACQUISITION.DERIVE_TIME_FRAMES") and conf.get("ACQUISITION.MODE") != "stream",
+                                candle_store_directory)
         crypto_pair_manager_list.append(cpm)
 
     # ------------------ #
@@ -52,9 +120,16 @@ if __name__ == '__main__':
         strategy.set_lock(lock)
         strategy.set_kraken_api_instance(k)
         strategy.set_call_rate_manager(call_rate_manager)
-        call_rate_manager.start()
+        strategy.set_kraken_api_client(kraken_api_client)
+        server_clock.start()
+        if acquisition_engine is not None:
+            acquisition_engine.start()
         strategy.run()
     except KeyboardInterrupt:
         logging.info("/!\ Keyboard interruption: Stopping %s V%s" % (app_name, app_version))
     finally:
-        call_rate_manager.stop()
+        if acquisition_engine is not None:
+            acquisition_engine.stop()
+        server_clock.stop()
+        if stand_in_server is not None:
+            stand_in_server.stop()
@@ -9,11 +9,33 @@ class BotsicoteConfig(ConfigFile):
         "BOTSICOTE": {
             "PATH": "~/PycharmProjects/Botsicote/botsicote",
             "LOG_DIRECTORY": "logs",
+            "CACHE_DIRECTORY": "cache",  # Directory where the candles are persisted between runs (None to disable)
             "APP_NAME": "Botsicote",
             "VERSION": "1.0"
         },
         "KRAKEN": {
-            "TIER_LEVEL": 2
+            "TIER_LEVEL": 2,
+            "TIMEOUT": 10,  # Number of seconds to wait for a kraken api response
+            "MAX_RETRIES": 5,  # Max number of times a transient api call failure is retried
+            "POOL_SIZE": 10,  # Max number of kept alive connections to the kraken api
+            "TRANSPORT": "kraken",  # kraken, stand_in (local simulated kraken api), replay (recorded responses)
+            "RECORDING_FILE": None,  # kraken: responses are recorded in it, stand_in and replay: responses played back
+            "STAND_IN": {
+                "PORT": 0,  # 0 to pick a free port
+                "SEED": 0,  # Seed of the simulated market, latency and errors
+                "LATENCY": 0.05,  # Mean number of seconds to answer an api call
+                "ERROR_RATE": 0.0,  # Proportion of api calls answered with a kraken service error
+                "HTTP_ERROR_RATE": 0.0,  # Proportion of api calls answered with an http error
+                "RATE_LIMIT": True  # Reject the api calls exceeding the tier level rate limit like kraken
+            }
+        },
+        "ACQUISITION": {
+            # asyncio (one scheduled event loop for all time frames), thread (one per time frame), stream (kraken OHLC
+            # stream, needs websocket-client unless the stand_in transport is used)
+            "MODE": "asyncio",
+            "STREAM_URL": "wss://ws.kraken.com",
+            "MAX_WORKERS": 4,  # Max number of threads performing kraken api calls in asyncio mode
+            "DERIVE_TIME_FRAMES": True  # Build the time frames data from the finest one instead of retrieving them
         },
         "MANAGED_CRYPTO": [
             {"NAME": "XBT", "CURRENCY": "EUR", "PAIR_NAME": None},
@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class ApiCallPriorityEnum(Enum):
+    """Api call priority enum (the lower the value, the higher the priority)"""
+
+    ORDER = 0
+    SERVER_TIME = 1
+    MARKET_DATA = 2
+    BACKFILL = 3
@@ -0,0 +1,24 @@
+class CandleEvent(object):
+    """Candle event, published when new candles of a pair and time frame are available"""
+
+    def __init__(self, pair, time_frame_length, identifier, closed=False):
+        """
+        Candle event constructor
+
+        :param pair: Pair of the candles
+        :type pair: str
+        :param time_frame_length: The length of the time frame of the candles in minute
+        :type time_frame_length: int
+        :param identifier: Identifier of the last candle
+        :type identifier: int
+        :param closed: Whether the event tells that the candle is closed (its values won't change anymore)
+        :type closed: bool
+        """
+        self.pair = pair
+        self.time_frame_length = time_frame_length
+        self.identifier = identifier
+        self.closed = closed
+
+    def __str__(self):
+        return "{pair: %s, time_frame_length: %d, identifier: %d, closed: %s}" % (
+            self.pair, self.time_frame_length, self.identifier, self.closed)
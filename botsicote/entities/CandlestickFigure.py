@@ -9,3 +9,8 @@ class CandlestickShapeEnum(Enum):
     REVERSED_HAMMER_OR_FALLING_STAR = 2
     SWALLOWING = 3
     HARAMI = 4
+    DOJI = 5
+    MORNING_STAR = 6
+    EVENING_STAR = 7
+    THREE_WHITE_SOLDIERS = 8
+    THREE_BLACK_CROWS = 9
@@ -4,6 +4,8 @@ from entities.IdentifiedPoint import IdentifiedPoint
 class IchimokuPoint(IdentifiedPoint):
     """Ichimoku point"""
 
+    __slots__ = ("tenkan_sen", "kijun_sen", "senkou_span_a", "senkou_span_b", "chikou_span")
+
     def __init__(self, identifier, tenkan_sen, kijun_sen, senkou_span_a, senkou_span_b, chikou_span):
         """
         Ichimoku point constructor
@@ -1,5 +1,11 @@
 class IdentifiedPoint(object):
-    """Identified point"""
+    """
+    Identified point.
+    The points are declared with slots: they hold no attribute dict, which makes the hundreds of points kept by data
+    line several times smaller and cheaper to build
+    """
+
+    __slots__ = ("identifier",)
 
     def __init__(self, identifier):
         """
@@ -15,3 +21,6 @@ class IdentifiedPoint(object):
 
     def __hash__(self):
         return self.identifier
+
+    def __eq__(self, other):
+        return isinstance(other, IdentifiedPoint) and self.identifier == other.identifier
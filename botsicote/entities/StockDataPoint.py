@@ -5,6 +5,8 @@ from entities.Color import Color
 class StockDataPoint(IdentifiedPoint):
     """Stock data point"""
 
+    __slots__ = ("time", "open_price", "high_price", "low_price", "close_price", "vwap", "volume", "count")
+
     def __init__(self, identifier, time, open_price, high_price, low_price, close_price, vwap, volume, count):
         """
         Stock data point constructor
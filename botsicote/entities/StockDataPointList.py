@@ -0,0 +1,39 @@
+from collections.abc import Sequence
+
+from entities.StockDataPoint import StockDataPoint
+
+"""Candle columns holding the stock data point values, in the stock data point constructor order"""
+POINT_COLUMNS = ["id", "time", "open", "high", "low", "close", "vwap", "volume", "count"]
+
+
+class StockDataPointList(Sequence):
+    """
+    Read only list of stock data points backed by candle columns.
+    The data points are built when they are read, from the values of the columns: the data line doesn't keep a point
+    object (and its values) per candle, only the few points used by the analysis are ever built
+    """
+
+    def __init__(self, columns):
+        """
+        Stock data point list constructor
+
+        :param columns: Values of each candle column by column name, sorted by candle identifier asc. They must not be
+                        modified afterwards
+        :type columns: dict[str, numpy.ndarray]
+        """
+        self._columns = [columns[name] for name in POINT_COLUMNS]
+
+    def __len__(self):
+        return len(self._columns[0])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [StockDataPoint(*values) for values in zip(*[column[index].tolist() for column in self._columns])]
+
+        if index < -len(self) or index >= len(self):
+            raise IndexError("Stock data point list index out of range")
+
+        return StockDataPoint(*[column[index].item() for column in self._columns])
+
+    def __iter__(self):
+        return iter(self[:])
@@ -0,0 +1,20 @@
+from exceptions.BotsicoteException import BotsicoteException
+
+
+class KrakenAPIException(BotsicoteException):
+    """Kraken api exception"""
+
+    def __init__(self, message, errors=None, retryable=False):
+        """
+        Kraken api exception constructor
+
+        :param message: Exception message
+        :type message: str
+        :param errors: Errors returned by the kraken api
+        :type errors: list[str]
+        :param retryable: True if the failed call can succeed if it's made again, False otherwise
+        :type retryable: bool
+        """
+        super(KrakenAPIException, self).__init__(message)
+        self.errors = errors if errors is not None else []
+        self.retryable = retryable
@@ -0,0 +1,344 @@
+import functools
+import re
+
+import numpy as np
+
+from exceptions.BotsicoteException import BotsicoteException
+from indicators.IndicatorRegistry import AVERAGE_PATTERN, CANDLE_COLUMNS, DEFAULT_RSI_WINDOW, MACD_PATTERN, RSI_PATTERN
+
+BOLL_PATTERN = re.compile(r"^boll(_ub|_lb)?$")
+BOLL_WINDOW = 20
+BOLL_STD_TIMES = 2
+ICHIMOKU_WINDOWS = (9, 26, 52)
+
+"""Outputs of the ichimoku indicator"""
+ICHIMOKU_OUTPUTS = ["tenkan_sen", "kijun_sen", "senkou_span_a", "senkou_span_b", "chikou_span"]
+
+
+class BatchIndicatorComputer(object):
+    """
+    Batch indicator computer.
+    The candles of many data lines of the same length (the pairs of a time frame) are stacked into 2-D arrays, one row
+    per data line, and each indicator is computed for all of them at once with numpy: computing the indicators of 50
+    pairs costs about the same as computing them for one. The values are the stockstats ones, computed over the data
+    lines (the streamed indicators also use the candles that left the data line, their first values can differ)
+    """
+
+    @staticmethod
+    def compute(snapshots, indicator_names):
+        """
+        Compute indicators for many data lines
+
+        :param snapshots: Snapshots of the data lines
+        :type snapshots: list[StockDataSnapshot]
+        :param indicator_names: Names of the indicators (stockstats names, or ichimoku for its five outputs)
+        :type indicator_names: list[str]
+        :return: The indicator values of each snapshot by output name, in the snapshots order
+        :rtype: list[dict[str, numpy.ndarray]]
+        """
+        results = [{} for _ in snapshots]
+
+        # Only the data lines of the same length can be stacked
+        indexes_by_length = {}
+        for index, snapshot in enumerate(snapshots):
+            if len(snapshot) > 0:
+                indexes_by_length.setdefault(len(snapshot), []).append(index)
+
+        for indexes in indexes_by_length.values():
+            columns = {}
+            for indicator_name in indicator_names:
+                for output_name, values in BatchIndicatorComputer._compute_indicator(
+                        indicator_name, [snapshots[index] for index in indexes], columns).items():
+                    for row, index in enumerate(indexes):
+                        results[index][output_name] = values[row]
+
+        return results
+
+    @staticmethod
+    def fill(snapshots, indicator_names):
+        """
+        Compute indicators for many data lines and store them in the indicator views of the snapshots, where they are
+        read by the analyses instead of being computed one data line at a time
+
+        :param snapshots: Snapshots of the data lines
+        :type snapshots: list[StockDataSnapshot]
+        :param indicator_names: Names of the indicators (stockstats names)
+        :type indicator_names: list[str]
+        """
+        for snapshot, values in zip(snapshots, BatchIndicatorComputer.compute(snapshots, indicator_names)):
+            for indicator_name in indicator_names:
+                if indicator_name in values:
+                    snapshot.stock_indicators.set_values(indicator_name, values[indicator_name])
+
+    @staticmethod
+    def _compute_indicator(indicator_name, snapshots, columns):
+        """
+        Compute an indicator for data lines of the same length
+
+        :param indicator_name: Name of the indicator
+        :type indicator_name: str
+        :param snapshots: Snapshots of the data lines
+        :type snapshots: list[StockDataSnapshot]
+        :param columns: Stacked candle columns by column name, filled when a column is first used
+        :type columns: dict[str, numpy.ndarray]
+        :return: The values of each output of the indicator by output name, one row per data line
+        :rtype: dict[str, numpy.ndarray]
+        """
+        def get_column(name):
+            if name not in columns:
+                columns[name] = np.stack([snapshot.get_column(name) for snapshot in snapshots]).astype(np.float64)
+            return columns[name]
+
+        average_match = AVERAGE_PATTERN.match(indicator_name)
+        rsi_match = RSI_PATTERN.match(indicator_name)
+
+        if average_match is not None and average_match.group(1) in CANDLE_COLUMNS:
+            values = get_column(average_match.group(1))
+            window = int(average_match.group(2))
+            if average_match.group(3) == "sma":
+                return {indicator_name: BatchIndicatorComputer.sma(values, window)}
+            if average_match.group(3) == "ema":
+                return {indicator_name: BatchIndicatorComputer.ema(values, window)}
+            return {indicator_name: BatchIndicatorComputer._ewm(values, 1.0 / window)}
+
+        if MACD_PATTERN.match(indicator_name) is not None:
+            return dict(zip(["macd", "macds", "macdh"], BatchIndicatorComputer.macd(get_column("close"))))
+
+        if rsi_match is not None:
+            window = DEFAULT_RSI_WINDOW if rsi_match.group(2) is None else int(rsi_match.group(2))
+            return {indicator_name: BatchIndicatorComputer.rsi(get_column("close"), window)}
+
+        if BOLL_PATTERN.match(indicator_name) is not None:
+            return dict(zip(["boll", "boll_ub", "boll_lb"], BatchIndicatorComputer.bollinger(get_column("close"))))
+
+        if indicator_name == "ichimoku":
+            return dict(zip(ICHIMOKU_OUTPUTS, BatchIndicatorComputer.ichimoku(
+                get_column("high"), get_column("low"), get_column("close"), *ICHIMOKU_WINDOWS)))
+
+        raise BotsicoteException("Indicator %s can't be computed in batch" % indicator_name)
+
+    @staticmethod
+    def sma(values, window):
+        """
+        Simple moving average of each row (the first averages are computed over the values available)
+
+        :param values: The values, one row per data line
+        :type values: numpy.ndarray
+        :param window: Number of values of the average
+        :type window: int
+        :return: The averages
+        :rtype: numpy.ndarray
+        """
+        windows = BatchIndicatorComputer._get_windows(values, window)
+        return np.nansum(windows, axis=-1) / BatchIndicatorComputer._get_counts(values.shape[1], window)
+
+    @staticmethod
+    def ema(values, window):
+        """
+        Exponential moving average of each row, like a pandas adjusted ewm (span=window)
+
+        :param values: The values, one row per data line
+        :type values: numpy.ndarray
+        :param window: Span of the average
+        :type window: int
+        :return: The averages
+        :rtype: numpy.ndarray
+        """
+        return BatchIndicatorComputer._ewm(values, 2.0 / (window + 1))
+
+    @staticmethod
+    def macd(close_prices, short_window=12, long_window=26, signal_window=9):
+        """
+        Moving average convergence divergence of each row
+
+        :param close_prices: The close prices, one row per data line
+        :type close_prices: numpy.ndarray
+        :param short_window: Span of the short ema
+        :type short_window: int
+        :param long_window: Span of the long ema
+        :type long_window: int
+        :param signal_window: Span of the signal ema
+        :type signal_window: int
+        :return: A tuple containing the macd, the signal (macds) and the histogram (macdh)
+        :rtype: tuple
+        """
+        macd = BatchIndicatorComputer.ema(close_prices, short_window) - BatchIndicatorComputer.ema(close_prices,
+                                                                                                  long_window)
+        macds = BatchIndicatorComputer.ema(macd, signal_window)
+        return macd, macds, macd - macds
+
+    @staticmethod
+    def rsi(close_prices, window):
+        """
+        Relative strength index of each row, the ups and downs are smoothed with a wilder average
+
+        :param close_prices: The close prices, one row per data line
+        :type close_prices: numpy.ndarray
+        :param window: Window of the wilder averages
+        :type window: int
+        :return: The rsi (the first one is 50)
+        :rtype: numpy.ndarray
+        """
+        changes = np.zeros_like(close_prices)
+        changes[:, 1:] = np.diff(close_prices, axis=1)
+        up_averages = BatchIndicatorComputer._ewm(np.maximum(changes, 0.0), 1.0 / window)
+        down_averages = BatchIndicatorComputer._ewm(np.maximum(-changes, 0.0), 1.0 / window)
+        totals = up_averages + down_averages
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = np.where(totals != 0, 100 * up_averages / totals, 50.0)
+        rsi[:, 0] = 50.0
+
+        return rsi
+
+    @staticmethod
+    def bollinger(close_prices, window=BOLL_WINDOW, std_times=BOLL_STD_TIMES):
+        """
+        Bollinger bands of each row
+
+        :param close_prices: The close prices, one row per data line
+        :type close_prices: numpy.ndarray
+        :param window: Window of the moving average and standard deviation
+        :type window: int
+        :param std_times: Number of standard deviations between the moving average and the bands
+        :type std_times: float
+        :return: A tuple containing the moving average (boll), the upper band and the lower band
+        :rtype: tuple
+        """
+        windows = BatchIndicatorComputer._get_windows(close_prices, window)
+        counts = BatchIndicatorComputer._get_counts(close_prices.shape[1], window)
+        averages = np.nansum(windows, axis=-1) / counts
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Sample standard deviation, nan when there is only one value
+            deviations = np.sqrt(np.nansum((windows - averages[..., np.newaxis]) ** 2, axis=-1) / (counts - 1))
+
+        width = std_times * deviations
+        return averages, averages + width, averages - width
+
+    @staticmethod
+    def ichimoku(high_prices, low_prices, close_prices, window_1, window_2, window_3):
+        """
+        Ichimoku cloud of each row. The tenkan sen and kijun sen are the middles of the rolling highs and lows, the
+        leading spans are shifted window_2 candles forward and the chikou span is the close price of window_2 candles
+        later
+
+        :param high_prices: The highest prices, one row per data line
+        :type high_prices: numpy.ndarray
+        :param low_prices: The lowest prices, one row per data line
+        :type low_prices: numpy.ndarray
+        :param close_prices: The close prices, one row per data line
+        :type close_prices: numpy.ndarray
+        :param window_1: Minimum window (used for tenkan-sen)
+        :type window_1: int
+        :param window_2: Intermediate window (used for kijun-sen, senkou-span-a, chikou-span)
+        :type window_2: int
+        :param window_3: Maximum window (used for senkou-span-b)
+        :type window_3: int
+        :return: A tuple containing the tenkan sen, kijun sen, senkou span a, senkou span b and chikou span
+        :rtype: tuple
+        """
+        def middle(window):
+            # Middle of the rolling high and low, nan until the window is full
+            return (BatchIndicatorComputer._rolling_extremum(high_prices, window, np.max)
+                    + BatchIndicatorComputer._rolling_extremum(low_prices, window, np.min)) / 2
+
+        def shift(values, periods):
+            shifted = np.full_like(values, np.nan)
+            if periods >= 0:
+                shifted[:, periods:] = values[:, :values.shape[1] - periods]
+            else:
+                shifted[:, :periods] = values[:, -periods:]
+            return shifted
+
+        tenkan_sen = middle(window_1)
+        kijun_sen = middle(window_2)
+        senkou_span_a = shift((tenkan_sen + kijun_sen) / 2, window_2)
+        senkou_span_b = shift(middle(window_3), window_2)
+        chikou_span = shift(close_prices, -window_2)
+
+        return tenkan_sen, kijun_sen, senkou_span_a, senkou_span_b, chikou_span
+
+    @staticmethod
+    def _get_windows(values, window):
+        """
+        Get the rolling windows of each row, the values preceding the rows are nan
+
+        :param values: The values, one row per data line
+        :type values: numpy.ndarray
+        :param window: Number of values of a window
+        :type window: int
+        :return: A read only view of the windows (rows, values, window)
+        :rtype: numpy.ndarray
+        """
+        padded_values = np.concatenate([np.full((values.shape[0], window - 1), np.nan), values], axis=1)
+        return np.lib.stride_tricks.sliding_window_view(padded_values, window, axis=1)
+
+    @staticmethod
+    def _get_counts(length, window):
+        """
+        Get the number of values available in the rolling windows
+
+        :param length: Number of values of a row
+        :type length: int
+        :param window: Number of values of a window
+        :type window: int
+        :return: The number of values of each window
+        :rtype: numpy.ndarray
+        """
+        return np.minimum(np.arange(1, length + 1), window).astype(np.float64)
+
+    @staticmethod
+    def _rolling_extremum(values, window, extremum_function):
+        """
+        Rolling max or min of each row, nan until the window is full
+
+        :param values: The values, one row per data line
+        :type values: numpy.ndarray
+        :param window: Number of values of a window
+        :type window: int
+        :param extremum_function: np.max or np.min
+        :type extremum_function: function
+        :return: The extrema
+        :rtype: numpy.ndarray
+        """
+        extrema = np.full_like(values, np.nan)
+        if values.shape[1] >= window:
+            extrema[:, window - 1:] = extremum_function(
+                np.lib.stride_tricks.sliding_window_view(values, window, axis=1), axis=-1)
+        return extrema
+
+    @staticmethod
+    def _ewm(values, alpha):
+        """
+        Adjusted exponential weighted mean of each row: a weighted sum of the values divided by the sum of the weights,
+        computed for all the rows and all the positions with a single matrix product
+
+        :param values: The values, one row per data line
+        :type values: numpy.ndarray
+        :param alpha: Smoothing factor
+        :type alpha: float
+        :return: The means
+        :rtype: numpy.ndarray
+        """
+        weights = BatchIndicatorComputer._get_ewm_weights(1.0 - alpha, values.shape[1])
+        return (values @ weights) / weights.sum(axis=0)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _get_ewm_weights(decay, length):
+        """
+        Get the weights of an exponential weighted mean: the weight of the value i in the mean at position j
+
+        :param decay: Decay of the weights (1 - alpha)
+        :type decay: float
+        :param length: Number of values of a row
+        :type length: int
+        :return: An upper triangular matrix of weights decay ** (j - i)
+        :rtype: numpy.ndarray
+        """
+        positions = np.arange(length)
+        lags = positions[np.newaxis, :] - positions[:, np.newaxis]
+        weights = np.where(lags >= 0, decay ** np.maximum(lags, 0), 0.0)
+        weights.flags.writeable = False
+        return weights
@@ -0,0 +1,167 @@
+import functools
+
+import numpy as np
+
+from entities.CandlestickFigure import CandlestickShapeEnum
+
+
+class CandlestickPatternScanner(object):
+    """
+    Vectorized candlestick pattern scanner.
+    Each pattern is detected over a whole candle series at once with numpy (one boolean per candle) instead of one
+    candle at a time, so the pattern history of a data line can be used as a feature. The patterns of a candle are
+    also given as a bitmask (bit shape.value set for each detected shape). New patterns are added with register
+    """
+
+    _detectors = {}  # Detection function by candlestick shape
+
+    @classmethod
+    def register(cls, shape, detector):
+        """
+        Register a pattern detector
+
+        :param shape: The candlestick shape
+        :type shape: CandlestickShapeEnum
+        :param detector: Function of the open, high, low and close prices arrays returning a boolean array (True for
+                         the candles ending the pattern)
+        :type detector: function
+        """
+        cls._detectors[shape] = detector
+
+    @classmethod
+    def scan(cls, open_prices, high_prices, low_prices, close_prices):
+        """
+        Detect the registered patterns over a candle series
+
+        :param open_prices: The open prices
+        :type open_prices: numpy.ndarray
+        :param high_prices: The highest prices
+        :type high_prices: numpy.ndarray
+        :param low_prices: The lowest prices
+        :type low_prices: numpy.ndarray
+        :param close_prices: The close prices
+        :type close_prices: numpy.ndarray
+        :return: A boolean array for each candlestick shape
+        :rtype: dict[CandlestickShapeEnum, numpy.ndarray]
+        """
+        return {shape: detector(open_prices, high_prices, low_prices, close_prices)
+                for shape, detector in cls._detectors.items()}
+
+    @classmethod
+    def get_masks(cls, open_prices, high_prices, low_prices, close_prices):
+        """
+        Detect the registered patterns over a candle series and combine them into bitmasks
+
+        :param open_prices: The open prices
+        :type open_prices: numpy.ndarray
+        :param high_prices: The highest prices
+        :type high_prices: numpy.ndarray
+        :param low_prices: The lowest prices
+        :type low_prices: numpy.ndarray
+        :param close_prices: The close prices
+        :type close_prices: numpy.ndarray
+        :return: A bitmask per candle, bit shape.value is set if the candle ends the pattern
+        :rtype: numpy.ndarray
+        """
+        masks = np.zeros(len(close_prices), dtype=np.int64)
+
+        for shape, detected in cls.scan(open_prices, high_prices, low_prices, close_prices).items():
+            masks |= detected.astype(np.int64) << shape.value
+
+        return masks
+
+    @staticmethod
+    def has_shape(masks, shape):
+        """
+        Tells which candles end a pattern
+
+        :param masks: The bitmasks given by get_masks
+        :type masks: numpy.ndarray
+        :param shape: The candlestick shape
+        :type shape: CandlestickShapeEnum
+        :return: A boolean per candle
+        :rtype: numpy.ndarray
+        """
+        return (masks >> shape.value) & 1 == 1
+
+
+def _with_previous(values, count):
+    """Values of the candle count candles before (nan for the first candles)"""
+    previous_values = np.full(len(values), np.nan)
+    previous_values[count:] = values[:len(values) - count]
+    return previous_values
+
+
+def _is_hammer_or_hanging_man(open_prices, high_prices, low_prices, close_prices):
+    """Same test as StockDataPoint.is_hammer_or_hanging_man"""
+    high_minus_low = high_prices - low_prices
+    return (np.abs(open_prices - close_prices) < high_minus_low / 3) \
+        & (high_prices - np.minimum(open_prices, close_prices) < high_minus_low / 3)
+
+
+def _is_reversed_hammer_or_falling_star(open_prices, high_prices, low_prices, close_prices):
+    """Same test as StockDataPoint.is_reversed_hammer_or_falling_star"""
+    high_minus_low = high_prices - low_prices
+    return (np.abs(open_prices - close_prices) < high_minus_low / 3) \
+        & (np.maximum(open_prices, close_prices) - low_prices < high_minus_low / 3)
+
+
+def _is_swallowing(open_prices, high_prices, low_prices, close_prices):
+    """Same test as StockDataPoint.is_a_swallowing with the previous candle"""
+    highest_of_open_close = np.maximum(open_prices, close_prices)
+    lowest_of_open_close = np.minimum(open_prices, close_prices)
+    return (_with_previous(lowest_of_open_close, 1) < lowest_of_open_close) \
+        & (lowest_of_open_close < highest_of_open_close) \
+        & (highest_of_open_close < _with_previous(highest_of_open_close, 1))
+
+
+def _is_harami(open_prices, high_prices, low_prices, close_prices):
+    """Same test as StockDataPoint.is_an_harami with the previous candle"""
+    highest_of_open_close = np.maximum(open_prices, close_prices)
+    lowest_of_open_close = np.minimum(open_prices, close_prices)
+    return (lowest_of_open_close < _with_previous(lowest_of_open_close, 1)) \
+        & (_with_previous(lowest_of_open_close, 1) < _with_previous(highest_of_open_close, 1)) \
+        & (_with_previous(highest_of_open_close, 1) < highest_of_open_close)
+
+
+def _is_doji(open_prices, high_prices, low_prices, close_prices):
+    """Body smaller than a tenth of the candle range"""
+    return (high_prices > low_prices) & (np.abs(open_prices - close_prices) <= (high_prices - low_prices) / 10)
+
+
+def _is_star(open_prices, high_prices, low_prices, close_prices, direction):
+    """
+    Star ending a trend: a long candle, a small one, then a candle of the opposite color closing beyond the middle of
+    the first one. Direction is 1 for a morning star (after a fall) and -1 for an evening star
+    """
+    bodies = close_prices - open_prices
+    first_bodies = _with_previous(bodies, 2)
+    first_middles = (_with_previous(open_prices, 2) + _with_previous(close_prices, 2)) / 2
+    return (direction * first_bodies < 0) & (np.abs(_with_previous(bodies, 1)) < np.abs(first_bodies) / 3) \
+        & (direction * bodies > 0) & (direction * (close_prices - first_middles) > 0)
+
+
+def _are_three_candles(open_prices, high_prices, low_prices, close_prices, direction):
+    """
+    Three candles of the same color, each one opening within the previous body and closing beyond the previous close.
+    Direction is 1 for three white soldiers and -1 for three black crows
+    """
+    rising = (direction * (close_prices - open_prices) > 0) \
+        & (direction * (close_prices - _with_previous(close_prices, 1)) > 0) \
+        & (direction * (open_prices - _with_previous(open_prices, 1)) > 0) \
+        & (direction * (_with_previous(close_prices, 1) - open_prices) > 0)
+    return rising & (_with_previous(rising.astype(np.float64), 1) == 1)
+
+
+CandlestickPatternScanner.register(CandlestickShapeEnum.HAMMER_OR_HANGING_MAN, _is_hammer_or_hanging_man)
+CandlestickPatternScanner.register(CandlestickShapeEnum.REVERSED_HAMMER_OR_FALLING_STAR,
+                                   _is_reversed_hammer_or_falling_star)
+CandlestickPatternScanner.register(CandlestickShapeEnum.SWALLOWING, _is_swallowing)
+CandlestickPatternScanner.register(CandlestickShapeEnum.HARAMI, _is_harami)
+CandlestickPatternScanner.register(CandlestickShapeEnum.DOJI, _is_doji)
+CandlestickPatternScanner.register(CandlestickShapeEnum.MORNING_STAR, functools.partial(_is_star, direction=1))
+CandlestickPatternScanner.register(CandlestickShapeEnum.EVENING_STAR, functools.partial(_is_star, direction=-1))
+CandlestickPatternScanner.register(CandlestickShapeEnum.THREE_WHITE_SOLDIERS,
+                                   functools.partial(_are_three_candles, direction=1))
+CandlestickPatternScanner.register(CandlestickShapeEnum.THREE_BLACK_CROWS,
+                                   functools.partial(_are_three_candles, direction=-1))
@@ -0,0 +1,29 @@
+class ChangeState(object):
+    """
+    Running change of a value since the previous step (0 at the first step, like the changes used by the stockstats rsi)
+    """
+
+    def __init__(self):
+        """Change state constructor"""
+        self._last_value = None
+        self._previous_value = None  # Value before the last one, to redo the last step
+        self.value = 0.0
+
+    def update(self, value, revise=False):
+        """
+        Advance the change by one step
+
+        :param value: The new value
+        :type value: float
+        :param revise: Redo the last step with this value instead of advancing
+        :type revise: bool
+        :return: The change
+        :rtype: float
+        """
+        if not revise or self._last_value is None:
+            self._previous_value = self._last_value
+
+        self._last_value = value
+        self.value = 0.0 if self._previous_value is None else value - self._previous_value
+
+        return self.value
@@ -0,0 +1,42 @@
+import math
+
+
+class EmaState(object):
+    """
+    Running exponential moving average.
+    It gives the same values as a pandas adjusted ewm (the one used by stockstats): the weighted sum of the values and
+    the sum of the weights are both updated at each step
+    """
+
+    def __init__(self, alpha):
+        """
+        Ema state constructor
+
+        :param alpha: Smoothing factor (2 / (window + 1) for an ema, 1 / window for a wilder smoothed average)
+        :type alpha: float
+        """
+        self._decay = 1.0 - alpha
+        self._weighted_sum = 0.0
+        self._weight_sum = 0.0
+        self._previous_sums = (0.0, 0.0)  # Sums before the last step, to redo it
+        self.value = math.nan
+
+    def update(self, value, revise=False):
+        """
+        Advance the average by one step
+
+        :param value: The new value
+        :type value: float
+        :param revise: Redo the last step with this value instead of advancing
+        :type revise: bool
+        :return: The average
+        :rtype: float
+        """
+        if not revise:
+            self._previous_sums = (self._weighted_sum, self._weight_sum)
+
+        self._weighted_sum = value + self._decay * self._previous_sums[0]
+        self._weight_sum = 1.0 + self._decay * self._previous_sums[1]
+        self.value = self._weighted_sum / self._weight_sum
+
+        return self.value
@@ -0,0 +1,29 @@
+class FunctionState(object):
+    """
+    Stateless step of an indicator: its value is a function of the values of its inputs at the same candle
+    """
+
+    def __init__(self, function):
+        """
+        Function state constructor
+
+        :param function: Function of the input values
+        :type function: function
+        """
+        self._function = function
+        self.value = None
+
+    def update(self, *values, revise=False):
+        """
+        Compute the value at a new candle
+
+        :param values: The values of the inputs
+        :type values: float
+        :param revise: Redo the last step (no difference for a stateless step)
+        :type revise: bool
+        :return: The value
+        :rtype: float
+        """
+        self.value = self._function(*values)
+
+        return self.value
@@ -0,0 +1,107 @@
+import collections
+import math
+
+from entities.IchimokuPoint import IchimokuPoint
+from indicators.RollingExtremumState import RollingExtremumState
+
+
+class IchimokuCalculator(object):
+    """
+    Incremental ichimoku cloud, giving the same values as BatchIndicatorComputer.ichimoku.
+    The rolling highs and lows are running states so a candle costs O(1) amortized. The leading spans are the values
+    computed window_2 candles before and the chikou span of a point is filled in window_2 candles later, when the
+    close price it's made of is known
+    """
+
+    def __init__(self, window_1, window_2, window_3):
+        """
+        Ichimoku calculator constructor
+
+        :param window_1: Minimum window (used for tenkan-sen)
+        :type window_1: int
+        :param window_2: Intermediate window (used for kijun-sen, senkou-span-a, chikou-span)
+        :type window_2: int
+        :param window_3: Maximum window (used for senkou-span-b)
+        :type window_3: int
+        """
+        self._window_1 = window_1
+        self._window_2 = window_2
+        self._window_3 = window_3
+        self._states = []
+        self._leading_spans = collections.deque()  # Senkou span a and b of the last window_2 + 1 candles
+        self._points = collections.deque()  # Point (or None) of the last window_2 + 1 candles
+        self._last_identifier = None
+        self.reset()
+
+    def reset(self):
+        """Drop the states and the points"""
+        # Rolling highs and lows of the three windows
+        self._states = [RollingExtremumState(window, minimum)
+                        for window in [self._window_1, self._window_2, self._window_3] for minimum in [False, True]]
+        self._leading_spans = collections.deque(maxlen=self._window_2 + 1)
+        self._points = collections.deque(maxlen=self._window_2 + 1)
+        self._last_identifier = None
+
+    def get_last_identifier(self):
+        """
+        Return the identifier of the last candle the calculator was advanced with
+
+        :return: The identifier (None if there was no candle)
+        :rtype: int
+        """
+        return self._last_identifier
+
+    def step(self, identifier, high_price, low_price, close_price):
+        """
+        Advance the ichimoku cloud with a candle, or redo the last step if the candle is the last one again
+
+        :param identifier: Identifier of the candle
+        :type identifier: int
+        :param high_price: Highest price of the candle
+        :type high_price: float
+        :param low_price: Lowest price of the candle
+        :type low_price: float
+        :param close_price: Close price of the candle
+        :type close_price: float
+        :return: The new or replaced ichimoku points, sorted by identifier asc (the point of this candle once the
+                 leading spans are known and the point window_2 candles before with its chikou span)
+        :rtype: list[IchimokuPoint]
+        """
+        revise = identifier == self._last_identifier
+        self._last_identifier = identifier
+
+        high_1, low_1, high_2, low_2, high_3, low_3 = [
+            state.update(price, revise) for state, price in zip(self._states, [high_price, low_price] * 3)
+        ]
+        tenkan_sen = (high_1 + low_1) / 2
+        kijun_sen = (high_2 + low_2) / 2
+        leading_spans = ((tenkan_sen + kijun_sen) / 2, (high_3 + low_3) / 2)
+
+        if revise:
+            self._leading_spans[-1] = leading_spans
+        else:
+            self._leading_spans.append(leading_spans)
+
+        point = None
+        if len(self._leading_spans) > self._window_2:
+            senkou_span_a, senkou_span_b = self._leading_spans[0]
+            if not math.isnan(tenkan_sen) and not math.isnan(kijun_sen) and not math.isnan(senkou_span_a) \
+                    and not math.isnan(senkou_span_b):
+                point = IchimokuPoint(identifier, tenkan_sen, kijun_sen, senkou_span_a, senkou_span_b, math.nan)
+
+        if revise:
+            self._points[-1] = point
+        else:
+            self._points.append(point)
+
+        changed_points = [] if point is None else [point]
+
+        if len(self._points) > self._window_2 and self._points[0] is not None:
+            # The close price of this candle is the chikou span of the point window_2 candles before
+            previous_point = self._points[0]
+            self._points[0] = IchimokuPoint(previous_point.identifier, previous_point.tenkan_sen,
+                                            previous_point.kijun_sen, previous_point.senkou_span_a,
+                                            previous_point.senkou_span_b, close_price)
+            changed_points.insert(0, self._points[0])
+
+        return changed_points
@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+
+from indicators.IndicatorGraph import IndicatorGraph
+
+
+class IndicatorEngine(object):
+    """
+    Streaming indicator engine.
+    Each indicator keeps a running state advanced by one step per new candle, the last step is done again when the in
+    progress candle is updated: a candle costs a few float operations per indicator instead of a computation over the
+    whole history. The indicators declared by the strategies (or requested) are computed by a single graph sharing the
+    intermediate indicators, the other ones are never computed. The graph only catches up with the candles changed in
+    a data line snapshot when an indicator is requested, and the engine is only used by the readers: the data line
+    writer never waits for it. Indicator names follow the stockstats ones (close_10_sma, close_21_ema, macdh, rsi_14...)
+    """
+
+    def __init__(self, size):
+        """
+        Indicator engine constructor
+
+        :param size: Max number of values kept for each indicator (number of candles of the data line)
+        :type size: int
+        """
+        self._size = size
+        self._graph = IndicatorGraph(size)  # Graph of the requested indicators
+        self._lock = threading.Lock()  # Guards the graph against concurrent readers
+
+    def require(self, indicator_names):
+        """
+        Declare the indicators that will be requested, they are computed together by the same graph
+
+        :param indicator_names: Names of the indicators
+        :type indicator_names: list[str]
+        """
+        with self._lock:
+            if self._graph.add(indicator_names):
+                self._graph.reset()
+
+    def get_values(self, indicator_name, snapshot):
+        """
+        Get the values of an indicator, one per candle of a data line snapshot. The indicators catch up with the
+        candles changed since they were last requested
+
+        :param indicator_name: Name of the indicator
+        :type indicator_name: str
+        :param snapshot: The data line snapshot
+        :type snapshot: StockDataSnapshot
+        :return: The values sorted by candle identifier asc
+        :rtype: numpy.ndarray
+        """
+        with self._lock:
+            if self._graph.add([indicator_name]):
+                # Not declared: the indicators are computed again with it
+                self._graph.reset()
+
+            graph = self._graph
+
+            if graph.data_version > snapshot.get_data_version():
+                # The snapshot is older than the data the graph caught up with: computed apart
+                graph = IndicatorGraph(self._size)
+                graph.add(self._graph.get_requested_names())
+
+            graph.catch_up(snapshot)
+            values = graph.values[indicator_name]
+
+            return np.fromiter(values, dtype=np.float64, count=len(values))
@@ -0,0 +1,152 @@
+import collections
+
+import numpy as np
+
+from exceptions.BotsicoteException import BotsicoteException
+from indicators.IndicatorRegistry import CANDLE_COLUMNS, IndicatorRegistry
+
+
+class IndicatorGraph(object):
+    """
+    Computation graph of the streamed indicators of a data line.
+    Each indicator is a node fed with the values of its inputs (candle columns or other nodes) at each candle, the
+    nodes are kept in dependency order and each one is computed once per candle whatever the number of indicators
+    using it. Only the values of the requested indicators are kept
+    """
+
+    def __init__(self, size):
+        """
+        Indicator graph constructor
+
+        :param size: Max number of values kept for each requested indicator (number of candles of the data line)
+        :type size: int
+        """
+        self._size = size
+        self._nodes = []  # Tuples of indicator name, input names and state factory, in dependency order
+        self._node_names = set()
+        self._columns = []  # Candle columns used by the nodes
+        self._requested_names = []
+        self._steps = []  # Tuples of indicator name, input names and update method of the node state
+        self.values = {}  # Values of each requested indicator
+        self.last_identifier = None  # Identifier of the last candle the graph was advanced with
+        self.data_version = 0  # Version of the data line the graph caught up with
+        self.reset()
+
+    def get_requested_names(self):
+        """
+        Return the names of the requested indicators
+
+        :return: The indicator names
+        :rtype: list[str]
+        """
+        return self._requested_names
+
+    def add(self, indicator_names):
+        """
+        Add indicators and the ones they are made of to the graph. The graph has to be computed again if the graph
+        changed
+
+        :param indicator_names: Names of the indicators
+        :type indicator_names: list[str]
+        :return: True if indicators were added, False otherwise
+        :rtype: bool
+        """
+        requested_count = len(self._requested_names)
+
+        for indicator_name in indicator_names:
+            self._add_node(indicator_name, [])
+            if indicator_name not in self._requested_names:
+                self._requested_names.append(indicator_name)
+                self.values[indicator_name] = collections.deque(maxlen=self._size)
+
+        return len(self._requested_names) > requested_count
+
+    def reset(self):
+        """Drop the states and the values"""
+        self._steps = [(indicator_name, input_names, state_factory().update)
+                       for indicator_name, input_names, state_factory in self._nodes]
+        self.values = {indicator_name: collections.deque(maxlen=self._size) for indicator_name in self._requested_names}
+        self.last_identifier = None
+        self.data_version = 0
+
+    def catch_up(self, snapshot):
+        """
+        Advance the graph with the candles of a snapshot changed since its last catch up
+
+        :param snapshot: The data line snapshot (not older than the last one the graph caught up with)
+        :type snapshot: StockDataSnapshot
+        """
+        data_version = snapshot.get_data_version()
+
+        if self.data_version == data_version or len(snapshot) == 0:
+            return
+
+        changed_identifiers = [identifier for version, identifier in snapshot.get_changes()
+                               if version > self.data_version]
+        identifiers = snapshot.get_column("id")
+
+        if self.last_identifier is None or len(changed_identifiers) < data_version - self.data_version \
+                or min(changed_identifiers) < self.last_identifier or self.last_identifier < identifiers[0]:
+            # Never computed, too many or too old changes (rare): computed again over the data line
+            self.reset()
+            first_index = 0
+        else:
+            first_index = int(np.searchsorted(identifiers, min(changed_identifiers)))
+
+        columns = [snapshot.get_column(name)[first_index:].tolist() for name in self._columns]
+        for identifier, row in zip(identifiers[first_index:].tolist(), zip(*columns)):
+            self._step(identifier, dict(zip(self._columns, row)))
+
+        self.data_version = data_version
+
+    def _step(self, identifier, values):
+        """
+        Advance the nodes with a candle, or redo the last step if the candle is the last one again
+
+        :param identifier: Identifier of the candle
+        :type identifier: int
+        :param values: Values of the candle columns used by the nodes by column name, filled with the node values
+        :type values: dict
+        """
+        revise = identifier == self.last_identifier
+
+        for indicator_name, input_names, update in self._steps:
+            if len(input_names) == 1:
+                values[indicator_name] = update(values[input_names[0]], revise=revise)
+            else:
+                values[indicator_name] = update(*[values[input_name] for input_name in input_names], revise=revise)
+
+        for indicator_name in self._requested_names:
+            if revise:
+                self.values[indicator_name][-1] = values[indicator_name]
+            else:
+                self.values[indicator_name].append(values[indicator_name])
+
+        self.last_identifier = identifier
+
+    def _add_node(self, indicator_name, path):
+        """
+        Add a node after the nodes of its inputs
+
+        :param indicator_name: Name of the indicator
+        :type indicator_name: str
+        :param path: Names of the indicators being added that depend on this one
+        :type path: list[str]
+        """
+        if indicator_name in CANDLE_COLUMNS:
+            if indicator_name not in self._columns:
+                self._columns.append(indicator_name)
+            return
+
+        if indicator_name in self._node_names:
+            return
+
+        if indicator_name in path:
+            raise BotsicoteException("Indicator %s depends on itself" % indicator_name)
+
+        input_names, state_factory = IndicatorRegistry.get_definition(indicator_name)
+        for input_name in input_names:
+            self._add_node(input_name, path + [indicator_name])
+
+        self._nodes.append((indicator_name, input_names, state_factory))
+        self._node_names.add(indicator_name)
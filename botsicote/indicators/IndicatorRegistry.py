@@ -0,0 +1,118 @@
+import re
+
+from exceptions.BotsicoteException import BotsicoteException
+from indicators.ChangeState import ChangeState
+from indicators.EmaState import EmaState
+from indicators.FunctionState import FunctionState
+from indicators.SmaState import SmaState
+
+"""Candle columns the indicators can be computed from"""
+CANDLE_COLUMNS = ["open", "high", "low", "close", "vwap", "volume", "count"]
+
+AVERAGE_PATTERN = re.compile(r"^(.+)_(\d+)_(sma|ema|smma)$")
+CHANGE_PATTERN = re.compile(r"^(.+)_change(_up|_down)?$")
+MACD_PATTERN = re.compile(r"^macd[sh]?$")
+RSI_PATTERN = re.compile(r"^rsi(_(\d+))?$")
+DEFAULT_RSI_WINDOW = 14
+
+
+class IndicatorRegistry(object):
+    """
+    Registry of the streamed indicators.
+    An indicator is defined by the names of its inputs (candle columns or other indicators) and a running state fed
+    with the input values at each candle. The definitions are looked up by name pattern, so an indicator like macdh is
+    made of close_12_ema, close_26_ema, macd and macd_9_ema: the indicator engine builds the graph of the requested
+    indicators and computes each intermediate indicator once even if several indicators use it. New indicators are
+    added with register
+    """
+
+    _builders = []  # Tuples of name pattern and definition builder, the first matching pattern is used
+
+    @classmethod
+    def register(cls, pattern, builder):
+        """
+        Register an indicator definition
+
+        :param pattern: Pattern of the indicator names
+        :type pattern: re.Pattern
+        :param builder: Function of the name match returning a tuple of input names and state factory (function
+                        returning a new running state, update(*input_values, revise=False) method)
+        :type builder: function
+        """
+        cls._builders.append((pattern, builder))
+
+    @classmethod
+    def is_supported(cls, indicator_name):
+        """
+        Tells if an indicator can be streamed: it's defined and its inputs are candle columns or streamed indicators
+
+        :param indicator_name: Name of the indicator
+        :type indicator_name: str
+        :return: True if the indicator can be streamed, False otherwise
+        :rtype: bool
+        """
+        for pattern, builder in cls._builders:
+            match = pattern.match(indicator_name)
+            if match is not None:
+                input_names, _ = builder(match)
+                return all(input_name in CANDLE_COLUMNS or cls.is_supported(input_name) for input_name in input_names)
+
+        return False
+
+    @classmethod
+    def get_definition(cls, indicator_name):
+        """
+        Get the definition of an indicator
+
+        :param indicator_name: Name of the indicator
+        :type indicator_name: str
+        :return: A tuple of input names and state factory
+        :rtype: tuple
+        """
+        for pattern, builder in cls._builders:
+            match = pattern.match(indicator_name)
+            if match is not None:
+                return builder(match)
+
+        raise BotsicoteException("Indicator %s can't be streamed" % indicator_name)
+
+
+def _build_average(match):
+    """Moving averages of a column or an indicator: close_10_sma, close_21_ema, close_change_up_14_smma..."""
+    window = int(match.group(2))
+    if match.group(3) == "sma":
+        return [match.group(1)], lambda: SmaState(window)
+    if match.group(3) == "ema":
+        return [match.group(1)], lambda: EmaState(2.0 / (window + 1))
+    return [match.group(1)], lambda: EmaState(1.0 / window)  # Wilder average
+
+
+def _build_change(match):
+    """Change since the previous candle (close_change), its positive part (_up) or negative part (_down)"""
+    if match.group(2) is None:
+        return [match.group(1)], ChangeState
+    if match.group(2) == "_up":
+        return [match.group(1) + "_change"], lambda: FunctionState(lambda change: max(change, 0.0))
+    return [match.group(1) + "_change"], lambda: FunctionState(lambda change: max(-change, 0.0))
+
+
+def _build_macd(match):
+    """Like stockstats: macd = close 12 ema - close 26 ema, macds = macd 9 ema and macdh = macd - macds"""
+    if match.group(0) == "macd":
+        return ["close_12_ema", "close_26_ema"], lambda: FunctionState(lambda short, long: short - long)
+    if match.group(0) == "macds":
+        return ["macd_9_ema"], lambda: FunctionState(lambda macds: macds)
+    return ["macd", "macds"], lambda: FunctionState(lambda macd, macds: macd - macds)
+
+
+def _build_rsi(match):
+    """Like stockstats: wilder averages of the ups and downs of the close price, 50 when there is no change"""
+    window = DEFAULT_RSI_WINDOW if match.group(2) is None else int(match.group(2))
+    return ["close_change_up_%d_smma" % window, "close_change_down_%d_smma" % window], \
+        lambda: FunctionState(lambda up, down: 50.0 if up + down == 0 else 100 * up / (up + down))
+
+
+IndicatorRegistry.register(AVERAGE_PATTERN, _build_average)
+IndicatorRegistry.register(CHANGE_PATTERN, _build_change)
+IndicatorRegistry.register(MACD_PATTERN, _build_macd)
+IndicatorRegistry.register(RSI_PATTERN, _build_rsi)
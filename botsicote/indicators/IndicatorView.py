@@ -0,0 +1,95 @@
+import threading
+
+import pandas as pd
+import stockstats
+
+from indicators.IndicatorRegistry import IndicatorRegistry
+
+
+class IndicatorView(object):
+    """
+    Indicators of a data line snapshot by name, read like a stockstats data frame (view["close_10_sma"] for instance).
+    An indicator is only computed when it is requested: the streamed ones catch up in the indicator engine, the other
+    ones are computed by stockstats over the data line. The results are memoized with the snapshot, so they are shared
+    by all the readers of the data line (technical analyses, strategies) until the next update
+    """
+
+    def __init__(self, indicator_engine, snapshot):
+        """
+        Indicator view constructor
+
+        :param indicator_engine: The indicator engine of the data line
+        :type indicator_engine: IndicatorEngine
+        :param snapshot: The data line snapshot
+        :type snapshot: StockDataSnapshot
+        """
+        self._indicator_engine = indicator_engine
+        self._snapshot = snapshot
+        self._series = {}  # Memoized indicator values by indicator name
+        self._index = None
+        self._stockstats_frame = None
+        self._stockstats_lock = threading.Lock()  # Guards the stockstats frame, its columns are added when requested
+
+    def __getitem__(self, indicator_name):
+        """
+        Get the values of an indicator
+
+        :param indicator_name: Name of the indicator (stockstats name)
+        :type indicator_name: str
+        :return: The indicator values indexed by candle time
+        :rtype: pd.Series
+        """
+        if indicator_name not in self._series:
+            # Readers computing the same indicator at the same time all get the first stored values
+            return self._series.setdefault(indicator_name, self._compute(indicator_name))
+
+        return self._series[indicator_name]
+
+    def set_values(self, indicator_name, values):
+        """
+        Store the values of an indicator computed elsewhere (batch computation), unless they were already computed
+
+        :param indicator_name: Name of the indicator (stockstats name)
+        :type indicator_name: str
+        :param values: The values, one per candle of the snapshot
+        :type values: numpy.ndarray
+        """
+        self._series.setdefault(indicator_name, pd.Series(values, index=self._get_index(), name=indicator_name))
+
+    def _get_index(self):
+        """
+        Get the index of the indicator values
+
+        :return: The candle times
+        :rtype: pd.Index
+        """
+        if self._index is None:
+            self._index = pd.Index(self._snapshot.get_column("time"), name="date")
+        return self._index
+
+    def _compute(self, indicator_name):
+        """
+        Compute the values of an indicator over the snapshot
+
+        :param indicator_name: Name of the indicator (stockstats name)
+        :type indicator_name: str
+        :return: The indicator values indexed by candle time
+        :rtype: pd.Series
+        """
+        if IndicatorRegistry.is_supported(indicator_name):
+            return pd.Series(self._indicator_engine.get_values(indicator_name, self._snapshot),
+                             index=self._get_index(), name=indicator_name)
+
+        with self._stockstats_lock:
+            if self._stockstats_frame is None:
+                self._stockstats_frame = stockstats.StockDataFrame.retype(pd.DataFrame({
+                    "date": self._snapshot.get_column("time"),
+                    "amount": self._snapshot.get_column("count"),
+                    "close": self._snapshot.get_column("close"),
+                    "high": self._snapshot.get_column("high"),
+                    "low": self._snapshot.get_column("low"),
+                    "open": self._snapshot.get_column("open"),
+                    "volume": self._snapshot.get_column("volume")
+                }))
+
+            return self._stockstats_frame[indicator_name]
@@ -0,0 +1,59 @@
+import collections
+import math
+
+
+class RollingExtremumState(object):
+    """
+    Running rolling max (or min) over a window, like pandas rolling(window).max() (nan until the window is full).
+    The values preceding the last one are kept in a monotonic deque: its first value is the extremum and each value is
+    pushed and dropped once, so a step costs O(1) amortized. The last value is compared apart, which makes redoing the
+    last step O(1) too
+    """
+
+    def __init__(self, window, minimum=False):
+        """
+        Rolling extremum state constructor
+
+        :param window: Number of values of the window
+        :type window: int
+        :param minimum: Compute the rolling min instead of the rolling max
+        :type minimum: bool
+        """
+        self._window = window
+        self._sign = -1.0 if minimum else 1.0  # The min is the opposite of the max of the opposite values
+        self._candidates = collections.deque()  # Tuples of index and signed value, decreasing values
+        self._last_value = None  # Signed last value
+        self._index = -1  # Index of the last value
+        self.value = math.nan
+
+    def update(self, value, revise=False):
+        """
+        Advance the window by one step
+
+        :param value: The new value
+        :type value: float
+        :param revise: Redo the last step with this value instead of advancing
+        :type revise: bool
+        :return: The extremum (nan while the window isn't full)
+        :rtype: float
+        """
+        if not revise or self._last_value is None:
+            if self._last_value is not None:
+                while len(self._candidates) > 0 and self._candidates[-1][1] <= self._last_value:
+                    self._candidates.pop()
+                self._candidates.append((self._index, self._last_value))
+            self._index += 1
+
+            while len(self._candidates) > 0 and self._candidates[0][0] <= self._index - self._window:
+                self._candidates.popleft()
+
+        self._last_value = self._sign * value
+
+        if self._index + 1 < self._window:
+            self.value = math.nan
+        elif len(self._candidates) > 0 and self._candidates[0][1] > self._last_value:
+            self.value = self._sign * self._candidates[0][1]
+        else:
+            self.value = self._sign * self._last_value
+
+        return self.value
@@ -0,0 +1,50 @@
+import collections
+import math
+
+
+class SmaState(object):
+    """
+    Running simple moving average.
+    Like stockstats, the average of the first values is computed over the values available
+    """
+
+    def __init__(self, window):
+        """
+        Sma state constructor
+
+        :param window: Number of values of the average
+        :type window: int
+        """
+        self._window = window
+        self._values = collections.deque()
+        self._sum = 0.0
+        self._step_count = 0  # The sum is computed again from the values every window steps to drop rounding errors
+        self.value = math.nan
+
+    def update(self, value, revise=False):
+        """
+        Advance the average by one step
+
+        :param value: The new value
+        :type value: float
+        :param revise: Redo the last step with this value instead of advancing
+        :type revise: bool
+        :return: The average
+        :rtype: float
+        """
+        if revise and len(self._values) > 0:
+            self._sum += value - self._values[-1]
+            self._values[-1] = value
+        else:
+            self._values.append(value)
+            self._sum += value
+            if len(self._values) > self._window:
+                self._sum -= self._values.popleft()
+
+            self._step_count += 1
+            if self._step_count % self._window == 0:
+                self._sum = math.fsum(self._values)
+
+        self.value = self._sum / len(self._values)
+
+        return self.value
@@ -0,0 +1,176 @@
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+"""Kraken errors drawn by the error injection"""
+INJECTED_ERRORS = ["EService:Unavailable", "EService:Busy", "EGeneral:Internal error"]
+
+
+class KrakenStandInServer(object):
+    """
+    Local http stand-in of the kraken api.
+    It serves the public api calls (Time, OHLC, Trades, Ticker, Depth) from a data source (market simulator or replay
+    transport) with a configurable latency, error injection and a kraken like api call rate limit, so the whole
+    pipeline can be run and load tested without network. Point a krakenex instance to it by setting its uri
+    """
+
+    def __init__(self, data_source, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, http_error_rate=0.0,
+                 max_api_call_counter=None, decrease_period=3, seed=0):
+        """
+        Kraken stand-in server constructor
+
+        :param data_source: Object building the responses (respond(method, data) method returning a kraken response)
+        :type data_source: MarketSimulator
+        :param host: Host the server listens on
+        :type host: str
+        :param port: Port the server listens on (a free one is picked if 0)
+        :type port: int
+        :param latency: Mean number of seconds taken to answer a call (uniformly drawn between 0.5 and 1.5 times it)
+        :type latency: float
+        :param error_rate: Proportion of calls answered with a kraken service error
+        :type error_rate: float
+        :param http_error_rate: Proportion of calls answered with an http 502 error
+        :type http_error_rate: float
+        :param max_api_call_counter: Kraken api call counter limit per client (no rate limit if None)
+        :type max_api_call_counter: int
+        :param decrease_period: Number of seconds for the api call counter to decrease by one
+        :type decrease_period: float
+        :param seed: Seed of the latency and error injection
+        :type seed: int
+        """
+        self._data_source = data_source
+        self._latency = latency
+        self._error_rate = error_rate
+        self._http_error_rate = http_error_rate
+        self._max_api_call_counter = max_api_call_counter
+        self._decrease_period = decrease_period
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # Guards the random generator and the api call counters
+        self._api_call_counters = {}  # Tuples of api call counter and time of its last update by client address
+        self._call_count = 0
+        self._rate_limited_call_count = 0
+        self._server = ThreadingHTTPServer((host, port), _StandInRequestHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._t = threading.Thread(target=self._server.serve_forever, daemon=True)
+        logging.info("KrakenStandInServer initialized on %s" % self.get_uri())
+
+    def get_uri(self):
+        """
+        Get the uri to give to krakenex (instead of https://api.kraken.com)
+
+        :return: The uri of the server
+        :rtype: str
+        """
+        return "http://%s:%d" % self._server.server_address[:2]
+
+    def get_stats(self):
+        """
+        Get the number of calls served since the startup
+
+        :return: Dict containing the number of calls and the number of calls rejected by the rate limit
+        :rtype: dict
+        """
+        with self._lock:
+            return {"calls": self._call_count, "rate_limited_calls": self._rate_limited_call_count}
+
+    def start(self):
+        """Starts the server (worker)"""
+        self._t.start()
+
+    def stop(self):
+        """Stops the server (worker)"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle_call(self, client, path, data):
+        """
+        Answer an api call
+
+        :param client: Address of the client
+        :type client: str
+        :param path: Path of the called url (/0/public/OHLC for instance)
+        :type path: str
+        :param data: Api call parameters
+        :type data: dict
+        :return: Tuple of http status and kraken response (None for an http error)
+        :rtype: tuple
+        """
+        with self._lock:
+            self._call_count += 1
+            latency = self._latency * self._random.uniform(0.5, 1.5)
+            draw = self._random.random()
+            injected_error = self._random.choice(INJECTED_ERRORS)
+            rate_limited = self._count_api_call(client)
+
+        time.sleep(latency)
+
+        if draw < self._http_error_rate:
+            return 502, None
+        if rate_limited:
+            return 200, {"error": ["EAPI:Rate limit exceeded"]}
+        if draw < self._http_error_rate + self._error_rate:
+            return 200, {"error": [injected_error]}
+
+        path_items = path.strip("/").split("/")
+
+        if len(path_items) != 3 or path_items[0] != "0" or path_items[1] not in ["public", "private"]:
+            return 404, None
+        if path_items[1] == "private":
+            return 200, {"error": ["EGeneral:Permission denied"]}
+
+        return 200, self._data_source.respond(path_items[2], data)
+
+    def _count_api_call(self, client):
+        """
+        Count an api call of a client like kraken does (the lock must be held)
+
+        :param client: Address of the client
+        :type client: str
+        :return: True if the call exceeds the rate limit, False otherwise
+        :rtype: bool
+        """
+        if self._max_api_call_counter is None:
+            return False
+
+        now = time.monotonic()
+        counter, last_update = self._api_call_counters.get(client, (0.0, now))
+        counter = max(0.0, counter - (now - last_update) / self._decrease_period)
+
+        if counter + 1 > self._max_api_call_counter:
+            self._rate_limited_call_count += 1
+            self._api_call_counters[client] = (counter, now)
+            return True
+
+        self._api_call_counters[client] = (counter + 1, now)
+        return False
+
+
+class _StandInRequestHandler(BaseHTTPRequestHandler):
+    """Http request handler of the kraken stand-in server"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive connections like kraken
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self._answer(url.path, dict(parse_qsl(url.query)))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        self._answer(urlparse(self.path).path, dict(parse_qsl(body)))
+
+    def _answer(self, path, data):
+        status, response = self.server.stand_in.handle_call(self.client_address[0], path, data)
+        content = json.dumps(response).encode() if response is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        logging.debug("KrakenStandInServer: " + format % args)
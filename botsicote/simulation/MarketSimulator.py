@@ -0,0 +1,259 @@
+import math
+import random
+import time
+
+from TradeAggregator import TradeAggregator
+
+MAX_OHLC_CANDLES = 720  # Number of candles returned by an OHLC api call
+MAX_TRADES = 1000  # Max number of trades returned by a Trades api call
+PRICE_SAMPLES_PER_CANDLE = 8  # Number of price path samples used to build the high and low of a candle
+
+
+class MarketSimulator(object):
+    """
+    Deterministic synthetic market.
+    Each pair follows a smooth price path computed from the time, the trades of each minute are drawn from a random
+    generator seeded with the pair and the minute: the same seed always gives the same market, whatever the order of
+    the requests. Responses have the kraken api format
+    """
+
+    def __init__(self, pairs, seed=0):
+        """
+        Market simulator constructor
+
+        :param pairs: Name of the key of the api results by pair name (XBTEUR: XXBTZEUR for instance)
+        :type pairs: dict[str, str]
+        :param seed: Seed of the market
+        :type seed: int
+        """
+        self._pairs = pairs
+        self._seed = seed
+        self._base_prices = {pair: 10 ** random.Random("%d:%s" % (seed, pair)).uniform(-1, 4) for pair in pairs}
+
+    def respond(self, method, data):
+        """
+        Build the kraken api response of a public api call
+
+        :param method: Kraken api method name (Time, OHLC, Trades, Ticker or Depth)
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :return: The kraken api response
+        :rtype: dict
+        """
+        now = time.time()
+
+        if method == "Time":
+            return {"error": [], "result": {"unixtime": int(now), "rfc1123": time.strftime(
+                "%a, %d %b %y %H:%M:%S +0000", time.gmtime(now))}}
+
+        if method not in ["OHLC", "Trades", "Ticker", "Depth"]:
+            return {"error": ["EGeneral:Unknown method"]}
+
+        if data is None or data.get("pair") not in self._pairs:
+            return {"error": ["EQuery:Unknown asset pair"]}
+
+        pair = data["pair"]
+
+        if method == "OHLC":
+            result = self._get_ohlc(pair, int(data.get("interval", 1)), int(data.get("since", 0)), now)
+        elif method == "Trades":
+            result = self._get_trades(pair, int(data.get("since", 0)), now)
+        elif method == "Ticker":
+            result = {self._pairs[pair]: self._get_ticker(pair, now)}
+        else:
+            result = {self._pairs[pair]: self._get_depth(pair, int(data.get("count", 100)), now)}
+
+        return {"error": [], "result": result}
+
+    def get_price(self, pair, at):
+        """
+        Return the price of the price path of a pair at a given time
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param at: The time
+        :type at: float
+        :return: The price
+        :rtype: float
+        """
+        return self._base_prices[pair] * (1 + 0.05 * math.sin(2 * math.pi * at / 86400)
+                                          + 0.01 * math.sin(2 * math.pi * at / 3600)
+                                          + 0.002 * math.sin(2 * math.pi * at / 300))
+
+    def get_minute_trades(self, pair, minute):
+        """
+        Return the trades of a pair during a minute
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param minute: The minute (time divided by 60)
+        :type minute: int
+        :return: Kraken trades sorted by time asc (<price>, <volume>, <time>, <buy/sell>, <market/limit>, <misc>,
+                 <trade id>)
+        :rtype: list
+        """
+        rnd = random.Random("%d:%s:%d" % (self._seed, pair, minute))
+        trades = []
+
+        for trade_time in sorted([minute * 60 + rnd.random() * 60 for _ in range(rnd.randint(0, 12))]):
+            price = self.get_price(pair, trade_time) * (1 + rnd.gauss(0, 0.0005))
+            trades.append(["%.5f" % price, "%.8f" % rnd.expovariate(2), round(trade_time, 4), rnd.choice("bs"),
+                           rnd.choice("ml"), "", minute * 100 + len(trades)])
+
+        return trades
+
+    def _get_ohlc(self, pair, interval, since, now):
+        """
+        Build the OHLC result of a pair: at most the last 720 candles, the last one being in progress
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param interval: The length of the time frame in minute
+        :type interval: int
+        :param since: Only the candles whose time is greater than or equal to since are returned
+        :type since: int
+        :param now: Current time
+        :type now: float
+        :return: The OHLC result
+        :rtype: dict
+        """
+        time_step = interval * 60
+        last_candle_time = int(now) // time_step * time_step
+        first_candle_time = max(last_candle_time - (MAX_OHLC_CANDLES - 1) * time_step,
+                                -(-since // time_step) * time_step)
+        candles = []
+
+        for candle_time in range(first_candle_time, last_candle_time + 1, time_step):
+            row = self.get_candle(pair, interval, candle_time, now)
+            if row is not None:
+                candles.append([row[0]] + ["%.5f" % value for value in row[1:6]] + ["%.8f" % row[6], row[7]])
+
+        return {self._pairs[pair]: candles, "last": last_candle_time - time_step}
+
+    def get_candle(self, pair, interval, candle_time, now):
+        """
+        Return a candle of a pair as known at a given time
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param interval: The length of the time frame in minute
+        :type interval: int
+        :param candle_time: Time of the candle
+        :type candle_time: int
+        :param now: Current time (the candle is in progress if it ends after it)
+        :type now: float
+        :return: The candle (<time>, <open>, <high>, <low>, <close>, <vwap>, <volume>, <count>), None if there's no
+                 trade in a minute candle
+        :rtype: list
+        """
+        if interval != 1:
+            return self._build_candle(pair, candle_time, min(candle_time + interval * 60, now))
+
+        # Minute candles are built from the trades so both api agree
+        aggregator = TradeAggregator(1)
+        aggregator.add_trades([trade for trade in self.get_minute_trades(pair, candle_time // 60) if trade[2] <= now])
+        candle = aggregator.get_in_progress_candle()
+
+        if candle is None:
+            return None
+
+        return [candle["time"], candle["open"], candle["high"], candle["low"], candle["close"], candle["vwap"],
+                candle["volume"], candle["count"]]
+
+    def _build_candle(self, pair, start, end):
+        """
+        Build a candle from the price path
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param start: Time of the candle
+        :type start: int
+        :param end: End of the candle (current time for the in progress candle)
+        :type end: float
+        :return: The candle (<time>, <open>, <high>, <low>, <close>, <vwap>, <volume>, <count>)
+        :rtype: list
+        """
+        rnd = random.Random("%d:%s:candle:%d:%d" % (self._seed, pair, start, int(end - start)))
+        prices = [self.get_price(pair, start + (end - start) * i / PRICE_SAMPLES_PER_CANDLE)
+                  for i in range(PRICE_SAMPLES_PER_CANDLE + 1)]
+        count = max(1, int((end - start) / 60 * 6))
+
+        return [start, prices[0], max(prices) * (1 + abs(rnd.gauss(0, 0.001))),
+                min(prices) * (1 - abs(rnd.gauss(0, 0.001))), prices[-1], sum(prices) / len(prices),
+                count * 0.5 * rnd.uniform(0.5, 1.5), count]
+
+    def _get_trades(self, pair, since, now):
+        """
+        Build the Trades result of a pair: at most 1000 trades following the since cursor
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param since: Nanosecond timestamp cursor, only the trades after it are returned
+        :type since: int
+        :param now: Current time
+        :type now: float
+        :return: The Trades result
+        :rtype: dict
+        """
+        since_time = since / 1000000000.0
+        minute = max(int(since_time) // 60, int(now) // 60 - 60 * 24)  # At most one day of history
+        trades = []
+
+        while minute <= int(now) // 60 and len(trades) < MAX_TRADES:
+            trades.extend([trade for trade in self.get_minute_trades(pair, minute) if since_time < trade[2] <= now])
+            minute += 1
+
+        trades = trades[:MAX_TRADES]
+        last = str(int(trades[-1][2] * 1000000000)) if len(trades) > 0 else str(since)
+
+        return {self._pairs[pair]: trades, "last": last}
+
+    def _get_ticker(self, pair, now):
+        """
+        Build the ticker of a pair
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param now: Current time
+        :type now: float
+        :return: The ticker
+        :rtype: dict
+        """
+        price = self.get_price(pair, now)
+        day_candle = self._build_candle(pair, int(now) - 86400, now)
+
+        return {
+            "a": ["%.5f" % (price * 1.0005), "1", "1.000"],
+            "b": ["%.5f" % (price * 0.9995), "1", "1.000"],
+            "c": ["%.5f" % price, "0.10000000"],
+            "v": ["%.8f" % day_candle[6], "%.8f" % day_candle[6]],
+            "p": ["%.5f" % day_candle[5], "%.5f" % day_candle[5]],
+            "t": [day_candle[7], day_candle[7]],
+            "l": ["%.5f" % day_candle[3], "%.5f" % day_candle[3]],
+            "h": ["%.5f" % day_candle[2], "%.5f" % day_candle[2]],
+            "o": "%.5f" % day_candle[1]
+        }
+
+    def _get_depth(self, pair, count, now):
+        """
+        Build the order book of a pair
+
+        :param pair: Name of the pair
+        :type pair: str
+        :param count: Number of asks and bids
+        :type count: int
+        :param now: Current time
+        :type now: float
+        :return: The order book
+        :rtype: dict
+        """
+        rnd = random.Random("%d:%s:depth:%d" % (self._seed, pair, int(now)))
+        price = self.get_price(pair, now)
+
+        return {
+            "asks": [["%.5f" % (price * (1.0005 + 0.0002 * i)), "%.3f" % rnd.uniform(0.01, 5), int(now)]
+                     for i in range(count)],
+            "bids": [["%.5f" % (price * (0.9995 - 0.0002 * i)), "%.3f" % rnd.uniform(0.01, 5), int(now)]
+                     for i in range(count)]
+        }
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+
+class RecordingTransport(object):
+    """
+    Krakenex wrapper recording every kraken api response into a file (one json document per line) so the run can be
+    replayed later by the replay transport
+    """
+
+    def __init__(self, krakenex_instance, path):
+        """
+        Recording transport constructor
+
+        :param krakenex_instance: Instance of krakenex performing the api calls
+        :type krakenex_instance: Krakenex
+        :param path: Path of the recording file (the records are appended)
+        :type path: str
+        """
+        self._k = krakenex_instance
+        self._path = path
+        self._lock = threading.Lock()  # Guards the recording file
+        self.session = getattr(krakenex_instance, "session", None)
+
+    def query_public(self, method, data=None, timeout=None):
+        """
+        Perform and record a public kraken api call
+
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param timeout: Number of seconds to wait for the response
+        :type timeout: float
+        :return: The kraken api response
+        :rtype: dict
+        """
+        return self._record(self._k.query_public, False, method, data, timeout)
+
+    def query_private(self, method, data=None, timeout=None):
+        """
+        Perform and record a private kraken api call
+
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param timeout: Number of seconds to wait for the response
+        :type timeout: float
+        :return: The kraken api response
+        :rtype: dict
+        """
+        return self._record(self._k.query_private, True, method, data, timeout)
+
+    def _record(self, query_function, private, method, data, timeout):
+        """
+        Perform and record a kraken api call (failed http requests are not recorded)
+
+        :param query_function: Krakenex query function
+        :type query_function: function
+        :param private: Whether the call is private
+        :type private: bool
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param timeout: Number of seconds to wait for the response
+        :type timeout: float
+        :return: The kraken api response
+        :rtype: dict
+        """
+        start = time.monotonic()
+        response = query_function(method, data=data, timeout=timeout)
+        record = json.dumps({"method": method, "private": private, "data": data, "response": response,
+                             "duration": time.monotonic() - start})
+
+        with self._lock, open(self._path, "a") as f:
+            f.write(record + "\n")
+
+        return response
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+
+
+class ReplayTransport(object):
+    """
+    Krakenex stand-in replaying in process the kraken api responses recorded by the recording transport.
+    The responses of each method, pair and interval are replayed in their recording order, the last one is repeated
+    once they are all replayed. It can also be the data source of the kraken stand-in server
+    """
+
+    def __init__(self, path, replay_latency=False):
+        """
+        Replay transport constructor
+
+        :param path: Path of the recording file
+        :type path: str
+        :param replay_latency: Wait the recorded duration of the calls before answering
+        :type replay_latency: bool
+        """
+        self._replay_latency = replay_latency
+        self._records = {}  # Recorded responses (json) and durations by call key
+        self._cursors = {}  # Index of the next response to replay by call key
+        self._lock = threading.Lock()  # Guards the cursors
+
+        with open(path) as f:
+            for line in f:
+                if line.strip() == "":
+                    continue
+                record = json.loads(line)
+                key = self._get_key(record["private"], record["method"], record["data"])
+                self._records.setdefault(key, []).append((json.dumps(record["response"]), record["duration"]))
+
+    def query_public(self, method, data=None, timeout=None):
+        """
+        Replay a public kraken api call
+
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param timeout: Ignored, kept for krakenex compatibility
+        :type timeout: float
+        :return: The recorded kraken api response
+        :rtype: dict
+        """
+        return self._replay(False, method, data)
+
+    def query_private(self, method, data=None, timeout=None):
+        """
+        Replay a private kraken api call
+
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param timeout: Ignored, kept for krakenex compatibility
+        :type timeout: float
+        :return: The recorded kraken api response
+        :rtype: dict
+        """
+        return self._replay(True, method, data)
+
+    def respond(self, method, data):
+        """
+        Build the kraken api response of a public api call (kraken stand-in server data source)
+
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :return: The recorded kraken api response
+        :rtype: dict
+        """
+        return self._replay(False, method, data, False)
+
+    def _replay(self, private, method, data, replay_latency=None):
+        """
+        Replay a kraken api call
+
+        :param private: Whether the call is private
+        :type private: bool
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :param replay_latency: Wait the recorded duration of the call (the constructor setting is used if None)
+        :type replay_latency: bool
+        :return: The recorded kraken api response
+        :rtype: dict
+        """
+        key = self._get_key(private, method, data)
+
+        if key not in self._records:
+            return {"error": ["EGeneral:Invalid arguments:No recorded response"]}
+
+        with self._lock:
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = min(index + 1, len(self._records[key]) - 1)
+
+        response, duration = self._records[key][index]
+
+        if self._replay_latency if replay_latency is None else replay_latency:
+            time.sleep(duration)
+
+        return json.loads(response)
+
+    @staticmethod
+    def _get_key(private, method, data):
+        """
+        Return the key of the recorded responses of a call
+
+        :param private: Whether the call is private
+        :type private: bool
+        :param method: Kraken api method name
+        :type method: str
+        :param data: Kraken api method parameters
+        :type data: dict
+        :return: The key (private flag, method, pair and interval)
+        :rtype: tuple
+        """
+        if data is None:
+            return private, method, None, None
+        # Parameters received by the stand-in server are strings
+        return private, method, data.get("pair"), None if data.get("interval") is None else str(data.get("interval"))
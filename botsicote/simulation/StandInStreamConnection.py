@@ -0,0 +1,115 @@
+import json
+import time
+
+TICK_PERIOD = 0.5  # Number of seconds between two updates of the subscribed candles
+HEARTBEAT_PERIOD = 1  # Number of seconds without update before a heartbeat is sent, like kraken
+
+
+class StandInStreamConnection(object):
+    """
+    Local stand-in of a kraken stream connection.
+    It answers the OHLC subscriptions with the kraken stream message format, the updates come from a market simulator.
+    It has the methods of a websocket-client connection used by the OHLC stream
+    """
+
+    def __init__(self, market_simulator, disconnect_after=None):
+        """
+        Stand-in stream connection constructor
+
+        :param market_simulator: The market simulator
+        :type market_simulator: MarketSimulator
+        :param disconnect_after: Number of seconds after which the connection is lost (never if None)
+        :type disconnect_after: float
+        """
+        self._market_simulator = market_simulator
+        self._disconnect_time = None if disconnect_after is None else time.time() + disconnect_after
+        self._timeout = None
+        self._messages = []  # Messages waiting to be received
+        self._subscriptions = {}  # Last sent candle by stream pair and time frame length
+        self._channel_ids = {}  # Channel id by stream pair and time frame length
+        self._next_tick_time = time.time()
+        self._last_message_time = time.time()
+
+    def settimeout(self, timeout):
+        """
+        Set the number of seconds recv waits for a message
+
+        :param timeout: The timeout (wait forever if None)
+        :type timeout: float
+        """
+        self._timeout = timeout
+
+    def send(self, message):
+        """
+        Send a message (subscription) to the stream
+
+        :param message: The message
+        :type message: str
+        """
+        message = json.loads(message)
+
+        if message.get("event") != "subscribe" or message.get("subscription", {}).get("name") != "ohlc":
+            self._messages.append(json.dumps({"event": "error", "errorMessage": "Unsupported event"}))
+            return
+
+        time_frame_length = message["subscription"].get("interval", 1)
+        for stream_pair in message["pair"]:
+            key = (stream_pair, time_frame_length)
+            self._channel_ids.setdefault(key, len(self._channel_ids) + 1)
+            self._subscriptions[key] = None
+            self._messages.append(json.dumps({
+                "channelID": self._channel_ids[key], "channelName": "ohlc-%d" % time_frame_length,
+                "event": "subscriptionStatus", "pair": stream_pair, "status": "subscribed",
+                "subscription": {"interval": time_frame_length, "name": "ohlc"}
+            }))
+
+    def recv(self):
+        """
+        Receive the next stream message
+
+        :return: The message
+        :rtype: str
+        """
+        deadline = None if self._timeout is None else time.time() + self._timeout
+
+        while len(self._messages) == 0:
+            if self._disconnect_time is not None and time.time() >= self._disconnect_time:
+                raise ConnectionError("Stand-in stream connection lost")
+            if deadline is not None and time.time() >= deadline:
+                raise TimeoutError("No stand-in stream message")
+
+            time.sleep(max(0.0, min(self._next_tick_time, deadline or self._next_tick_time) - time.time()))
+            if time.time() >= self._next_tick_time:
+                self._tick()
+
+        self._last_message_time = time.time()
+        return self._messages.pop(0)
+
+    def close(self):
+        """Close the connection"""
+        self._subscriptions = {}
+        self._messages = []
+
+    def _tick(self):
+        """Queue the updates of the subscribed candles that changed since the last tick"""
+        now = time.time()
+        self._next_tick_time = now + TICK_PERIOD
+
+        for (stream_pair, time_frame_length), last_candle in list(self._subscriptions.items()):
+            time_step = time_frame_length * 60
+            candle = self._market_simulator.get_candle(stream_pair.replace("/", ""), time_frame_length,
+                                                       int(now) // time_step * time_step, now)
+            if candle is None or candle == last_candle:
+                continue
+
+            self._subscriptions[(stream_pair, time_frame_length)] = candle
+            self._messages.append(json.dumps([
+                self._channel_ids[(stream_pair, time_frame_length)],
+                ["%.6f" % now, "%.6f" % (candle[0] + time_step)] + ["%.5f" % value for value in candle[1:6]]
+                + ["%.8f" % candle[6], candle[7]],
+                "ohlc-%d" % time_frame_length,
+                stream_pair
+            ]))
+
+        if len(self._messages) == 0 and now - self._last_message_time >= HEARTBEAT_PERIOD:
+            self._messages.append(json.dumps({"event": "heartbeat"}))
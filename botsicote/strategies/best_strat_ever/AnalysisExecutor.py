@@ -0,0 +1,170 @@
+import concurrent.futures
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from StockDataSnapshot import StockDataSnapshot
+from exceptions.BotsicoteException import BotsicoteException
+from indicators.BatchIndicatorComputer import BatchIndicatorComputer
+from strategies.best_strat_ever.TechnicalAnalysis import ANALYSIS_WINDOW, INDICATOR_NAMES, TechnicalAnalysis
+
+"""Executor modes: in the calling thread, in a thread pool or in a process pool"""
+MODES = ["serial", "thread", "process"]
+
+"""Candle columns given to the analysis worker processes"""
+SHARED_COLUMNS = ["id", "time", "open", "high", "low", "close"]
+
+
+class AnalysisExecutor(object):
+    """
+    Analysis executor.
+    The technical analyses of a strategy iteration are split in as many contiguous chunks as there are workers and each
+    chunk is analysed in one batch. In process mode, the candles of the data lines are written in a shared memory block
+    read by the worker processes (nothing but the block layout is pickled) and their indicators are computed there in
+    batch, from the candles of the data lines (like BatchIndicatorComputer). The results are gathered in the order of
+    the analyses whatever the mode
+    """
+
+    def __init__(self, mode="serial", max_workers=None):
+        """
+        Analysis executor constructor
+
+        :param mode: Executor mode (serial, thread or process)
+        :type mode: str
+        :param max_workers: Max number of workers (the number of cpu if None), unused in serial mode
+        :type max_workers: int
+        """
+        if mode not in MODES:
+            raise BotsicoteException("Unknown analysis executor mode %s, expected one of: %s"
+                                     % (mode, ", ".join(MODES)))
+
+        self._mode = mode
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+
+        if mode == "thread":
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=self._max_workers)
+        elif mode == "process":
+            # The worker processes are spawned and not forked: the acquisition threads are running
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self._max_workers,
+                                                                mp_context=multiprocessing.get_context("spawn"))
+
+    def run(self, technical_analyses, snapshots):
+        """
+        Run technical analyses. The data lines with less than ANALYSIS_WINDOW candles are not analysed, their result
+        is left unchanged
+
+        :param technical_analyses: The technical analyses to run
+        :type technical_analyses: list[TechnicalAnalysis]
+        :param snapshots: Snapshot of the data line to analyse for each technical analysis
+        :type snapshots: list[StockDataSnapshot]
+        """
+        analysed = [(technical_analysis, snapshot)
+                    for technical_analysis, snapshot in zip(technical_analyses, snapshots)
+                    if len(snapshot) >= ANALYSIS_WINDOW]
+        if len(analysed) == 0:
+            return
+
+        if self._mode == "serial" or len(analysed) == 1:
+            AnalysisExecutor._run_chunk(analysed)
+            return
+
+        chunks = [analysed[indexes[0]:indexes[-1] + 1]
+                  for indexes in np.array_split(np.arange(len(analysed)), min(self._max_workers, len(analysed)))]
+
+        if self._mode == "thread":
+            futures = [self._pool.submit(AnalysisExecutor._run_chunk, chunk) for chunk in chunks]
+            for future in futures:
+                future.result()
+            return
+
+        self._run_in_processes(chunks)
+
+    def shutdown(self):
+        """Stop the workers"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @staticmethod
+    def _run_chunk(chunk):
+        """
+        Run a chunk of technical analyses in one batch
+
+        :param chunk: Tuples of technical analysis and snapshot
+        :type chunk: list[tuple]
+        """
+        TechnicalAnalysis.run_batch_analysis([technical_analysis for technical_analysis, _ in chunk],
+                                             [snapshot for _, snapshot in chunk])
+
+    def _run_in_processes(self, chunks):
+        """
+        Run chunks of technical analyses in the worker processes
+
+        :param chunks: Lists of technical analysis and snapshot tuples
+        :type chunks: list[list[tuple]]
+        """
+        lengths = [len(snapshot) for chunk in chunks for _, snapshot in chunk]
+        ends = np.cumsum(lengths).tolist()
+        layout = list(zip([0] + ends[:-1], ends))  # Columns of each data line in the shared block
+
+        block = shared_memory.SharedMemory(create=True, size=len(SHARED_COLUMNS) * ends[-1] * 8)
+        try:
+            table = np.ndarray((len(SHARED_COLUMNS), ends[-1]), dtype=np.float64, buffer=block.buf)
+            snapshots = [snapshot for chunk in chunks for _, snapshot in chunk]
+            for (start, end), snapshot in zip(layout, snapshots):
+                for row, name in enumerate(SHARED_COLUMNS):
+                    table[row, start:end] = snapshot.get_column(name)
+            del table
+
+            futures = []
+            first_data_line = 0
+            for chunk in chunks:
+                futures.append(self._pool.submit(_analyse_shared_data_lines, block.name, ends[-1],
+                                                 layout[first_data_line:first_data_line + len(chunk)]))
+                first_data_line += len(chunk)
+
+            for chunk, future in zip(chunks, futures):
+                for (technical_analysis, _), result in zip(chunk, future.result()):
+                    technical_analysis.result = result
+        finally:
+            block.close()
+            block.unlink()
+
+
+def _analyse_shared_data_lines(shared_memory_name, total_length, layout):
+    """
+    Analyse data lines from the shared memory block (worker process function)
+
+    :param shared_memory_name: Name of the shared memory block
+    :type shared_memory_name: str
+    :param total_length: Total number of candles in the block
+    :type total_length: int
+    :param layout: Start and end of the columns of each data line to analyse in the block
+    :type layout: list[tuple]
+    :return: The technical analysis result of each data line
+    :rtype: list[TechnicalAnalysisResult]
+    """
+    block = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        # Only the candles of the analysed data lines are copied, the block is released right away
+        table = np.ndarray((len(SHARED_COLUMNS), total_length), dtype=np.float64, buffer=block.buf)
+        columns_list = [{name: table[row, start:end].copy() for row, name in enumerate(SHARED_COLUMNS)}
+                        for start, end in layout]
+        del table
+    finally:
+        block.close()
+
+    snapshots = []
+    for columns in columns_list:
+        columns["id"] = columns["id"].astype(np.int64)
+        columns["time"] = columns["time"].astype(np.int64)
+        snapshots.append(StockDataSnapshot(0, columns, (), [], [], None))
+
+    BatchIndicatorComputer.fill(snapshots, INDICATOR_NAMES)
+    technical_analyses = [TechnicalAnalysis(None) for _ in snapshots]
+    TechnicalAnalysis.run_batch_analysis(technical_analyses, snapshots)
+
+    return [technical_analysis.result for technical_analysis in technical_analyses]
@@ -1,11 +1,12 @@
-import copy
 import logging
-import time
+import queue
 
 from Strategy import Strategy
+from indicators.BatchIndicatorComputer import BatchIndicatorComputer
+from strategies.best_strat_ever.AnalysisExecutor import AnalysisExecutor
 from strategies.best_strat_ever.Signal import Signal
-from strategies.best_strat_ever.TechnicalAnalysis import TechnicalAnalysis
-from strategies.best_strat_ever.TechnicalAnalysisResult import TechnicalAnalysisResult
+from strategies.best_strat_ever.TechnicalAnalysis import INDICATOR_NAMES, TechnicalAnalysis
+from strategies.best_strat_ever.TechnicalAnalysisHistory import TechnicalAnalysisHistory
 
 MAX_TA_TO_STORE = 5
 
@@ -17,6 +18,20 @@ and to add accuracy in the choice of following or not a given signal.
 """
 TIME_FRAME_LIST = [15, 5, 1]
 
+"""
+Batch mode: the indicators of the pairs updated together for a time frame are computed in one vectorized pass instead
+of being streamed one pair at a time. It's worth it when many pairs are tracked and updated at once
+"""
+BATCH_INDICATORS = False
+
+"""
+Analysis executor mode: serial (strategy thread), thread (thread pool) or process (process pool, the candles are given
+to the worker processes through shared memory and their indicators are computed there in batch, so BATCH_INDICATORS is
+useless). The analyses of an iteration are spread over the workers, which pays off with many pairs on many cores
+"""
+ANALYSIS_EXECUTOR_MODE = "serial"
+ANALYSIS_WORKERS = None  # Number of analysis workers (the number of cpu if None)
+
 
 class BestStratEver(Strategy):
     """The best strategy ever"""
@@ -47,7 +62,7 @@ class BestStratEver(Strategy):
         """
         Will store the last (MAX_TA_TO_STORE) technical analysis computed for each crypto pair. 
         Each dict entry contains a dict of tracked time frames.
-        Each tracked time frames contains an array of last technical analysis result
+        Each tracked time frames contains the history of its last technical analysis results
         """
         self.last_technical_analysis_result = {}
 
@@ -63,6 +78,18 @@ class BestStratEver(Strategy):
         """Kraken API call rate manager"""
         self.call_rate_manager = None
 
+        """Kraken API client (rate limited and retrying api calls)"""
+        self.kraken_api_client = None
+
+        """
+        Candle events published by the tracked time frames.
+        The strategy waits for them instead of polling the time frames
+        """
+        self._candle_event_queue = queue.Queue()
+
+        """Executor running the technical analyses"""
+        self._analysis_executor = None
+
     def startup(self):
         """Strategy initialisation"""
 
@@ -71,6 +98,7 @@ class BestStratEver(Strategy):
         self.crypto_pair_manager_list = self.get_crypto_pair_manager_list()
         self.k = self.get_kraken_api_instance()
         self.call_rate_manager = self.get_call_rate_manager()
+        self.kraken_api_client = self.get_kraken_api_client()
 
         for cpm in self.crypto_pair_manager_list:
             self.last_processed_update_dt_dict[cpm.pair] = {}
@@ -80,12 +108,17 @@ class BestStratEver(Strategy):
             for tf in TIME_FRAME_LIST:
                 self.last_processed_update_dt_dict[cpm.pair][tf] = None
                 self.technical_analysis_dict[cpm.pair][tf] = None
-                self.last_technical_analysis_result[cpm.pair][tf] = []
+                self.last_technical_analysis_result[cpm.pair][tf] = TechnicalAnalysisHistory(MAX_TA_TO_STORE)
                 cpm.add_time_frame(tf)
+                cpm.get_time_frame(tf).subscribe(self._candle_event_queue.put)
+                # Only the indicators read by the technical analysis are computed
+                cpm.get_time_frame(tf).stock_data_manager.require_indicators(INDICATOR_NAMES)
 
             self.signal_dict[cpm.pair] = Signal()
             cpm.start_all_time_frame_acq()
 
+        self._analysis_executor = AnalysisExecutor(ANALYSIS_EXECUTOR_MODE, ANALYSIS_WORKERS)
+
     def run_strategy(self):
         """The strategy core"""
 
@@ -97,30 +130,61 @@ class BestStratEver(Strategy):
                 self.technical_analysis_dict[cpm.pair][tf] = \
                     TechnicalAnalysis(cpm.get_time_frame(tf).stock_data_manager)
 
-        while True:
-            with self.get_lock():
-                for cpm in self.crypto_pair_manager_list:
-                    for tf in TIME_FRAME_LIST:
-                        self._update_technical_analysis(cpm.pair, tf, cpm.get_time_frame(tf).last_update_datetime)
+        crypto_pair_manager_dict = {cpm.pair: cpm for cpm in self.crypto_pair_manager_list}
 
-            # compare crypto technical analysis
-            for cpm in self.crypto_pair_manager_list:
-                self._update_signal_dict(cpm.pair)
+        while True:
+            # Wait for a time frame to be updated
+            candle_events = [self._candle_event_queue.get()]
+
+            # Streamed updates can come faster than they are analysed: each updated time frame is analysed once
+            while not self._candle_event_queue.empty():
+                candle_events.append(self._candle_event_queue.get_nowait())
+
+            updated_time_frames = []
+            for candle_event in candle_events:
+                if (candle_event.pair, candle_event.time_frame_length) not in updated_time_frames:
+                    updated_time_frames.append((candle_event.pair, candle_event.time_frame_length))
+
+            # The analysis reads a snapshot of the time frame data: no lock, the time frame can be fed meanwhile. The
+            # update datetime is read first so the snapshot is at least as recent
+            update_datetimes = {}
+            snapshots = {}
+            for pair, time_frame_length in updated_time_frames:
+                time_frame = crypto_pair_manager_dict[pair].get_time_frame(time_frame_length)
+                update_datetimes[(pair, time_frame_length)] = time_frame.last_update_datetime
+                snapshots[(pair, time_frame_length)] = time_frame.stock_data_manager.get_snapshot()
+
+            if BATCH_INDICATORS and ANALYSIS_EXECUTOR_MODE != "process":
+                for tf in TIME_FRAME_LIST:
+                    BatchIndicatorComputer.fill([snapshots[key] for key in updated_time_frames if key[1] == tf],
+                                                INDICATOR_NAMES)
+
+            # The time frames updated since their last analysis are analysed together
+            analysed_time_frames = [(pair, time_frame_length) for pair, time_frame_length in updated_time_frames
+                                    if self.last_processed_update_dt_dict[pair][time_frame_length]
+                                    != update_datetimes[(pair, time_frame_length)]]
+            self._analysis_executor.run([self.technical_analysis_dict[pair][time_frame_length]
+                                         for pair, time_frame_length in analysed_time_frames],
+                                        [snapshots[key] for key in analysed_time_frames])
+
+            for pair, time_frame_length in updated_time_frames:
+                if (pair, time_frame_length) in analysed_time_frames:
+                    self._store_technical_analysis_result(pair, time_frame_length,
+                                                          update_datetimes[(pair, time_frame_length)])
+
+                # compare crypto technical analysis
+                self._update_signal_dict(pair)
 
             with self.get_lock():
-                # self.call_rate_manager.increase_api_call_rate(1)
-
                 # pairs = ",".join([cpm.pair for cpm in self.crypto_pair_manager_list])
-                # response = self.k.query_private("Ticker", data={"pair": pairs})
-                # response = self.k.query_private("TradesHistory")
-                # response = self.k.query_private("Balance")
-                # response = self.k.query_private("OpenOrders")
-                # response = self.k.query_private("ClosedOrders")
+                # response = self.kraken_api_client.query_private("Ticker", data={"pair": pairs})
+                # response = self.kraken_api_client.query_private("TradesHistory", cost=2)
+                # response = self.kraken_api_client.query_private("Balance")
+                # response = self.kraken_api_client.query_private("OpenOrders")
+                # response = self.kraken_api_client.query_private("ClosedOrders")
 
                 pass
 
-            time.sleep(10)
-
     def cleanup(self):
         """Clean strategy execution"""
 
@@ -128,31 +192,27 @@ class BestStratEver(Strategy):
         for cpm in self.get_crypto_pair_manager_list():
             cpm.stop_all_time_frame_acq()
 
-    def _update_technical_analysis(self, pair, time_frame, last_update_datetime):
+        if self._analysis_executor is not None:
+            self._analysis_executor.shutdown()
+
+    def _store_technical_analysis_result(self, pair, time_frame, last_update_datetime):
         """
-        Update technical analysis if needed
+        Store the result of the technical analysis that was just run
 
-        :param pair: Pair to update the technical analysis
+        :param pair: Pair of the technical analysis
         :type pair: str
-        :param time_frame: Time frame to update the technical analysis
+        :param time_frame: Time frame of the technical analysis
         :type time_frame: int
-        :param last_update_datetime: Last update datetime of the technical analysis for pair and time frame
+        :param last_update_datetime: Update datetime of the analysed data for pair and time frame
         :type last_update_datetime: datetime
         """
-        if self.last_processed_update_dt_dict[pair][time_frame] != last_update_datetime:
-            # Run the analysis
-            self.technical_analysis_dict[pair][time_frame].run_analysis()
-
-            # Update the last update datetime for the given pair / time frame
-            self.last_processed_update_dt_dict[pair][time_frame] = copy.deepcopy(last_update_datetime)
-
-            # Store the technical analysis result in the last_technical_analysis_result for the given pair / time frame
-            technical_analysis_result = copy.deepcopy(self.technical_analysis_dict[pair][time_frame].result)
-            self.last_technical_analysis_result[pair][time_frame].append(technical_analysis_result)
+        # Update the last update datetime for the given pair / time frame (datetimes are immutable)
+        self.last_processed_update_dt_dict[pair][time_frame] = last_update_datetime
 
-            # Keep only the last MAX_TA_TO_STORE technical analysis for the given pair / time frame
-            self.last_technical_analysis_result[pair][time_frame] = \
-                self.last_technical_analysis_result[pair][time_frame][-MAX_TA_TO_STORE:]
+        # Store the technical analysis result in the last_technical_analysis_result for the given pair / time frame,
+        # the history only keeps the last MAX_TA_TO_STORE ones
+        self.last_technical_analysis_result[pair][time_frame].append(
+            self.technical_analysis_dict[pair][time_frame].result)
 
     def _update_signal_dict(self, pair):
         """
@@ -164,9 +224,8 @@ class BestStratEver(Strategy):
         first_tf = True
 
         for tf in TIME_FRAME_LIST:
-            for tar in self.last_technical_analysis_result[pair][tf]:
-                if isinstance(tar, TechnicalAnalysisResult):  # Only for auto completion
-                    continue
-                    # TODO determine signal
+            # Records of the last results (RECORD_FIELDS of TechnicalAnalysisHistory), from the oldest to the latest
+            technical_analysis_records = self.last_technical_analysis_result[pair][tf].get_records()
+            # TODO determine signal
 
             first_tf = False
@@ -1,13 +1,28 @@
-import pandas as pd
+import numpy as np
+
 from StockDataManager import StockDataManager
-from entities.Color import Color
 from entities.Trend import Trend
 from entities.CandlestickFigure import CandlestickShapeEnum
+from indicators.CandlestickPatternScanner import CandlestickPatternScanner
 from strategies.best_strat_ever.TechnicalAnalysisResult import TechnicalAnalysisResult
 
+"""Candlestick figures of the last candle, by priority"""
+CANDLESTICK_FIGURES = [CandlestickShapeEnum.HAMMER_OR_HANGING_MAN, CandlestickShapeEnum.REVERSED_HAMMER_OR_FALLING_STAR,
+                       CandlestickShapeEnum.SWALLOWING, CandlestickShapeEnum.HARAMI]
+
+"""Indicators read by the analysis"""
+INDICATOR_NAMES = ["close_10_sma", "close_21_sma", "close_10_ema", "close_21_ema", "close_2_sma", "macdh", "rsi_14"]
+
+ANALYSIS_WINDOW = 10  # Number of last values of each series scored by the analysis
+
 
 class TechnicalAnalysis(object):
-    """Technical analysis"""
+    """
+    Technical analysis.
+    The signals are scored from the last values of the indicator series. The analyses of many data lines are run
+    together by run_batch_analysis: their last values are stacked in matrices, one row per data line, and each score
+    is computed for all of them with array operations
+    """
 
     def __init__(self, stock_data_manager):
         """
@@ -19,200 +34,211 @@ class TechnicalAnalysis(object):
         self._s_d_m = stock_data_manager
         self.result = TechnicalAnalysisResult()
 
-    def run_analysis(self):
-        """Run the analysis"""
-
-        sma_10_series = self._s_d_m.stock_indicators["close_10_sma"]
-        sma_21_series = self._s_d_m.stock_indicators["close_21_sma"]
-        ema_10_series = self._s_d_m.stock_indicators["close_10_ema"]
-        ema_21_series = self._s_d_m.stock_indicators["close_21_ema"]
-        average_reference_series = self._s_d_m.stock_indicators["close_2_sma"]
-        macdh_series = self._s_d_m.stock_indicators["macdh"]
-        rsi_series = self._s_d_m.stock_indicators["rsi_14"]
-        stock_data = self._s_d_m.stock_data_list
-
-        self.result.sma_10_signal, self.result.sma_10_signal_power = \
-            TechnicalAnalysis._analyse_average(sma_10_series, average_reference_series)
-        self.result.sma_21_signal, self.result.sma_21_signal_power = \
-            TechnicalAnalysis._analyse_average(sma_21_series, average_reference_series)
-        self.result.ema_10_signal, self.result.ema_10_signal_power = \
-            TechnicalAnalysis._analyse_average(ema_10_series, average_reference_series)
-        self.result.ema_21_signal, self.result.ema_21_signal_power = \
-            TechnicalAnalysis._analyse_average(ema_21_series, average_reference_series)
-        self.result.macd_signal, self.result.macd_signal_power = \
-            TechnicalAnalysis._analyse_macd(macdh_series, average_reference_series)
-        self.result.rsi_signal, self.result.rsi_signal_power = TechnicalAnalysis._analyse_rsi(rsi_series, 35, 65)
-        self.result.last_candlestick_figure = TechnicalAnalysis._determinate_candlestick_figure(stock_data)
-        self.result.trend = TechnicalAnalysis._determinate_trend(stock_data)
-        self.result.stock_price = stock_data[-1].close_price
+    def run_analysis(self, snapshot=None):
+        """
+        Run the analysis
+
+        :param snapshot: Snapshot of the data line to analyse (the last one of the stock data manager if None)
+        :type snapshot: StockDataSnapshot
+        """
+        TechnicalAnalysis.run_batch_analysis([self], None if snapshot is None else [snapshot])
+
+    @staticmethod
+    def run_batch_analysis(technical_analyses, snapshots=None):
+        """
+        Run the analysis of many data lines at once. The data lines with less than ANALYSIS_WINDOW candles are not
+        analysed, their result is left unchanged
+
+        :param technical_analyses: The technical analyses to run
+        :type technical_analyses: list[TechnicalAnalysis]
+        :param snapshots: Snapshot of the data line to analyse for each technical analysis (the last one of their stock
+                          data manager if None)
+        :type snapshots: list[StockDataSnapshot]
+        """
+        # The snapshots are immutable: the data lines can be updated during the analysis
+        if snapshots is None:
+            snapshots = [technical_analysis._s_d_m.get_snapshot() for technical_analysis in technical_analyses]
+
+        analysed = [(technical_analysis, snapshot)
+                    for technical_analysis, snapshot in zip(technical_analyses, snapshots)
+                    if len(snapshot) >= ANALYSIS_WINDOW]
+        if len(analysed) == 0:
+            return
+
+        snapshots = [snapshot for _, snapshot in analysed]
+        windows = {indicator_name: np.array([snapshot.stock_indicators[indicator_name].to_numpy()[-ANALYSIS_WINDOW:]
+                                             for snapshot in snapshots])
+                   for indicator_name in INDICATOR_NAMES}
+        open_prices = np.array([snapshot.get_column("open", ANALYSIS_WINDOW) for snapshot in snapshots])
+        close_prices = np.array([snapshot.get_column("close", ANALYSIS_WINDOW) for snapshot in snapshots])
+        reference_window = windows["close_2_sma"]
+
+        sma_10_signals = TechnicalAnalysis._analyse_average(windows["close_10_sma"], reference_window)
+        sma_21_signals = TechnicalAnalysis._analyse_average(windows["close_21_sma"], reference_window)
+        ema_10_signals = TechnicalAnalysis._analyse_average(windows["close_10_ema"], reference_window)
+        ema_21_signals = TechnicalAnalysis._analyse_average(windows["close_21_ema"], reference_window)
+        macd_signals = TechnicalAnalysis._analyse_macd(windows["macdh"], reference_window)
+        rsi_signals = TechnicalAnalysis._analyse_rsi(windows["rsi_14"], 35, 65)
+        candlestick_figures = TechnicalAnalysis._determinate_candlestick_figure(
+            np.array([snapshot.get_candlestick_masks()[-1] for snapshot in snapshots]))
+        trends = TechnicalAnalysis._determinate_trend(open_prices, close_prices)
+
+        for row, (technical_analysis, _) in enumerate(analysed):
+            result = technical_analysis.result
+            result.sma_10_signal, result.sma_10_signal_power = sma_10_signals[0][row], sma_10_signals[1][row]
+            result.sma_21_signal, result.sma_21_signal_power = sma_21_signals[0][row], sma_21_signals[1][row]
+            result.ema_10_signal, result.ema_10_signal_power = ema_10_signals[0][row], ema_10_signals[1][row]
+            result.ema_21_signal, result.ema_21_signal_power = ema_21_signals[0][row], ema_21_signals[1][row]
+            result.macd_signal, result.macd_signal_power = macd_signals[0][row], macd_signals[1][row]
+            result.rsi_signal, result.rsi_signal_power = rsi_signals[0][row], rsi_signals[1][row]
+            result.last_candlestick_figure = candlestick_figures[row]
+            result.trend = trends[row]
+            result.stock_price = close_prices[row, -1].item()
 
         # TODO bollinger bands and ichimoku
         pass
 
     @staticmethod
-    def _analyse_average(average_series, reference_series):
+    def _analyse_average(average_window, reference_window):
         """
-        Compare and analyse an average series with a reference series
+        Compare and analyse the last values of average series with the ones of reference series
 
-        :param average_series: Series to compare
-        :type average_series: pd.Series
-        :param reference_series: Reference series to be compared with
-        :type reference_series: pd.Series
-        :return: A tuple containing the signal and the signal power
+        :param average_window: Last values of the series to compare, one row per data line
+        :type average_window: numpy.ndarray
+        :param reference_window: Last values of the reference series to be compared with, one row per data line
+        :type reference_window: numpy.ndarray
+        :return: A tuple containing the signals and the signal powers, one per data line
         :rtype: tuple
         """
         # Positive equals buy signal, negative equals sell signal
         # The higher the percentage is, the more powerful the signal is
-        difference_series = ((reference_series - average_series) / reference_series) * 100
-        last_difference_list = difference_series.tolist()[-10:]
-
-        result = 0
-        for i in range(1, 10):
-            if last_difference_list[i-1] < 0 < last_difference_list[i]:  # Buy signal
-                result += (i + 1) ** 2
-            elif last_difference_list[i] < 0 < last_difference_list[i-1]:  # Sell signal
-                result -= (i + 1) ** 2
-            else:  # No change of signal type
-                if abs(last_difference_list[i]) < 0.2:  # If we are close enought from a potential signal change
-                    if abs(last_difference_list[i-1]) - abs(last_difference_list[i]) > 0:
-                        result += ((i + 1) ** 2) / 3 * (-1) if last_difference_list[i] > 0 else ((i + 1) ** 2) / 3
-                    else:
-                        result += 1 if last_difference_list[i] > 0 else -1
-                else:
-                    result += 1 if last_difference_list[i] > 0 else -1
-
-        average_signal = 0
-
-        if result > 100 or result < -100:
-            average_power = 10
-        else:
-            average_power = (abs(result) * 10 / 100)
-
-        average_signal = 1 if result > 0 else average_signal
-        average_signal = -1 if result < 0 else average_signal
-
-        return average_signal, average_power
+        difference_window = ((reference_window - average_window) / reference_window) * 100
+
+        return TechnicalAnalysis._get_signals(TechnicalAnalysis._score_crossings(difference_window, 0.2), 100)
 
     @staticmethod
-    def _analyse_macd(macd_series, reference_series):
+    def _analyse_macd(macd_window, reference_window):
         """
-        Analyse MACD series
+        Analyse the last values of MACD series
 
-        :param macd_series: The MACD series to be analysed
-        :type macd_series: pd.Series
-        :param reference_series: Reference series to be compared with
-        :type reference_series: pd.Series
-        :return: A tuple containing the signal and the signal power
+        :param macd_window: Last values of the MACD series to be analysed, one row per data line
+        :type macd_window: numpy.ndarray
+        :param reference_window: Last values of the reference series to be compared with, one row per data line
+        :type reference_window: numpy.ndarray
+        :return: A tuple containing the signals and the signal powers, one per data line
         :rtype: tuple
         """
+        macd_value_window = (macd_window / reference_window) * 100
 
-        last_macd_value_list = ((macd_series / reference_series) * 100).tolist()[-10:]
-
-        result = 0
-        for i in range(1, 10):
-            if last_macd_value_list[i - 1] < 0 < last_macd_value_list[i]:  # Buy signal
-                result += (i + 1) ** 2
-            elif last_macd_value_list[i] < 0 < last_macd_value_list[i - 1]:  # Sell signal
-                result -= (i + 1) ** 2
-            else:  # No change of signal type
-                if abs(last_macd_value_list[i]) < 0.1:  # If we are close enought from a potential signal change
-                    if abs(last_macd_value_list[i - 1]) - abs(last_macd_value_list[i]) > 0:
-                        result += ((i + 1) ** 2) / 3 * (-1) if last_macd_value_list[i] > 0 else ((i + 1) ** 2) / 3
-                    else:
-                        result += 1 if last_macd_value_list[i] > 0 else -1
-                else:
-                    result += 1 if last_macd_value_list[i] > 0 else -1
-
-        macd_signal = 0
-
-        if result > 100 or result < -100:
-            macd_power = 10
-        else:
-            macd_power = (abs(result) * 10 / 100)
-
-        macd_signal = 1 if result > 0 else macd_signal
-        macd_signal = -1 if result < 0 else macd_signal
-
-        return macd_signal, macd_power
+        return TechnicalAnalysis._get_signals(TechnicalAnalysis._score_crossings(macd_value_window, 0.1), 100)
 
     @staticmethod
-    def _analyse_rsi(rsi_series, min_value, max_value):
+    def _analyse_rsi(rsi_window, min_value, max_value):
         """
-        Analyse rsi series
+        Analyse the last values of rsi series
 
-        :param rsi_series: The overbought series to be analysed
-        :type rsi_series: pd.Series
+        :param rsi_window: Last values of the overbought series to be analysed, one row per data line
+        :type rsi_window: numpy.ndarray
         :param min_value: Min value before a market is considered oversold
         :type min_value: float
         :param max_value: Max value before a market is considered overbought
         :type max_value: float
-        :return: A tuple containing the signal and the signal power
+        :return: A tuple containing the signals and the signal powers, one per data line
         :rtype: tuple
         """
-        last_overbought_value_list = rsi_series.tolist()[-10:]
-
-        result = 0
-        for i in range(10):
-            if last_overbought_value_list[i] < min_value:  # Buy signal
-                result += (i + 1) ** 2
-            elif last_overbought_value_list[i] > max_value:  # Sell signal
-                result -= (i + 1) ** 2
-            else:
-                result /= 1.5
-
-        overbought_signal = 0
+        results = np.zeros(len(rsi_window))
 
-        if result > 200 or result < -200:
-            overbought_power = 10
-        else:
-            overbought_power = (abs(result) * 10 / 200)
+        for i in range(ANALYSIS_WINDOW):
+            values = rsi_window[:, i]
+            results = np.where(values < min_value, results + (i + 1) ** 2,  # Buy signal
+                               np.where(values > max_value, results - (i + 1) ** 2,  # Sell signal
+                                        results / 1.5))
 
-        overbought_signal = 1 if result > 0 else overbought_signal
-        overbought_signal = -1 if result < 0 else overbought_signal
+        return TechnicalAnalysis._get_signals(results, 200)
 
-        return overbought_signal, overbought_power
+    @staticmethod
+    def _score_crossings(value_window, threshold):
+        """
+        Score the sign changes of the last values of series, the latest changes weighing the most
+
+        :param value_window: Last values of the series, one row per data line
+        :type value_window: numpy.ndarray
+        :param threshold: Absolute value under which a value getting closer to 0 announces a potential sign change
+        :type threshold: float
+        :return: The score of each data line
+        :rtype: numpy.ndarray
+        """
+        previous_values = value_window[:, :-1]
+        values = value_window[:, 1:]
+        weights = np.arange(2, ANALYSIS_WINDOW + 1) ** 2
+
+        # Score of each value compared to the previous one
+        scores = np.select(
+            [
+                (previous_values < 0) & (values > 0),  # Buy signal
+                (values < 0) & (previous_values > 0),  # Sell signal
+                # Close enough from a potential signal change
+                (np.abs(values) < threshold) & (np.abs(previous_values) - np.abs(values) > 0)
+            ],
+            [weights, -weights, np.where(values > 0, weights / 3 * (-1), weights / 3)],
+            np.where(values > 0, 1, -1)  # No change of signal type
+        )
+
+        # Added one after the other like the values were scored one by one, so the scores are exact
+        return np.cumsum(scores, axis=1)[:, -1]
 
     @staticmethod
-    def _determinate_candlestick_figure(stock_data_list):
+    def _get_signals(results, max_result):
         """
-        Determinate which candlestick figure the last candlestick is
+        Convert scores to signals and signal powers
 
-        :param stock_data_list: The stock data list
-        :type stock_data_list: list[StockDataPoint]
-        :return: The candlestick figure the last candlestick is
-        :rtype: CandlestickShapeEnum
+        :param results: The score of each data line
+        :type results: numpy.ndarray
+        :param max_result: Absolute score from which the signal power is the highest
+        :type max_result: int
+        :return: A tuple containing the signals (1 buy, -1 sell, 0 none) and the signal powers (0 to 10)
+        :rtype: tuple
         """
-        if stock_data_list[-1].is_hammer_or_hanging_man():
-            return CandlestickShapeEnum.HAMMER_OR_HANGING_MAN
-        if stock_data_list[-1].is_reversed_hammer_or_falling_star():
-            return CandlestickShapeEnum.REVERSED_HAMMER_OR_FALLING_STAR
-        if stock_data_list[-1].is_a_swallowing(stock_data_list[-2]):
-            return CandlestickShapeEnum.SWALLOWING
-        if stock_data_list[-1].is_an_harami(stock_data_list[-2]):
-            return CandlestickShapeEnum.HARAMI
-        return CandlestickShapeEnum.UNDEFINED
+        powers = np.where(np.abs(results) > max_result, 10, np.abs(results) * 10 / max_result)
+        signals = np.sign(results).astype(np.int64)
+
+        return signals.tolist(), powers.tolist()
 
     @staticmethod
-    def _determinate_trend(stock_data_list):
+    def _determinate_candlestick_figure(candlestick_masks):
         """
-        Determine the trend
+        Determinate which candlestick figure the last candlesticks are
 
-        :param stock_data_list: The stock data list
-        :type stock_data_list: list[StockDataPoint]
-        :return: The trend
-        ;:rtype: Trend
+        :param candlestick_masks: The candlestick pattern bitmask of the last candle of each data line
+                                  (CandlestickPatternScanner)
+        :type candlestick_masks: numpy.ndarray
+        :return: The candlestick figure of each data line
+        :rtype: list[CandlestickShapeEnum]
         """
-        last_stock_data_list = stock_data_list[-10:]
-        result = 0
+        candlestick_figures = [CandlestickShapeEnum.UNDEFINED] * len(candlestick_masks)
+
+        for candlestick_figure in reversed(CANDLESTICK_FIGURES):
+            for row in np.flatnonzero(CandlestickPatternScanner.has_shape(candlestick_masks, candlestick_figure)):
+                candlestick_figures[row] = candlestick_figure
+
+        return candlestick_figures
 
-        for i in range(10):
-            coef = abs(last_stock_data_list[i].open_price - last_stock_data_list[i].close_price) / \
-                   last_stock_data_list[i].close_price * 100
-            result += (i + 1) * 2 * coef if last_stock_data_list[i].get_color() is Color.GREEN \
-                else ((i + 1) * 2) * (-1) * coef
+    @staticmethod
+    def _determinate_trend(open_prices, close_prices):
+        """
+        Determine the trends
+
+        :param open_prices: Last open prices, one row per data line
+        :type open_prices: numpy.ndarray
+        :param close_prices: Last close prices, one row per data line
+        :type close_prices: numpy.ndarray
+        :return: The trend of each data line
+        :rtype: list[Trend]
+        """
+        coefs = np.abs(open_prices - close_prices) / close_prices * 100
+        weights = np.arange(1, ANALYSIS_WINDOW + 1) * 2
+        # Green candles push the trend up, red ones push it down
+        results = np.cumsum(np.where(open_prices < close_prices, weights, weights * (-1)) * coefs, axis=1)[:, -1]
 
-        if result > 20:
-            return Trend.UP
-        if result < -20:
-            return Trend.DOWN
-        return Trend.UNDEFINED
+        return [Trend.UP if result > 20 else Trend.DOWN if result < -20 else Trend.UNDEFINED
+                for result in results.tolist()]
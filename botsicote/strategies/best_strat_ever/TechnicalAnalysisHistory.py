@@ -0,0 +1,116 @@
+import numpy as np
+
+from entities.CandlestickFigure import CandlestickShapeEnum
+from entities.Trend import Trend
+from strategies.best_strat_ever.TechnicalAnalysisResult import TechnicalAnalysisResult
+
+UNDEFINED_CODE = -1  # Code of the candlestick figure and trend of a result not analysed yet (None)
+
+"""Fields of a technical analysis result record and their type, the enums (two last fields) are stored by value"""
+RECORD_FIELDS = [
+    ("sma_10_signal", np.int8),
+    ("sma_10_signal_power", np.float64),
+    ("sma_21_signal", np.int8),
+    ("sma_21_signal_power", np.float64),
+    ("ema_10_signal", np.int8),
+    ("ema_10_signal_power", np.float64),
+    ("ema_21_signal", np.int8),
+    ("ema_21_signal_power", np.float64),
+    ("macd_signal", np.int8),
+    ("macd_signal_power", np.float64),
+    ("rsi_signal", np.int8),
+    ("rsi_signal_power", np.float64),
+    ("stock_price", np.float64),
+    ("last_candlestick_figure", np.int8),
+    ("trend", np.int8)
+]
+
+RECORD_DTYPE = np.dtype(RECORD_FIELDS)
+
+
+class TechnicalAnalysisHistory(object):
+    """
+    Bounded history of the technical analysis results of a pair and time frame.
+    The results are stored as structured records in a ring buffer of twice the history size where each record is
+    written twice, at its position and size positions after: the last records are always contiguous, so appending a
+    result is O(1) and reading a window of records is a view of the buffer without any copy
+    """
+
+    def __init__(self, size):
+        """
+        Technical analysis history constructor
+
+        :param size: Max number of results kept
+        :type size: int
+        """
+        self._size = size
+        self._records = np.zeros(2 * size, dtype=RECORD_DTYPE)
+        self._count = 0  # Number of results appended since the creation
+
+    def __len__(self):
+        return min(self._count, self._size)
+
+    def append(self, technical_analysis_result):
+        """
+        Append a result, the oldest one is dropped if the history is full
+
+        :param technical_analysis_result: The technical analysis result (its values are copied)
+        :type technical_analysis_result: TechnicalAnalysisResult
+        """
+        record = tuple([getattr(technical_analysis_result, name) for name, _ in RECORD_FIELDS[:-2]] + [
+            TechnicalAnalysisHistory._to_code(technical_analysis_result.last_candlestick_figure),
+            TechnicalAnalysisHistory._to_code(technical_analysis_result.trend)
+        ])
+        position = self._count % self._size
+        self._records[position] = record
+        self._records[position + self._size] = record
+        self._count += 1
+
+    def get_records(self, count=None):
+        """
+        Get the last result records
+
+        :param count: Number of last records to get (all if None)
+        :type count: int
+        :return: A read only view of the records, sorted from the oldest to the latest
+        :rtype: numpy.ndarray
+        """
+        length = len(self) if count is None else min(count, len(self))
+        end = self._count % self._size + self._size if self._count >= self._size else self._count
+        view = self._records[end - length:end]
+        view.flags.writeable = False
+        return view
+
+    def get_result(self, index=-1):
+        """
+        Get a result
+
+        :param index: Index of the result in the history, from the oldest (negative values count from the latest)
+        :type index: int
+        :return: The technical analysis result
+        :rtype: TechnicalAnalysisResult
+        """
+        record = self.get_records()[index]
+        technical_analysis_result = TechnicalAnalysisResult()
+
+        for name, _ in RECORD_FIELDS[:-2]:
+            setattr(technical_analysis_result, name, record[name].item())
+
+        technical_analysis_result.last_candlestick_figure = None \
+            if record["last_candlestick_figure"] == UNDEFINED_CODE \
+            else CandlestickShapeEnum(record["last_candlestick_figure"].item())
+        technical_analysis_result.trend = None if record["trend"] == UNDEFINED_CODE else Trend(record["trend"].item())
+
+        return technical_analysis_result
+
+    @staticmethod
+    def _to_code(value):
+        """
+        Convert an enum value of a result to its record value
+
+        :param value: The enum value
+        :type value: CandlestickShapeEnum or Trend
+        :return: The record value
+        :rtype: int
+        """
+        return UNDEFINED_CODE if value is None else value.value